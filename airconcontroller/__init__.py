@@ -0,0 +1 @@
+"""Panasonic air conditioner IR command tools."""
@@ -0,0 +1,6 @@
+import sys
+
+from airconcontroller.cli import main
+
+
+sys.exit(main())
@@ -0,0 +1,382 @@
+"""Decoder benchmark suite over the bundled capture corpus.
+
+Measures per call latency, symbol and command throughput and peak traced
+memory of the decoders, and per call latency of the Panasonic properties
+and set_crc, the bit/byte conversion tables against the string based
+conversions they replaced, and the ``-X importtime`` cost of the encoding
+modules.
+Results are written as JSON so runs on different commits can be compared:
+
+    python -m airconcontroller.benchmark -o before.json
+    python -m airconcontroller.benchmark -o after.json --compare before.json
+
+The import budget alone, failing if exceeded or if an encoding module pulls
+in an analysis dependency:
+
+    python -m airconcontroller.benchmark --check-imports
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from pathlib import Path
+from typing import Any, Callable
+
+from airconcontroller.controllers import Panasonic
+from airconcontroller.controllers.conversion import (HIGH_NIBBLE, LOW_NIBBLE, bits_to_bytes, bits_to_int,
+                                                     bytes_to_bits, int_to_bits)
+
+
+DATA_DIR = Path(__file__).parent / "data"
+ROOT_DIR = Path(__file__).parent.parent
+
+# Relative slow down reported as a regression by --compare
+REGRESSION_THRESHOLD = 0.10
+
+# Modules needed to encode and send commands, and their import time budget
+# (s, best of the runs); importing NumPy alone takes longer than 0.08s
+IMPORT_BUDGETS = {
+    "airconcontroller.controllers.encoder": 0.08,
+    "airconcontroller.controllers.panasonic": 0.08,
+    "airconcontroller.cli": 0.1,
+    "airconcontroller.controllers.scheduler": 0.2,
+    "airconcontroller.controllers.manager": 0.2,
+}
+
+# Analysis only dependencies the modules of IMPORT_BUDGETS must not import
+HEAVY_MODULES = ("numpy", "scipy", "pandas", "attr", "colorama")
+
+# Fresh interpreters started per module by bench_imports
+IMPORT_REPEAT = 5
+
+
+def measure(func: Callable[[], Any], repeat: int, number: int = 1) -> dict[str, float]:
+    """Time <repeat> batches of <number> calls, returning per call latencies (s)."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+
+    samples.sort()
+    return {
+        "calls": repeat * number,
+        "min_s": samples[0],
+        "median_s": statistics.median(samples),
+        "p95_s": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "mean_s": statistics.fmean(samples),
+    }
+
+
+def peak_memory(func: Callable[[], Any]) -> int:
+    """Peak traced allocation (bytes) of a single call."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def corpus(data_dir: Path = DATA_DIR) -> list[Path]:
+    return sorted(data_dir.glob("*.dat"))
+
+
+def count_symbols(filepath: Path) -> int:
+    lines = filepath.read_text().splitlines()
+    return sum(1 for line in lines if line.startswith(("pulse", "space", "timeout")))
+
+
+def bench_decoder(decode: Callable[[Path], list[Any] | None], files: list[Path],
+                  repeat: int) -> dict[str, Any]:
+    """Benchmark a decoder over each capture, and over the whole corpus."""
+    results: dict[str, Any] = {}
+    total_symbols = total_commands = 0
+    total_time = 0.0
+
+    for filepath in files:
+        try:
+            commands = len(decode(filepath) or [])
+        except ValueError as e:
+            results[filepath.name] = {"error": str(e)}
+            continue
+
+        symbols = count_symbols(filepath)
+        timing = measure(lambda: decode(filepath), repeat)
+        timing.update({
+            "symbols": symbols,
+            "commands": commands,
+            "symbols_per_s": symbols / timing["median_s"],
+            "commands_per_s": commands / timing["median_s"],
+            "peak_bytes": peak_memory(lambda: decode(filepath)),
+        })
+        results[filepath.name] = timing
+
+        total_symbols += symbols
+        total_commands += commands
+        total_time += timing["median_s"]
+
+    results["corpus"] = {
+        "symbols": total_symbols,
+        "commands": total_commands,
+        "median_s": total_time,
+        "symbols_per_s": total_symbols / total_time if total_time else 0.0,
+        "commands_per_s": total_commands / total_time if total_time else 0.0,
+    }
+    return results
+
+
+def bench_properties(repeat: int, number: int) -> dict[str, Any]:
+    """Benchmark the Panasonic property getters/setters and set_crc."""
+    cmd = Panasonic()
+
+    def set_temperature():
+        cmd.temperature = 24.5
+
+    def set_fan():
+        cmd.fan = "F3"
+
+    def set_swing():
+        cmd.swing = "P2"
+
+    def set_mode():
+        cmd.mode = Panasonic.MODES.COOL
+
+    cases = {
+        "get_temperature": lambda: cmd.temperature,
+        "get_fan": lambda: cmd.fan,
+        "get_swing": lambda: cmd.swing,
+        "get_mode": lambda: cmd.mode,
+        "get_crc": lambda: cmd.crc,
+        "set_temperature": set_temperature,
+        "set_fan": set_fan,
+        "set_swing": set_swing,
+        "set_mode": set_mode,
+        "set_crc": cmd.set_crc,
+    }
+    return {name: measure(func, repeat, number) for name, func in cases.items()}
+
+
+def legacy_int_to_bits(value: int, byte_size: int = 8) -> list[int]:
+    byte_data_lsb = [int(s) for s in format(value, 'b').zfill(byte_size)]
+    return list(reversed(byte_data_lsb))
+
+
+def legacy_bits_to_int(byte_msb: list[int], byte_size: int = 8) -> int:
+    byte_str = "".join([f"{d}" for d in reversed(byte_msb)])
+    return int(f'0b{byte_str:0{byte_size}}', base=2)
+
+
+def legacy_command(bits: list[int]) -> tuple[tuple[int, ...], list[int]]:
+    """Read every field of a data frame, recompute its CRC and re-encode it, with strings."""
+    data = [legacy_bits_to_int(bits[idx:idx + 8]) for idx in range(0, len(bits), 8)]
+    fields = (data[6] // 2, data[8] >> 4, data[8] & 0x0F, data[5] >> 4, data[18])
+    data[18] = sum(data[:18]) % 256
+    encoded: list[int] = []
+    for value in data:
+        encoded.extend(legacy_int_to_bits(value))
+    return fields, encoded
+
+
+def table_command(bits: list[int]) -> tuple[tuple[int, ...], list[int]]:
+    """legacy_command through the conversion tables."""
+    data = bits_to_bytes(bits)
+    fields = (data[6] // 2, HIGH_NIBBLE[data[8]], LOW_NIBBLE[data[8]], HIGH_NIBBLE[data[5]], data[18])
+    data = data[:18] + bytes([sum(data[:18]) % 256])
+    return fields, bytes_to_bits(data)
+
+
+def bench_conversion(repeat: int, number: int) -> dict[str, Any]:
+    """Benchmark the conversion tables against the string conversions they replaced."""
+    bits = list(Panasonic.FRAME2_DEFAULT)
+    byte_bits = bits[:8]
+    if legacy_command(bits) != table_command(bits):
+        raise ValueError("Conversion tables disagree with the string conversions")
+
+    cases = {
+        "legacy_int_to_bits": lambda: legacy_int_to_bits(141),
+        "int_to_bits": lambda: int_to_bits(141),
+        "legacy_bits_to_int": lambda: legacy_bits_to_int(byte_bits),
+        "bits_to_int": lambda: bits_to_int(byte_bits),
+        "legacy_command": lambda: legacy_command(bits),
+        "command": lambda: table_command(bits),
+    }
+    return {name: measure(func, repeat, number) for name, func in cases.items()}
+
+
+def import_time(module: str) -> tuple[float, list[str]]:
+    """Import <module> in a fresh interpreter.
+
+    Returns:
+        tuple[float, list[str]]: cumulative ``-X importtime`` of the module
+            (s) and the HEAVY_MODULES it loaded
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, (str(ROOT_DIR), env.get("PYTHONPATH"))))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import sys, {module}; print(*sys.modules)"],
+        cwd=ROOT_DIR, env=env, capture_output=True, text=True, check=True)
+
+    # "import time: self [us] | cumulative | imported package", nested
+    # imports are indented: the outermost line of <module> holds its total
+    cumulative = None
+    for line in result.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == module and not fields[2][1:].startswith(" "):
+            cumulative = int(fields[1]) / 1e6
+
+    if cumulative is None:
+        raise ValueError(f"No importtime entry for {module}")
+
+    loaded = {name.split(".")[0] for name in result.stdout.split()}
+    return cumulative, sorted(loaded.intersection(HEAVY_MODULES))
+
+
+def bench_imports(repeat: int = IMPORT_REPEAT) -> dict[str, Any]:
+    """Import time of each module of IMPORT_BUDGETS, against its budget."""
+    results = {}
+    for module, budget in IMPORT_BUDGETS.items():
+        samples = []
+        for _ in range(repeat):
+            seconds, heavy = import_time(module)
+            samples.append(seconds)
+
+        samples.sort()
+        results[module] = {
+            "calls": repeat,
+            "min_s": samples[0],
+            "median_s": statistics.median(samples),
+            "budget_s": budget,
+            "heavy_modules": heavy,
+        }
+    return results
+
+
+def check_imports(results: dict[str, Any]) -> list[str]:
+    """Budget violations of bench_imports results, one line each."""
+    violations = []
+    for module, result in results.items():
+        if result["min_s"] > result["budget_s"]:
+            violations.append(f"{module} imports in {result['min_s'] * 1e3:.1f}ms, "
+                              f"over its {result['budget_s'] * 1e3:.0f}ms budget")
+        if result["heavy_modules"]:
+            violations.append(f"{module} imports {', '.join(result['heavy_modules'])}")
+    return violations
+
+
+def data_convert_parse(filepath: Path) -> list[Any] | None:
+    from airconcontroller import data_convert
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return data_convert.parse_file(filepath)
+
+
+def git_commit() -> str | None:
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent,
+                                capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def run(files: list[Path] | None = None, repeat: int = 20, number: int = 1000) -> dict[str, Any]:
+    """Run the full suite, returning JSON serialisable results."""
+    files = corpus() if files is None else files
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "number": number,
+        },
+        "results": {
+            "Panasonic.parse_file": bench_decoder(Panasonic.parse_file, files, repeat),
+            "data_convert.parse_file": bench_decoder(data_convert_parse, files, repeat),
+            "Panasonic.properties": bench_properties(repeat, number),
+            "conversion": bench_conversion(repeat, number),
+            "imports": bench_imports(min(repeat, IMPORT_REPEAT)),
+        },
+    }
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any],
+            threshold: float = REGRESSION_THRESHOLD) -> list[str]:
+    """Compare median latencies, returning a line per benchmark and regressions."""
+    report = []
+    regressions = []
+    for group, cases in current["results"].items():
+        for name, result in cases.items():
+            base = baseline["results"].get(group, {}).get(name, {})
+            if "median_s" not in result or "median_s" not in base:
+                continue
+
+            ratio = result["median_s"] / base["median_s"]
+            line = f"{group:<26} {name:<40} {base['median_s'] * 1e6:>10.1f}us -> {result['median_s'] * 1e6:>10.1f}us  x{ratio:.2f}"
+            report.append(line)
+            if ratio > 1 + threshold:
+                regressions.append(line)
+
+    return report + ["", f"{len(regressions)} regression(s) over {threshold:.0%}"] + regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="aircon benchmark", description=__doc__.splitlines()[0])
+    parser.add_argument("-o", "--output", help="write JSON results to this file")
+    parser.add_argument("-c", "--compare", help="JSON results of a previous run")
+    parser.add_argument("-r", "--repeat", type=int, default=20)
+    parser.add_argument("-n", "--number", type=int, default=1000, help="calls per property sample")
+    parser.add_argument("--check-imports", action="store_true",
+                        help="only check the import time budget and dependencies")
+    parser.add_argument("files", nargs="*", type=Path,
+                        help="captures, - to read their paths from stdin, default: the bundled corpus")
+    args = parser.parse_args(argv)
+
+    if args.check_imports:
+        imports = bench_imports()
+        for module, result in imports.items():
+            print(f"{module:<42} {result['min_s'] * 1e3:>7.1f}ms (budget {result['budget_s'] * 1e3:.0f}ms)")
+        violations = check_imports(imports)
+        print("\n".join(violations) or "import budget ok")
+        return 1 if violations else 0
+
+    files = []
+    for filepath in args.files:
+        if str(filepath) == "-":
+            files.extend(Path(line.strip()) for line in sys.stdin if line.strip())
+        else:
+            files.append(filepath)
+
+    results = run(files or None, args.repeat, args.number)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        lines = compare(results, json.loads(Path(args.compare).read_text()))
+        print("\n".join(lines))
+        if not lines[-1].startswith("0 regression"):
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
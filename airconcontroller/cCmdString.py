@@ -1,7 +1,10 @@
 import attr
 import numpy as np
 from pathlib import Path
-from typing import Union
+from typing import Any, Sequence, Union
+
+from airconcontroller.controllers.encoder import encode_timings
+from airconcontroller.controllers.protocol import CMDSTRING
 
 
 class BitArray(np.ndarray):
@@ -9,17 +12,86 @@ class BitArray(np.ndarray):
     def __new__(cls, bit_str: str):
         # Input array is an already formed ndarray instance
         # We first cast to be our class type
-        obj = np.array([bool(int(a)) for a in bit_str], dtype=bool).view(cls)
+        obj = (np.frombuffer(bit_str.encode(), dtype=np.uint8) == ord("1")).view(cls)
 
         # Finally, we must return the newly created object:
         return obj
 
 
-@attr.s
+class PackedBits(np.ndarray):
+    """Unpacked bits (LSB first) of packed bytes, item assignment writes back to them.
+
+    Slices write back too; anything else (arithmetic, in place operators on
+    the whole array) works on a copy.
+    """
+
+    def __new__(cls, packed: np.ndarray):
+        obj = np.unpackbits(packed, bitorder="little").view(bool).view(cls)
+        obj._packed = packed
+        return obj
+
+    def __array_finalize__(self, obj):
+        self._packed = None
+        # Array unpacked from the bytes, for views and copies of it
+        self._root = obj if getattr(obj, "_packed", None) is not None else getattr(obj, "_root", None)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        root = self if self._packed is not None else self._root
+        if root is not None and np.may_share_memory(self, root):
+            root._packed[:] = _to_bytes(root.view(np.ndarray))
+
+
+def bits_to_byte(bit_str: str) -> int:
+    """Value of a bit string written first bit (LSB) first, eg "10000100" == 0x21."""
+    return int(bit_str[::-1], 2)
+
+
+def _to_bytes(bits: Any) -> np.ndarray:
+    """Pack first bit (LSB) first bits into uint8 bytes."""
+    return np.packbits(np.asarray(bits, dtype=bool), bitorder="little")
+
+
+# Data frame length
+DATA_BITS = CMDSTRING.frame_bits[-1]
+DATA_BYTES = DATA_BITS // 8
+
+
+def _as_data(value: Any) -> Union[np.ndarray, None]:
+    """Packed data frame of <value>: 19 bytes, kept as is when already uint8, or 152 bits (0/1) to pack.
+
+    Raises:
+        ValueError: for anything else
+    """
+    if value is None:
+        return None
+    if isinstance(value, (bytes, bytearray)):
+        value = np.frombuffer(value, dtype=np.uint8).copy()
+
+    data = np.asarray(value)
+    if data.shape == (DATA_BITS,) and np.isin(data, (0, 1)).all():
+        return _to_bytes(data)
+    if data.shape == (DATA_BYTES,):
+        return data if data.dtype == np.uint8 else data.astype(np.uint8)
+    raise ValueError(f"CmdString data must be {DATA_BYTES} bytes or {DATA_BITS} bits, got shape {data.shape}")
+
+
+@attr.s(init=False)
 class CmdString:
-    bits: np.ndarray = attr.ib(default=None)
-    # cmd:str = attr.ib(init=False, default="0" * 152)
-    total_length: int = attr.ib(init=False, default=152)
+    """Panasonic data frame, as 19 packed bytes (each byte LSB first).
+
+    ``bits`` remains available as the unpacked 152 bits, ``get_byte``, ``mode``
+    and ``fan`` as 8 bits, item assignment to them writing back to ``data``
+    (see PackedBits). Fields are read and written as byte operations on
+    ``data``; see CmdStringBatch to set a field across many commands at once.
+
+    Create one from the 19 data bytes, or from the 152 bits as before:
+
+        CmdString(data=frame_bytes)
+        CmdString(bits=frame_bits)
+    """
+    data: np.ndarray = attr.ib(default=None, converter=_as_data)
+    total_length: int = attr.ib(init=False, default=DATA_BITS)
 
     # NB: These length are defined in terms of the number of 38kHz modulated
     # ticks that occur in that time
@@ -45,9 +117,9 @@ class CmdString:
     MODE_COOL = 0x2
     MODE_HEAT = 0x3
     MODES = {
-        "DRY": BitArray("10000100"),
-        "COOL": BitArray("10001100"),
-        "HEAT": BitArray("10000010"),
+        "DRY": bits_to_byte("10000100"),
+        "COOL": bits_to_byte("10001100"),
+        "HEAT": bits_to_byte("10000010"),
     }
     #   BYTE_05:     Mode Setting
     #                10000100 ==  dry
@@ -63,7 +135,7 @@ class CmdString:
     BYTE_07 = 8 * 7
     #   BYTE_07:     Unknown
     BYTE_08 = FAN_BYTE = 8 * 8
-    FAN_ANGLE_MASK = BitArray("11110000")
+    FAN_ANGLE_MASK = bits_to_byte("11110000")
     FAN_ANGLE_AUTO = 0x10
     FAN_ANGLE00 = 0x20
     FAN_ANGLE20 = 0x30
@@ -71,12 +143,12 @@ class CmdString:
     FAN_ANGLE60 = 0x50
     FAN_ANGLE80 = 0x60
     FAN_ANGLES = {
-        "ANGLE_AUTO": BitArray("11110000"),
-        "ANGLE00": BitArray("10000000"),
-        "ANGLE20": BitArray("01000000"),
-        "ANGLE40": BitArray("11000000"),
-        "ANGLE60": BitArray("00100000"),
-        "ANGLE80": BitArray("10100000"),
+        "ANGLE_AUTO": bits_to_byte("11110000"),
+        "ANGLE00": bits_to_byte("10000000"),
+        "ANGLE20": bits_to_byte("01000000"),
+        "ANGLE40": bits_to_byte("11000000"),
+        "ANGLE60": bits_to_byte("00100000"),
+        "ANGLE80": bits_to_byte("10100000"),
     }
     #   BYTE_08:     Angle[:4] and Strength[4:]
     #                11110000 == Auto Angle / Sweeping
@@ -86,18 +158,18 @@ class CmdString:
     #                00100000 == Angle 4 [~ 60°]
     #                10100000 == Angle 5 [~ 80°] (Steepest angle down)
     #
-    FAN_POWER_MASK = BitArray("00001111")
+    FAN_POWER_MASK = bits_to_byte("00001111")
     FAN_POWER_AUTO = 0x100
     FAN_POWER025 = 0x200
     FAN_POWER050 = 0x300
     FAN_POWER075 = 0x400
     FAN_POWER100 = 0x500
     FAN_POWERS = {
-        "FAN_POWER_AUTO": BitArray("00000101"),
-        "FAN_POWER025": BitArray("00001100"),
-        "FAN_POWER050": BitArray("00000010"),
-        "FAN_POWER075": BitArray("00001010"),
-        "FAN_POWER100": BitArray("00001110"),
+        "FAN_POWER_AUTO": bits_to_byte("00000101"),
+        "FAN_POWER025": bits_to_byte("00001100"),
+        "FAN_POWER050": bits_to_byte("00000010"),
+        "FAN_POWER075": bits_to_byte("00001010"),
+        "FAN_POWER100": bits_to_byte("00001110"),
     }
     #                00000101 == Auto Fan Strength
     #                00001100 ==  25%
@@ -127,13 +199,15 @@ class CmdString:
     BYTE_18 = CHECKSUM1_BYTE = 8 * 18
     #   BYTE_18:     Checksum (TBC)
 
-    SPACE_SHORT = 394  # 440
-    SPACE_LONG = 1250  # 1280
-    PULSE = 496
+    # Timings of the "cmdstring" protocol description (controllers.protocol)
+    PROTOCOL = CMDSTRING
+    SPACE_SHORT = CMDSTRING.SPACE0  # 440
+    SPACE_LONG = CMDSTRING.SPACE1  # 1280
+    PULSE = CMDSTRING.MARK
     MARGIN = 100  # 150
-    PULSE_INTRO = 3550  # 3500
-    SPACE_INTRO = 1680  # 1750
-    SEPARATOR = 9990  # 9880
+    PULSE_INTRO = CMDSTRING.HEADER  # 3500
+    SPACE_INTRO = CMDSTRING.HEADERSPACE  # 1750
+    SEPARATOR = CMDSTRING.ENDOFFRAMESPACE  # 9880
     EXPECTED_LENGTH = 152
 
     LEADIN_BITS = "".join([
@@ -147,33 +221,48 @@ class CmdString:
         "01100000"
     ])
 
+    LEADIN_BYTES = bytes(_to_bytes(BitArray(LEADIN_BITS)))
+
+    # Byte offsets (BYTE_xx are bit offsets)
+    MODE_IDX = BYTE_05 // 8
+    TEMP_IDX = BYTE_06 // 8
+    FAN_IDX = BYTE_08 // 8
+    TEMP_MOD_IDX = BYTE_14 // 8
+    CHECKSUM_IDX = BYTE_18 // 8
+    ID_BYTES = slice(0, BYTE_05 // 8)
+
+    TEMP_HALF = bits_to_byte("00000001")
+    TEMP_LIMIT = bits_to_byte("01000000")
+
     max_temp = 30
     min_temp = 16
 
+    def __init__(self, data: Any = None, bits: Any = None):
+        """Create a command, by default the lead-in ID bytes at 20 degC.
+
+        Args:
+            data (np.ndarray | bytes | None): 19 packed bytes (a uint8 array is
+                shared, not copied), or 152 bits
+            bits (np.ndarray | None): 152 bits, as accepted before ``data``
+
+        Raises:
+            ValueError: for data of any other length, or both data and bits
+        """
+        if bits is not None:
+            if data is not None:
+                raise ValueError("Pass either data or bits, not both")
+            data = bits
+        self.__attrs_init__(data)
+
     def __attrs_post_init__(self):
-        if self.bits is None:
-            self.bits = np.zeros(152, dtype=bool)
-            copy_bytes = [
-                self.ID0_BYTE, self.ID1_BYTE,
-                self.ID2_BYTE, self.ID3_BYTE,
-                self.ID4_BYTE
-            ]
-            for bt in copy_bytes:
-                self.set_byte(bt, self.get_byte(bt, src=self.lead))
+        if self.data is None:
+            self.data = np.zeros(self.total_length // 8, dtype=np.uint8)
+            self.data[self.ID_BYTES] = np.frombuffer(self.LEADIN_BYTES, dtype=np.uint8)[self.ID_BYTES]
             self.temp = 20
 
     @classmethod
     def default(cls):
-        c = cls(bits=np.zeros(152, dtype=bool))
-        copy_bytes = [
-            c.ID0_BYTE, c.ID1_BYTE,
-            c.ID2_BYTE, c.ID3_BYTE,
-            c.ID4_BYTE
-        ]
-        for bt in copy_bytes:
-            c.set_byte(bt, c.get_byte(bt, src=c.lead))
-
-        c.temp = 20
+        c = cls()
         c.mode = CmdString.MODE_HEAT
 
         c.fan_set_power_auto()
@@ -181,55 +270,63 @@ class CmdString:
 
         return c
 
-
     @classmethod
     def from_array(cls, array: np.ndarray):
-        array = np.array(array, dtype=bool)
-        c = cls(bits=array)
-        return c
+        return cls(data=_to_bytes(array))
+
+    @classmethod
+    def from_bytes(cls, data: bytes):
+        return cls(data=np.frombuffer(data, dtype=np.uint8).copy())
 
     @classmethod
     def load_file(cls, file: Path):
         cmd = cls()
         return cmd
 
+    @property
+    def bits(self) -> PackedBits:
+        return PackedBits(self.data)
+
+    @bits.setter
+    def bits(self, value: np.ndarray):
+        self.data[:] = _to_bytes(value)
+
+    def __bytes__(self) -> bytes:
+        return self.data.tobytes()
+
     @property
     def lead(self):
         return BitArray(self.LEADIN_BITS)
 
     @property
     def lead_timings(self):
-        L = [self.PULSE_INTRO, self.SPACE_INTRO]
-        L.extend(self.bit_to_pulse(self.lead))
-        L.extend([self.PULSE, self.SEPARATOR])
+        L = list(encode_timings(((self.LEADIN_BYTES, len(self.LEADIN_BITS)),), self.PROTOCOL))
+        L.append(self.SEPARATOR)
         return L
 
     @property
     def cmd_timings(self):
-        C = self.lead
-        C.extend([self.PULSE_INTRO, self.SPACE_INTRO])
-        C.extend(self.bit_to_pulse(self.bits))
-        C.extend([self.PULSE])
-        return C
+        frames = ((self.LEADIN_BYTES, len(self.LEADIN_BITS)), (bytes(self.data), self.total_length))
+        return list(encode_timings(frames, self.PROTOCOL))
+
+    @classmethod
+    def parse_lines(cls, lines: Sequence[str]):
+        """Decode a mode2 capture through the shared protocol engine, one CmdString per data frame."""
+        return [cls.from_array(data_bits) for _, data_bits in cls.PROTOCOL.decode_lines(lines)
+                if len(data_bits) == cls.EXPECTED_LENGTH]
 
     def get_byte(self, start_bit, src=None):
-        sb = start_bit
-        eb = start_bit + 8
         if src is not None:
-            value = src[sb:eb]
-        else:
-            value = self.bits[sb:eb]
-        # print(f"Getting Byte[{sb}:{eb}] = {value} | src = {src}")
-        return value
+            return src[start_bit:start_bit + 8]
+        return PackedBits(self.data[start_bit // 8:start_bit // 8 + 1])
 
-    def set_byte(self, start_bit, value: np.ndarray, trg=None):
-        sb = start_bit
-        eb = start_bit + 8
+    def set_byte(self, start_bit, value: Union[int, np.ndarray], trg=None):
         if trg is not None:
-            trg[sb:eb] = value
+            trg[start_bit:start_bit + 8] = value
+        elif isinstance(value, (int, np.integer)):
+            self.data[start_bit // 8] = value
         else:
-            self.bits[sb:eb] = value
-        # print(f"Setting Byte[{sb}:{eb}] = {value} | trg = {trg}")
+            self.data[start_bit // 8] = _to_bytes(value)[0]
 
     def bit_to_pulse(self, bit):
         if isinstance(bit, (str, list,)):
@@ -248,67 +345,41 @@ class CmdString:
                 return [self.PULSE, self.SPACE_SHORT]
 
     def display(self, bit_array=None):
-        bts = bit_array or self.bits
-        cc = ""
-        for idx in range(len(bts // 8)):
-            cc += ''.join([f"{int(b)}" for b in bts[idx * 8:(idx + 1) * 8]]) + " "
-        print(cc.strip())
-        # print("")
+        bts = bit_array if bit_array is not None else self.bits
+        text = (np.asarray(bts, dtype=np.uint8) + ord("0")).tobytes().decode()
+        print(" ".join(text[idx:idx + 8] for idx in range(0, len(text), 8)))
 
     @property
     def isTempLimit(self):
-        if self.bits is not None:
-            return bool(self.bits[123])
-        return None
+        return bool(self.bits[123])
 
     @property
     def temp(self):
-        if self.bits is not None:
-            half_degree = 0.5 * self.get_byte(self.TEMP_MOD_BYTE)[7]
-            temp = self.get_byte(self.TEMP_BYTE)
-            temp = self.from_little_endien(temp, lshift=1) + half_degree
-            return temp
-        return None
+        return get_temp(self.data)
 
     @temp.setter
     def temp(self, value: float):
         if value is not None:
-            if value > self.max_temp:
-                value = self.max_temp
-
-            if value < self.min_temp:
-                value = self.min_temp
-
-            temp_int = int(value)
-            temp_bits = self.to_little_endien(temp_int, lpad=1)
-            self.set_byte(self.TEMP_BYTE, temp_bits)
-
-            mod_bits = np.zeros(8, dtype=bool)
-            if value in [self.min_temp, self.max_temp]:
-                mod_bits[1] = 1
-            else:
-                mod_bits[7] = bool(value - temp_int)
-            self.set_byte(self.TEMP_MOD_BYTE, mod_bits)
+            set_temp(self.data, value)
 
     @property
     def mode(self):
-        if self.bits is not None:
-            mode = self.get_byte(self.MODE_BYTE)
-            return mode
-        return None
+        """Mode byte, as 8 bits (see get_byte)."""
+        return self.get_byte(self.MODE_BYTE)
 
     @mode.setter
-    def mode(self, mode_to_set: Union[str, BitArray]):
-        if mode_to_set is not None:
-            if mode_to_set in ["DRY", self.MODE_DRY]:
-                self.set_byte(self.MODE_BYTE, self.MODES["DRY"])
-            elif mode_to_set in ["COOL", self.MODE_COOL]:
-                self.set_byte(self.MODE_BYTE, self.MODES["COOL"])
-            elif mode_to_set in ["HEAT", self.MODE_HEAT]:
-                self.set_byte(self.MODE_BYTE, self.MODES["HEAT"])
-            else:
+    def mode(self, mode_to_set: Union[str, int, np.ndarray]):
+        if isinstance(mode_to_set, np.ndarray):
+            self.set_byte(self.MODE_BYTE, mode_to_set)
+        elif mode_to_set is not None:
+            if not set_mode(self.data, mode_to_set):
                 print(f"Unknown mode: [{mode_to_set}]")
 
+    @property
+    def mode_value(self) -> int:
+        """Mode byte value (see MODES)."""
+        return int(self.data[self.MODE_IDX])
+
     def mode_set_dry(self):
         self.mode = self.MODE_DRY
 
@@ -320,26 +391,22 @@ class CmdString:
 
     @property
     def fan(self):
-        if self.bits is not None:
-            fan = self.get_byte(self.FAN_BYTE)
-            return fan
-        return None
+        """Fan byte, as 8 bits (see get_byte)."""
+        return self.get_byte(self.FAN_BYTE)
 
     @fan.setter
-    def fan(self, fan_power_and_angle):
+    def fan(self, fan_power_and_angle: Union[int, np.ndarray]):
         if fan_power_and_angle is not None:
             self.set_byte(self.FAN_BYTE, fan_power_and_angle)
 
+    @property
+    def fan_value(self) -> int:
+        """Fan byte value, angle in the low nibble and power in the high nibble."""
+        return int(self.data[self.FAN_IDX])
+
     def fan_set_power_angle(self, power=None, angle=None):
         if power is not None or angle is not None:
-            if angle is None:
-                angle = self.get_byte(self.FAN_BYTE)
-                angle &= self.FAN_ANGLE_MASK
-            if power is None:
-                power = self.get_byte(self.FAN_BYTE)
-                power &= self.FAN_POWER_MASK
-
-            self.fan = power | angle
+            set_fan(self.data, power, angle)
 
     def fan_set_power_auto(self):
         self.fan_set_power_angle(power=self.FAN_POWER_AUTO)
@@ -374,26 +441,28 @@ class CmdString:
     def fan_set_angle_80(self):
         self.fan_set_power_angle(angle=self.FAN_ANGLE80)
 
+    @property
+    def checksum(self) -> int:
+        return int(self.data[self.CHECKSUM_IDX])
+
+    def set_checksum(self):
+        set_checksum(self.data)
+
     @staticmethod
     def from_little_endien(bit_array, bits=8, lshift=0, rshift=0):
-        val = 0
+        bit_array = np.asarray(bit_array, dtype=bool)
         if lshift > 0:
-            bit_array = bit_array[lshift:] + [0] * lshift
-            bit_array = bit_array[:bits]
+            bit_array = np.concatenate((bit_array[lshift:], np.zeros(lshift, dtype=bool)))[:bits]
         if rshift > 0:
-            bit_array = [0] * rshift + bit_array
-            bit_array = bit_array[:bits]
+            bit_array = np.concatenate((np.zeros(rshift, dtype=bool), bit_array))[:bits]
 
-        for idx in range(len(bit_array)):
-            if bit_array[idx]:
-                val += 2**idx
-        return val
+        return int.from_bytes(_to_bytes(bit_array).tobytes(), "little")
 
     @staticmethod
     def to_little_endien(value, bits=8, lpad=0, rpad=0):
-        val = [int(b) for b in list(reversed(f"{value:0{bits}b}"))]
-        val = [0] * lpad + val + [0] * rpad
-        return np.array(val[:bits], dtype=bool)
+        raw = np.frombuffer(int(value).to_bytes(max(1, -(-bits // 8)), "little"), dtype=np.uint8)
+        val = np.unpackbits(raw, bitorder="little")[:bits].view(bool)
+        return np.concatenate((np.zeros(lpad, dtype=bool), val, np.zeros(rpad, dtype=bool)))[:bits]
 
     @staticmethod
     def get_pulse(test_length):
@@ -416,6 +485,177 @@ class CmdString:
         return lengths[np.argmin(np.abs(lengths - test_length))]
 
 
+################################################################
+# Field accessors
+#
+# These take the packed data of one command (19,) or of a batch
+# (N, 19), so CmdString and CmdStringBatch share them.
+################################################################
+
+_MODE_KEYS = {
+    "DRY": "DRY", CmdString.MODE_DRY: "DRY",
+    "COOL": "COOL", CmdString.MODE_COOL: "COOL",
+    "HEAT": "HEAT", CmdString.MODE_HEAT: "HEAT",
+}
+
+_FAN_POWER_KEYS = {
+    CmdString.FAN_POWER_AUTO: "FAN_POWER_AUTO",
+    CmdString.FAN_POWER025: "FAN_POWER025",
+    CmdString.FAN_POWER050: "FAN_POWER050",
+    CmdString.FAN_POWER075: "FAN_POWER075",
+    CmdString.FAN_POWER100: "FAN_POWER100",
+}
+
+_FAN_ANGLE_KEYS = {
+    CmdString.FAN_ANGLE_AUTO: "ANGLE_AUTO",
+    CmdString.FAN_ANGLE00: "ANGLE00",
+    CmdString.FAN_ANGLE20: "ANGLE20",
+    CmdString.FAN_ANGLE40: "ANGLE40",
+    CmdString.FAN_ANGLE60: "ANGLE60",
+    CmdString.FAN_ANGLE80: "ANGLE80",
+}
+
+
+def get_temp(data: np.ndarray) -> Union[float, np.ndarray]:
+    if data.ndim == 1:
+        return (int(data[CmdString.TEMP_IDX]) >> 1) + 0.5 * bool(data[CmdString.TEMP_MOD_IDX] & 0x80)
+    return (data[:, CmdString.TEMP_IDX] >> 1) + 0.5 * ((data[:, CmdString.TEMP_MOD_IDX] & 0x80) > 0)
+
+
+def set_temp(data: np.ndarray, value: Union[float, np.ndarray]) -> None:
+    if data.ndim == 1:
+        # Plain int arithmetic, NumPy call overhead dominates for a single command
+        value = min(max(float(value), CmdString.min_temp), CmdString.max_temp)
+        whole = int(value)
+        data[CmdString.TEMP_IDX] = whole << 1
+        if value in (CmdString.min_temp, CmdString.max_temp):
+            data[CmdString.TEMP_MOD_IDX] = CmdString.TEMP_LIMIT
+        else:
+            data[CmdString.TEMP_MOD_IDX] = CmdString.TEMP_HALF if value != whole else 0
+        return
+
+    value = np.clip(value, CmdString.min_temp, CmdString.max_temp)
+    whole = value.astype(np.uint8)
+
+    data[..., CmdString.TEMP_IDX] = whole << 1
+    data[..., CmdString.TEMP_MOD_IDX] = np.where(
+        (value == CmdString.min_temp) | (value == CmdString.max_temp), CmdString.TEMP_LIMIT,
+        np.where(value != whole, CmdString.TEMP_HALF, 0))
+
+
+def set_mode(data: np.ndarray, mode: Union[str, int, Sequence]) -> bool:
+    """Set the mode byte, from one mode or one per command. False for an unknown mode."""
+    if isinstance(mode, (str, int)):
+        if mode not in _MODE_KEYS:
+            return False
+        data[..., CmdString.MODE_IDX] = CmdString.MODES[_MODE_KEYS[mode]]
+        return True
+
+    if any(m not in _MODE_KEYS for m in mode):
+        return False
+    data[..., CmdString.MODE_IDX] = [CmdString.MODES[_MODE_KEYS[m]] for m in mode]
+    return True
+
+
+def set_fan(data: np.ndarray, power: Any = None, angle: Any = None) -> None:
+    """Set the fan power and/or angle, each one FAN_POWER*/FAN_ANGLE* (or one per command)."""
+    fan = data[..., CmdString.FAN_IDX]
+    if power is not None:
+        values = _lookup(CmdString.FAN_POWERS, _FAN_POWER_KEYS, power)
+        fan = (fan & CmdString.FAN_ANGLE_MASK) | values
+    if angle is not None:
+        values = _lookup(CmdString.FAN_ANGLES, _FAN_ANGLE_KEYS, angle)
+        fan = (fan & CmdString.FAN_POWER_MASK) | values
+    data[..., CmdString.FAN_IDX] = fan
+
+
+def _lookup(table: dict, keys: dict, setting: Any) -> Union[int, np.ndarray]:
+    if isinstance(setting, (str, int)):
+        return table[keys.get(setting, setting)]
+    return np.array([table[keys.get(s, s)] for s in setting], dtype=np.uint8)
+
+
+def set_checksum(data: np.ndarray) -> None:
+    data[..., CmdString.CHECKSUM_IDX] = data[..., :CmdString.CHECKSUM_IDX].sum(axis=-1, dtype=np.uint32) % 256
+
+
+class CmdStringBatch:
+    """N commands as one (N, 19) packed byte matrix, each field set in one operation.
+
+        batch = CmdStringBatch.repeat(CmdString.default(), 15)
+        batch.temp = np.arange(16, 31)
+        batch.set_field("mode", "COOL")
+        batch.set_checksum()
+        cmds = list(batch)
+    """
+
+    FIELDS = ("temp", "mode", "fan_power", "fan_angle")
+
+    def __init__(self, data: np.ndarray):
+        self.data = np.asarray(data, dtype=np.uint8).reshape(-1, CmdString.EXPECTED_LENGTH // 8)
+
+    @classmethod
+    def repeat(cls, cmd: CmdString, count: int):
+        return cls(np.tile(cmd.data, (count, 1)))
+
+    @classmethod
+    def from_commands(cls, cmds: Sequence[CmdString]):
+        return cls(np.stack([cmd.data for cmd in cmds]))
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, idx: int) -> CmdString:
+        """Command <idx>, sharing its data with the batch."""
+        return CmdString(data=self.data[idx])
+
+    def __iter__(self):
+        return (self[idx] for idx in range(len(self)))
+
+    @property
+    def bits(self) -> np.ndarray:
+        return np.unpackbits(self.data, axis=1, bitorder="little").view(bool)
+
+    @property
+    def temp(self) -> np.ndarray:
+        return get_temp(self.data)
+
+    @temp.setter
+    def temp(self, value: Union[float, np.ndarray]):
+        set_temp(self.data, value)
+
+    @property
+    def mode(self) -> np.ndarray:
+        return self.data[:, CmdString.MODE_IDX]
+
+    @mode.setter
+    def mode(self, mode: Union[str, int, Sequence]):
+        if not set_mode(self.data, mode):
+            raise ValueError(f"Unknown mode: [{mode}]")
+
+    @property
+    def fan(self) -> np.ndarray:
+        return self.data[:, CmdString.FAN_IDX]
+
+    @property
+    def checksum(self) -> np.ndarray:
+        return self.data[:, CmdString.CHECKSUM_IDX]
+
+    def set_checksum(self):
+        set_checksum(self.data)
+
+    def set_field(self, field: str, values: Any):
+        """Set one of FIELDS across every command, to one value or one value per command."""
+        if field == "fan_power":
+            set_fan(self.data, power=values)
+        elif field == "fan_angle":
+            set_fan(self.data, angle=values)
+        elif field in self.FIELDS:
+            setattr(self, field, values)
+        else:
+            raise KeyError(f"Unknown field: {field}")
+
+
 if __name__ == '__main__':
     cmd = CmdString.default()
     print(cmd.display())
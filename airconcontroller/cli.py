@@ -0,0 +1,254 @@
+"""Command line interface, installed as ``aircon``.
+
+    aircon decode "data/*.dat" -j 4          decode captures in parallel
+    aircon decode overnight.dat --split      decode parts of one long capture in parallel
+    mode2 -d /dev/lirc0 | aircon decode -    decode a live stream
+    aircon encode mode=COOL temperature=24   print the mode2 timings of a state
+    aircon convert data/ -o captures/        convert text captures to binary
+    aircon benchmark --check-imports         run the benchmark suite
+
+File arguments may be globs or directories (their .dat files). Each
+subcommand reads many files in one process; ``-`` reads from stdin.
+Analysis modules are imported by the subcommand using them, so encoding
+stays on the standard library.
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import sys
+
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Sequence
+
+from airconcontroller.controllers.panasonic import Panasonic
+
+
+# Suffix of the text captures picked up from a directory argument
+CAPTURE_GLOB = "*.dat"
+
+# Argument standing for stdin
+STDIN = "-"
+
+
+def expand_paths(patterns: Iterable[str]) -> list[Path]:
+    """Files named by <patterns>: paths, globs, or directories of captures.
+
+    Raises:
+        FileNotFoundError: for a pattern matching nothing
+    """
+    paths = []
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            matches = sorted(Path(match) for match in glob.glob(pattern, recursive=True))
+        elif Path(pattern).is_dir():
+            matches = sorted(Path(pattern).glob(CAPTURE_GLOB))
+        else:
+            matches = [Path(pattern)] if Path(pattern).exists() else []
+
+        if not matches:
+            raise FileNotFoundError(f"No capture matches {pattern}")
+        paths.extend(matches)
+    return paths
+
+
+def command_record(cmd: Panasonic) -> dict[str, Any]:
+    """Decoded fields of a command, JSON serialisable."""
+    return {**cmd.state(), "crc": cmd.crc, "crc_valid": cmd.crc_valid, "data": bytes(cmd.data_frame).hex()}
+
+
+def format_command(idx: int, cmd: Panasonic) -> str:
+    state = cmd.state()
+    return (f"Event {idx:>2} | Mode: {state['mode'] or '?':<4}; Temperature: {state['temperature']:04.1f}; "
+            f"Fan Setting: {state['fan']:<4}; Swing Setting: {state['swing']:<4}; CRC: {cmd.crc:>3}")
+
+
+def print_commands(name: str, commands: Sequence[Panasonic], as_json: bool) -> None:
+    if as_json:
+        for idx, cmd in enumerate(commands):
+            print(json.dumps({"file": name, "event": idx, **command_record(cmd)}))
+        return
+
+    print(f"Set Name {name}")
+    for idx, cmd in enumerate(commands):
+        print(format_command(idx, cmd))
+
+
+def decode(args: argparse.Namespace) -> int:
+    if args.files == [STDIN]:
+        # Each command is printed as soon as its frame pair is received
+        for idx, cmd in enumerate(Panasonic.parse_stream(sys.stdin)):
+            if args.json:
+                print(json.dumps({"file": STDIN, "event": idx, **command_record(cmd)}), flush=True)
+            else:
+                print(format_command(idx, cmd), flush=True)
+        return 0
+
+    if args.split:
+        from airconcontroller.controllers.batch import decode_capture
+
+        failed = False
+        for filepath in expand_paths(args.files):
+            try:
+                print_commands(filepath.name, decode_capture(filepath, max_workers=args.jobs), args.json)
+            except ValueError as e:
+                print(f"{filepath.name}: {type(e).__name__}: {e}", file=sys.stderr)
+                failed = True
+        return 1 if failed else 0
+
+    from airconcontroller.controllers.batch import decode_files
+
+    cache_dir = None
+    if args.cache is not None:
+        from airconcontroller.controllers.cache import DecodeCache
+
+        cache_dir = DecodeCache(args.cache or None).directory
+
+    result = decode_files(expand_paths(args.files), max_workers=args.jobs, cache_dir=cache_dir)
+    for name, commands in result.commands.items():
+        print_commands(name, commands, args.json)
+    for name, error in result.errors.items():
+        print(f"{name}: {error}", file=sys.stderr)
+
+    return 1 if result.errors else 0
+
+
+def parse_state(text: str) -> dict[str, str | float]:
+    """Settings of a ``mode=COOL temperature=24`` (or comma separated) state.
+
+    Raises:
+        ValueError: for a token that is not setting=value
+    """
+    settings: dict[str, str | float] = {}
+    for token in text.replace(",", " ").split():
+        name, sep, value = token.partition("=")
+        if not sep:
+            raise ValueError(f"Expected setting=value: {token}")
+        name = name.strip().lower()
+        settings[name] = float(value) if name == "temperature" else value.strip().upper()
+    return settings
+
+
+def iter_states(states: Sequence[str]) -> Iterator[str]:
+    if list(states) == [STDIN]:
+        for line in sys.stdin:
+            if line.strip():
+                yield line
+    else:
+        yield " ".join(states)
+
+
+# Settings of an encoded state that are not given, FRAME2_DEFAULT is OFF
+ENCODE_DEFAULTS = {"power": "ON"}
+
+
+def encode(args: argparse.Namespace) -> int:
+    for text in iter_states(args.states):
+        cmd = Panasonic()
+        try:
+            cmd.update(**{**ENCODE_DEFAULTS, **parse_state(text)})
+        except (KeyError, ValueError) as e:
+            print(f"Invalid state {text.strip()!r}: {e}", file=sys.stderr)
+            return 2
+
+        if args.format == "json":
+            print(json.dumps({**command_record(cmd), "timings": cmd.to_timings().tolist()}))
+        elif args.format == "timings":
+            print(" ".join(map(str, cmd.to_timings())))
+        else:
+            sys.stdout.write(cmd.to_mode2())
+        sys.stdout.flush()
+    return 0
+
+
+def _convert(paths: tuple[Path, Path]) -> Path:
+    from airconcontroller.controllers.capture import convert_file
+
+    return convert_file(*paths)
+
+
+def convert(args: argparse.Namespace) -> int:
+    from airconcontroller.controllers.capture import SUFFIX, convert_lines
+
+    if args.files == [STDIN]:
+        if args.output is None:
+            print("Converting stdin needs -o FILE", file=sys.stderr)
+            return 2
+        convert_lines(sys.stdin.read().splitlines(), args.output)
+        print(args.output)
+        return 0
+
+    sources = expand_paths(args.files)
+    if args.output is not None:
+        Path(args.output).mkdir(parents=True, exist_ok=True)
+        targets = [Path(args.output) / src.with_suffix(SUFFIX).name for src in sources]
+    else:
+        targets = [src.with_suffix(SUFFIX) for src in sources]
+
+    if args.jobs == 1 or len(sources) <= 1:
+        for target in map(_convert, zip(sources, targets)):
+            print(target)
+        return 0
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        for target in executor.map(_convert, zip(sources, targets)):
+            print(target)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="aircon", description="Panasonic AC IR command tools.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    sub = subparsers.add_parser("decode", help="decode mode2 or binary captures")
+    sub.add_argument("files", nargs="+", help="captures, globs or directories; - to stream mode2 from stdin")
+    sub.add_argument("-j", "--jobs", type=int, default=None, help="worker processes, default the CPU count")
+    sub.add_argument("--json", action="store_true", help="print one JSON object per command")
+    sub.add_argument("--cache", nargs="?", const="", metavar="DIR",
+                     help="reuse decoded captures from a decode cache (default directory if no DIR)")
+    sub.add_argument("--split", action="store_true",
+                     help="split each capture at its timeouts and decode the parts in parallel")
+    sub.set_defaults(func=decode)
+
+    sub = subparsers.add_parser("encode", help="encode a state to pulse/space timings")
+    sub.add_argument("states", nargs="+", metavar="SETTING=VALUE",
+                     help="power (ON, the default, or OFF), mode, temperature, fan and swing, "
+                          "eg mode=COOL temperature=24; - to read one state per line from stdin")
+    sub.add_argument("-f", "--format", choices=("mode2", "timings", "json"), default="mode2")
+    sub.set_defaults(func=encode)
+
+    sub = subparsers.add_parser("convert", help="convert mode2 text captures to binary captures")
+    sub.add_argument("files", nargs="+", help="captures, globs or directories; - to read mode2 from stdin")
+    sub.add_argument("-o", "--output", type=Path,
+                     help="output directory, or file when reading stdin; default next to each capture")
+    sub.add_argument("-j", "--jobs", type=int, default=1, help="worker processes")
+    sub.set_defaults(func=convert)
+
+    # Listed for the help only, main hands its arguments to benchmark.main
+    sub = subparsers.add_parser("benchmark", help="run the benchmark suite, see aircon benchmark --help",
+                                add_help=False)
+    sub.add_argument("args", nargs=argparse.REMAINDER)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["benchmark"]:
+        from airconcontroller import benchmark
+
+        return benchmark.main(argv[1:])
+
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,313 @@
+"""Batch decoding of capture files across a process pool.
+
+decode_files spreads many captures over the workers; decode_capture
+spreads the parts of a single long capture, split at its timeouts.
+"""
+from __future__ import annotations
+
+import mmap
+import os
+import traceback
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from time import perf_counter
+from typing import TYPE_CHECKING, Iterable
+
+from airconcontroller.controllers.cache import DecodeCache
+from airconcontroller.controllers.conversion import bits_to_bytes, bytes_to_bits
+from airconcontroller.controllers.panasonic import Panasonic
+
+if TYPE_CHECKING:
+    from airconcontroller.controllers.decoder import TimingThresholds
+
+
+# Smallest part of a capture decode_capture hands to a worker, smaller
+# captures are decoded in this process
+MIN_CHUNK_BYTES = 1 << 20
+MIN_CHUNK_SYMBOLS = 1 << 18
+
+# Parts per worker, so a part slow to decode does not hold up the others
+CHUNKS_PER_WORKER = 4
+
+TIMEOUT_LINE = b"\ntimeout"
+
+
+@dataclass
+class FileResult:
+    """Outcome of decoding a single capture file."""
+    name: str
+    commands: list[Panasonic] = field(default_factory=list)
+    elapsed: float = 0.0
+    error: str | None = None
+
+
+@dataclass
+class BatchResult:
+    """Outcome of decoding a batch of capture files, in input order."""
+    files: list[FileResult] = field(default_factory=list)
+
+    @property
+    def commands(self) -> dict[str, list[Panasonic]]:
+        """Decoded commands keyed by file name, as extract_cmds returns them."""
+        return {f.name: f.commands for f in self.files if f.error is None}
+
+    @property
+    def errors(self) -> dict[str, str]:
+        return {f.name: f.error for f in self.files if f.error is not None}
+
+    @property
+    def timings(self) -> dict[str, float]:
+        return {f.name: f.elapsed for f in self.files}
+
+    @property
+    def elapsed(self) -> float:
+        return sum(f.elapsed for f in self.files)
+
+
+def decode_file(filepath: str | Path, cache_dir: str | Path | None = None) -> FileResult:
+    """Decode one capture, recording the time taken and any decode error.
+
+    With <cache_dir>, the decoded frames are read from and stored to a
+    DecodeCache in that directory. Errors other than OSError/ValueError
+    (eg a malformed capture tripping the frame decoding) are recorded with
+    their traceback.
+    """
+    fp = Path(filepath)
+    start = perf_counter()
+    try:
+        if cache_dir is not None:
+            commands = DecodeCache(cache_dir).parse_file(fp)
+        else:
+            commands = Panasonic.parse_file(fp)
+    except (OSError, ValueError) as e:
+        return FileResult(fp.name, elapsed=perf_counter() - start, error=f"{type(e).__name__}: {e}")
+    except Exception:
+        return FileResult(fp.name, elapsed=perf_counter() - start, error=traceback.format_exc().rstrip())
+
+    return FileResult(fp.name, commands, perf_counter() - start)
+
+
+def decode_files(filepaths: Iterable[str | Path], max_workers: int | None = None,
+                 chunksize: int = 1, cache_dir: str | Path | None = None) -> BatchResult:
+    """Decode capture files in parallel worker processes.
+
+    A file that fails to decode is reported in the result instead of
+    aborting the batch.
+
+    Args:
+        filepaths (Iterable[str | Path]): capture files
+        max_workers (int | None): worker processes, defaults to the CPU count.
+            With 1 the files are decoded in this process.
+        chunksize (int): files sent to a worker at a time; raise it for
+            many small files to cut the inter-process overhead
+        cache_dir (str | Path | None): DecodeCache directory shared by the
+            workers, default no caching
+
+    Returns:
+        BatchResult: per file commands, timings and errors
+    """
+    filepaths = [str(fp) for fp in filepaths]
+    decode = partial(decode_file, cache_dir=str(cache_dir) if cache_dir is not None else None)
+
+    if max_workers == 1 or len(filepaths) <= 1:
+        return BatchResult([decode(fp) for fp in filepaths])
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return BatchResult(list(executor.map(decode, filepaths, chunksize=chunksize)))
+
+
+@dataclass
+class Chunk:
+    """Part of a capture, starting just after a timeout (or at the start).
+
+    <start> and <end> are byte offsets in a text capture, symbol indices in
+    a binary capture; <line_idx> is the line (symbol) index of <start>.
+    """
+    filepath: str
+    start: int
+    end: int
+    line_idx: int
+    binary: bool = False
+
+
+@dataclass
+class ChunkResult:
+    """Frame pairs of a chunk, as (bytes, bit count) of each frame.
+
+    <parity> is the number of frame toggles within the chunk, modulo 2. The
+    chunk was decoded from frame index 0: when the chunks before it end on
+    an odd frame index, the frames of each of its pairs are swapped.
+    """
+    pairs: list[tuple[bytes, int, bytes, int]] = field(default_factory=list)
+    parity: int = 0
+    tokenize_error: ValueError | None = None
+    decode_error: ValueError | None = None
+
+
+def split_capture(filepath: str | Path, chunks: int) -> list[Chunk]:
+    """Split a capture into up to <chunks> parts of similar size at timeouts.
+
+    A timeout ends a frame pair and resets the decoder, so each part decodes
+    on its own given the frame index parity of the parts before it.
+    """
+    from airconcontroller.controllers.capture import is_capture, load_capture
+
+    filepath = str(filepath)
+    if is_capture(filepath):
+        frame_index = load_capture(filepath).frame_index
+        size = len(load_capture(filepath))
+        bounds = [0]
+        for k in range(1, chunks):
+            idx = int(frame_index.searchsorted(size * k // chunks))
+            if idx < len(frame_index) and bounds[-1] < frame_index[idx] + 1 < size:
+                bounds.append(int(frame_index[idx]) + 1)
+        bounds.append(size)
+        return [Chunk(filepath, start, end, start, binary=True) for start, end in zip(bounds, bounds[1:])]
+
+    result = []
+    with open(filepath, "rb") as ifp:
+        size = os.fstat(ifp.fileno()).st_size
+        if not size:
+            return [Chunk(filepath, 0, 0, 0)]
+
+        with mmap.mmap(ifp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = line_idx = 0
+            for k in range(1, chunks):
+                pos = mm.find(TIMEOUT_LINE, max(start, size * k // chunks))
+                end = mm.find(b"\n", pos + 1) + 1 if pos >= 0 else 0
+                if end <= start or end >= size:
+                    continue
+                result.append(Chunk(filepath, start, end, line_idx))
+                line_idx += mm[start:end].count(b"\n")
+                start = end
+            result.append(Chunk(filepath, start, size, line_idx))
+    return result
+
+
+def _last_text_duration(mm: mmap.mmap, end: int, word: bytes) -> int:
+    """Duration of the last <word> line before offset <end>, 0 if none."""
+    from airconcontroller.controllers.decoder import tokenize
+
+    pos = mm.rfind(b"\n" + word + b" ", 0, end)
+    if pos >= 0:
+        pos += 1
+    elif mm[:len(word) + 1] == word + b" " and end > 0:
+        pos = 0
+    else:
+        return 0
+
+    line_end = mm.find(b"\n", pos)
+    _, durations = tokenize([mm[pos:line_end if line_end >= 0 else len(mm)].decode().rstrip("\r")])
+    return int(durations[0])
+
+
+def _last_symbol_duration(symbols, end: int, event: int) -> int:
+    """Duration of the last <event> symbol before index <end>, 0 if none."""
+    from airconcontroller.controllers.capture import DURATION_MASK, EVENT_SHIFT
+
+    window = 64
+    while True:
+        lo = max(0, end - window)
+        found = (symbols[lo:end] >> EVENT_SHIFT == event).nonzero()[0]
+        if len(found):
+            return int(symbols[lo + found[-1]] & DURATION_MASK)
+        if not lo:
+            return 0
+        window *= 8
+
+
+def decode_chunk(chunk: Chunk, thresholds: TimingThresholds | None = None) -> ChunkResult:
+    """Decode one part of a capture, see split_capture.
+
+    Decode errors are returned rather than raised, so decode_capture can
+    report the one a serial decode of the whole capture would raise.
+    """
+    from airconcontroller.controllers.capture import Capture, load_capture
+    from airconcontroller.controllers.decoder import EVENT_PULSE, EVENT_SPACE, tokenize
+
+    decoder = Panasonic.PROTOCOL.decoder(thresholds)
+    lines = None
+    try:
+        if chunk.binary:
+            symbols = load_capture(chunk.filepath).symbols
+            part = Capture(symbols[chunk.start:chunk.end], symbols[:0])
+            events, durations = part.events, part.durations
+            decoder.resume(chunk.line_idx, _last_symbol_duration(symbols, chunk.start, EVENT_PULSE),
+                           _last_symbol_duration(symbols, chunk.start, EVENT_SPACE))
+        else:
+            with open(chunk.filepath, "rb") as ifp, \
+                    mmap.mmap(ifp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                lines = mm[chunk.start:chunk.end].decode().splitlines()
+                decoder.resume(chunk.line_idx, _last_text_duration(mm, chunk.start, b"pulse"),
+                               _last_text_duration(mm, chunk.start, b"space"))
+            events, durations = tokenize(lines)
+    except ValueError as e:
+        return ChunkResult(tokenize_error=e)
+
+    try:
+        pairs = decoder.decode_symbols(events, durations, lines)
+    except ValueError as e:
+        return ChunkResult(decode_error=e)
+
+    return ChunkResult([(bits_to_bytes(frame1), len(frame1), bits_to_bytes(frame2), len(frame2))
+                        for frame1, frame2 in pairs], decoder.frame_idx)
+
+
+def _frame(data: bytes, bit_count: int) -> bytes | list[int]:
+    return data if bit_count == 8 * len(data) else bytes_to_bits(data, bit_count)
+
+
+def decode_capture(filepath: str | Path, max_workers: int | None = None, chunks: int | None = None,
+                   thresholds: TimingThresholds | None = None) -> list[Panasonic]:
+    """Decode a single long capture in parallel worker processes.
+
+    The capture is split at timeouts, the parts decoded independently and
+    their commands joined in order: the result, and the ValueError raised
+    for a bad capture, are those of Panasonic.parse_file. To calibrate,
+    run controllers.calibration first and pass its thresholds.
+
+    Args:
+        filepath (str | Path): mode2 text or binary capture
+        max_workers (int | None): worker processes, defaults to the CPU count
+        chunks (int | None): parts to split the capture into, default
+            CHUNKS_PER_WORKER per worker, fewer for a capture under
+            MIN_CHUNK_BYTES (MIN_CHUNK_SYMBOLS) a part
+        thresholds (TimingThresholds | None): timing windows of the
+            receiver, default nominal
+
+    Raises:
+        ValueError: on the first symbol outside of the timing windows
+    """
+    from airconcontroller.controllers.capture import HEADER, is_capture
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if chunks is None:
+        if is_capture(filepath):
+            limit = (os.path.getsize(filepath) - HEADER.size) // 4 // MIN_CHUNK_SYMBOLS
+        else:
+            limit = os.path.getsize(filepath) // MIN_CHUNK_BYTES
+        chunks = min(max_workers * CHUNKS_PER_WORKER, limit)
+
+    parts = split_capture(filepath, chunks) if max_workers > 1 and chunks > 1 else []
+    if len(parts) <= 1:
+        return Panasonic.parse_file(filepath, thresholds)
+
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(parts))) as executor:
+        results = list(executor.map(partial(decode_chunk, thresholds=thresholds), parts))
+
+    # A serial decode tokenizes the whole capture before decoding any of it
+    for error in [r.tokenize_error for r in results] + [r.decode_error for r in results]:
+        if error is not None:
+            raise error
+
+    commands = []
+    parity = 0
+    for result in results:
+        for data1, count1, data2, count2 in result.pairs:
+            frame1, frame2 = _frame(data1, count1), _frame(data2, count2)
+            commands.append(Panasonic(frame2, frame1) if parity else Panasonic(frame1, frame2))
+        parity ^= result.parity
+    return commands
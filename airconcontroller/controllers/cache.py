@@ -0,0 +1,191 @@
+"""Persistent cache of decoded captures.
+
+Decoding is a pure function of the capture content, the decoder and its
+timing constants, so its result is stored on disk under a key hashing all
+three. Editing a capture, changing the protocol timings or thresholds, or
+bumping DECODER_VERSION all produce a new key: stale entries are never
+read, only left behind (see DecodeCache.clear).
+
+An entry holds the decoded frames as packed bits:
+
+    magic (4s) | version (H) | frame count (I)
+    bit count of each frame (I each)
+    frame bytes, LSB first, back to back
+
+    cache = DecodeCache()
+    cmds = cache.parse_file("data/cool_set.dat")  # decoded and stored
+    cmds = cache.parse_file("data/cool_set.dat")  # read back
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import struct
+
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable
+
+from airconcontroller.controllers.conversion import bits_to_bytes, bytes_to_bits
+from airconcontroller.controllers.panasonic import Panasonic
+from airconcontroller.controllers.protocol import TIMING_NAMES
+
+if TYPE_CHECKING:
+    from airconcontroller.controllers.decoder import TimingThresholds
+
+
+# Bump whenever a decoder change alters the decoded frames of a capture
+DECODER_VERSION = 1
+
+# Directory used when none is given and AIRCON_CACHE_DIR is not set
+DEFAULT_DIRECTORY = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "airconcontroller"
+ENV_VAR = "AIRCON_CACHE_DIR"
+
+MAGIC = b"IRDC"
+VERSION = 1
+HEADER = struct.Struct("<4sHI")
+SUFFIX = ".frames"
+
+# Bytes hashed at a time
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def file_digest(filepath: str | Path) -> str:
+    """Hash of the file content."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filepath, "rb") as ifp:
+        for block in iter(lambda: ifp.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def timing_params(protocol: Any) -> dict[str, int]:
+    return {name: getattr(protocol, name) for name in TIMING_NAMES}
+
+
+def pack_frames(frames: list[list[int]]) -> bytes:
+    counts = struct.pack(f"<{len(frames)}I", *(len(frame) for frame in frames))
+    return b"".join([HEADER.pack(MAGIC, VERSION, len(frames)), counts,
+                     *(bits_to_bytes(frame) for frame in frames)])
+
+
+def unpack_frames(data: bytes) -> list[list[int]]:
+    """Frames of a cache entry.
+
+    Raises:
+        ValueError: if <data> is not a complete entry of this version
+    """
+    if len(data) < HEADER.size:
+        raise ValueError("Truncated cache entry")
+    magic, version, frame_count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a cache entry (version {VERSION})")
+
+    pos = HEADER.size + 4 * frame_count
+    counts = struct.unpack_from(f"<{frame_count}I", data, HEADER.size)
+    frames = []
+    for count in counts:
+        size = (count + 7) // 8
+        frames.append(bytes_to_bits(data[pos:pos + size], count))
+        pos += size
+    if pos != len(data):
+        raise ValueError("Truncated cache entry")
+
+    return frames
+
+
+class DecodeCache:
+    """Decoded frames of capture files, stored in <directory>.
+
+    Args:
+        directory (str | Path | None): cache directory, default
+            $AIRCON_CACHE_DIR or ~/.cache/airconcontroller
+    """
+
+    def __init__(self, directory: str | Path | None = None):
+        if directory is None:
+            directory = os.environ.get(ENV_VAR) or DEFAULT_DIRECTORY
+        self.directory = Path(directory)
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, filepath: str | Path, decoder: str, params: dict[str, Any]) -> str:
+        """Cache key of decoding <filepath> with <decoder> and <params>.
+
+        Args:
+            filepath (str | Path): capture file
+            decoder (str): name of the decoding function
+            params (dict[str, Any]): JSON serialisable timing constants and
+                options the result depends on
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(json.dumps([file_digest(filepath), decoder, DECODER_VERSION, params],
+                                 sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def path(self, key: str) -> Path:
+        return self.directory / f"{key}{SUFFIX}"
+
+    def load(self, key: str) -> list[list[int]] | None:
+        """Frames stored under <key>, None if absent or unreadable."""
+        try:
+            return unpack_frames(self.path(key).read_bytes())
+        except (OSError, ValueError, struct.error):
+            return None
+
+    def store(self, key: str, frames: list[list[int]]) -> None:
+        """Store <frames> under <key>, atomically so readers never see a partial entry."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        target = self.path(key)
+        tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(pack_frames(frames))
+        os.replace(tmp, target)
+
+    def cached(self, filepath: str | Path, decoder: str, params: dict[str, Any],
+               decode: Callable[[Path], list[list[int]]]) -> list[list[int]]:
+        """Frames of <filepath>, decoded with <decode> only on a cache miss."""
+        key = self.key(filepath, decoder, params)
+        frames = self.load(key)
+        if frames is not None:
+            self.hits += 1
+            return frames
+
+        self.misses += 1
+        frames = decode(Path(filepath))
+        self.store(key, frames)
+        return frames
+
+    def parse_file(self, filepath: str | Path, thresholds: TimingThresholds | None = None,
+                   calibrate: bool = False) -> list[Panasonic]:
+        """Panasonic.parse_file through the cache.
+
+        Args:
+            filepath (str | Path): capture file
+            thresholds (TimingThresholds | None): timing windows of the
+                receiver, default nominal
+            calibrate (bool): learn the timing windows from this capture
+        """
+        params = {
+            "protocol": Panasonic.PROTOCOL.name,
+            "timings": timing_params(Panasonic.PROTOCOL),
+            "thresholds": thresholds.to_dict() if thresholds is not None else None,
+            "calibrate": calibrate,
+        }
+
+        def decode(fp: Path) -> list[list[int]]:
+            frames = []
+            for cmd in Panasonic.parse_file(fp, thresholds, calibrate):
+                frames.append(cmd.cmd_frame.data)
+                frames.append(cmd.data_frame.data)
+            return frames
+
+        frames = self.cached(filepath, "Panasonic.parse_file", params, decode)
+        return [Panasonic(frames[idx], frames[idx + 1]) for idx in range(0, len(frames), 2)]
+
+    def clear(self) -> int:
+        """Remove every entry, returning the number removed."""
+        removed = 0
+        for entry in self.directory.glob(f"*{SUFFIX}"):
+            entry.unlink(missing_ok=True)
+            removed += 1
+        return removed
@@ -0,0 +1,151 @@
+"""Per receiver timing calibration.
+
+Receivers drift from the nominal protocol timings, pulses in particular
+are stretched by the demodulator, so a fixed +/- DELTA window around the
+nominal durations rejects captures from some receivers. Calibration learns
+the windows from a capture of the receiver instead: the pulse and space
+duration histograms are clustered with a 1-D k-means seeded at the nominal
+timings, and each window is centred on its cluster.
+
+    thresholds = calibrate_file("data/cool_set.dat", Panasonic)
+    save_thresholds(thresholds, "receiver.json")
+    cmds = Panasonic.parse_file("capture.dat", thresholds=load_thresholds("receiver.json"))
+
+or from the command line:
+
+    python -m airconcontroller.controllers.calibration data/cool_set.dat receiver.json
+"""
+from __future__ import annotations
+
+import json
+import sys
+
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from airconcontroller.controllers.capture import is_capture, load_capture
+from airconcontroller.controllers.decoder import (EVENT_PULSE, EVENT_SPACE, PULSE_CLASSES, SPACE_CLASSES,
+                                                  TimingThresholds, tokenize)
+from airconcontroller.controllers.instrumentation import timed
+
+
+# k-means iterations before giving up on convergence
+MAX_ITERATIONS = 50
+
+# Window half width, in standard deviations of the cluster
+SPREAD = 4
+
+# Durations further than this fraction of the seed (or 2 * DELTA if wider)
+# from their centroid are outliers, ignored by the clustering
+TOLERANCE = 0.25
+
+
+def kmeans_1d(values: np.ndarray, weights: np.ndarray, centroids: np.ndarray,
+              tolerances: np.ndarray | None = None,
+              max_iterations: int = MAX_ITERATIONS) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Weighted 1-D k-means over a histogram.
+
+    Each iteration assigns every value to its nearest centroid with one
+    ``np.searchsorted`` against the midpoints of the sorted centroids. A
+    centroid left without values keeps its seed.
+
+    Args:
+        values (np.ndarray): distinct durations
+        weights (np.ndarray): occurrences of each duration
+        centroids (np.ndarray): seeds, one per cluster
+        tolerances (np.ndarray | None): per cluster distance beyond which a
+            value is an outlier and carries no weight
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: centroid, standard
+            deviation and total weight of each cluster, in seed order
+    """
+    centroids = centroids.astype(np.float64)
+    values = values.astype(np.float64)
+    all_weights = weights = weights.astype(np.float64)
+    k = len(centroids)
+
+    for _ in range(max_iterations):
+        order = np.argsort(centroids)
+        midpoints = (centroids[order][1:] + centroids[order][:-1]) / 2
+        labels = order[np.searchsorted(midpoints, values)]
+        if tolerances is not None:
+            weights = np.where(np.abs(values - centroids[labels]) <= tolerances[labels], all_weights, 0.0)
+
+        counts = np.bincount(labels, weights=weights, minlength=k)
+        sums = np.bincount(labels, weights=weights * values, minlength=k)
+        updated = np.where(counts > 0, sums / np.maximum(counts, 1), centroids)
+        if np.allclose(updated, centroids):
+            break
+        centroids = updated
+
+    squares = np.bincount(labels, weights=weights * (values - centroids[labels]) ** 2, minlength=k)
+    return centroids, np.sqrt(squares / np.maximum(counts, 1)), counts
+
+
+def _windows(durations: np.ndarray, seeds: dict[int, int], delta: int) -> dict[int, tuple[int, int]]:
+    """Window of each class centred on its cluster, at least +/- <delta> wide."""
+    classes = list(seeds)
+    if not len(durations):
+        return {cls: (seeds[cls] - delta, seeds[cls] + delta) for cls in classes}
+
+    values, weights = np.unique(durations, return_counts=True)
+    seed_values = np.array([seeds[cls] for cls in classes])
+    tolerances = np.maximum(2 * delta, TOLERANCE * seed_values)
+    centroids, spreads, _ = kmeans_1d(values, weights, seed_values, tolerances)
+
+    half_widths = np.clip(SPREAD * spreads, delta, tolerances)
+    return {cls: (int(round(c - w)), int(round(c + w)))
+            for cls, c, w in zip(classes, centroids.tolist(), half_widths.tolist())}
+
+
+@timed("calibrate")
+def calibrate(events: np.ndarray, durations: np.ndarray, protocol: Any) -> TimingThresholds:
+    """Learn the timing windows of a receiver from one of its captures.
+
+    The capture should hold a few complete commands. Classes that never
+    occur keep their nominal window.
+
+    Args:
+        events (np.ndarray): event codes
+        durations (np.ndarray): event durations (us)
+        protocol (Any): class providing the timing constants (eg Panasonic)
+
+    Returns:
+        TimingThresholds: windows for Mode2Decoder / Panasonic.parse_file
+    """
+    durations = np.asarray(durations, dtype=np.int64)
+    return TimingThresholds(
+        _windows(durations[events == EVENT_PULSE],
+                 {cls: getattr(protocol, name) for name, cls in PULSE_CLASSES.items()}, protocol.DELTA),
+        _windows(durations[events == EVENT_SPACE],
+                 {cls: getattr(protocol, name) for name, cls in SPACE_CLASSES.items()}, protocol.DELTA))
+
+
+def calibrate_file(filepath: str | Path, protocol: Any) -> TimingThresholds:
+    """Calibrate from a mode2 text capture or a binary capture."""
+    if is_capture(filepath):
+        capture = load_capture(filepath)
+        return calibrate(capture.events, capture.durations, protocol)
+
+    return calibrate(*tokenize(Path(filepath).read_text().splitlines()), protocol)
+
+
+def save_thresholds(thresholds: TimingThresholds, filepath: str | Path) -> None:
+    Path(filepath).write_text(json.dumps(thresholds.to_dict(), indent=2))
+
+
+def load_thresholds(filepath: str | Path) -> TimingThresholds:
+    return TimingThresholds.from_dict(json.loads(Path(filepath).read_text()))
+
+
+if __name__ == "__main__":
+    from airconcontroller.controllers.panasonic import Panasonic
+
+    thresholds = calibrate_file(sys.argv[1], Panasonic)
+    if len(sys.argv) > 2:
+        save_thresholds(thresholds, sys.argv[2])
+    else:
+        print(json.dumps(thresholds.to_dict(), indent=2))
@@ -0,0 +1,136 @@
+"""Binary capture format.
+
+A compact replacement for mode2 text captures. The file holds a header, one
+little endian uint32 per symbol and a frame index:
+
+    header   magic "IRCP", version (u16), flags (u16),
+             symbol count (u32), frame count (u32)
+    symbols  bits 30:32 event (0 pulse, 1 space, 2 timeout),
+             bits 0:30  duration (us)
+    index    symbol index of each timeout (u32), ie where each frame pair ends
+
+Captures are loaded with ``np.memmap``, so the symbols are paged in on
+demand rather than parsed. Convert a text capture with:
+
+    python -m airconcontroller.controllers.capture temp_change.dat temp_change.cap
+"""
+from __future__ import annotations
+
+import struct
+import sys
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+
+from airconcontroller.controllers.decoder import (EVENT_BANNER, EVENT_INVALID, EVENT_NAMES, EVENT_TIMEOUT,
+                                                  tokenize)
+from airconcontroller.controllers.instrumentation import timed
+
+
+MAGIC = b"IRCP"
+VERSION = 1
+HEADER = struct.Struct("<4sHHII")
+
+EVENT_SHIFT = 30
+DURATION_MASK = (1 << EVENT_SHIFT) - 1
+
+SUFFIX = ".cap"
+
+
+@dataclass
+class Capture:
+    """Memory mapped binary capture."""
+    symbols: np.ndarray
+    frame_index: np.ndarray
+
+    @property
+    def events(self) -> np.ndarray:
+        return (self.symbols >> EVENT_SHIFT).astype(np.int8)
+
+    @property
+    def durations(self) -> np.ndarray:
+        return self.symbols & DURATION_MASK
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def to_lines(self) -> list[str]:
+        """Render the capture as mode2 lines."""
+        return [f"{EVENT_NAMES[event]} {duration}"
+                for event, duration in zip(self.events.tolist(), self.durations.tolist())]
+
+
+def encode_symbols(events: np.ndarray, durations: np.ndarray) -> np.ndarray:
+    """Pack events and durations into uint32 symbols."""
+    if np.any(durations > DURATION_MASK) or np.any(durations < 0):
+        raise ValueError(f"Durations must be between 0 and {DURATION_MASK}us")
+    return (events.astype(np.uint32) << EVENT_SHIFT) | durations.astype(np.uint32)
+
+
+def write_capture(filepath: str | Path, events: np.ndarray, durations: np.ndarray) -> None:
+    """Write pulse/space/timeout events as a binary capture."""
+    symbols = encode_symbols(events, durations).astype("<u4")
+    frame_index = np.flatnonzero(events == EVENT_TIMEOUT).astype("<u4")
+
+    with open(filepath, "wb") as ofp:
+        ofp.write(HEADER.pack(MAGIC, VERSION, 0, len(symbols), len(frame_index)))
+        ofp.write(symbols.tobytes())
+        ofp.write(frame_index.tobytes())
+
+
+def convert_lines(lines: Sequence[str], filepath: str | Path) -> None:
+    """Convert mode2 lines to a binary capture, dropping the mode2 banner.
+
+    Raises:
+        ValueError: for a line that is not a pulse, space or timeout
+    """
+    events, durations = tokenize(lines)
+    invalid = np.flatnonzero(events == EVENT_INVALID)
+    if len(invalid):
+        raise ValueError(f"Unknown event at: ln{invalid[0]:>4}: {lines[invalid[0]]}")
+
+    kept = events != EVENT_BANNER
+    write_capture(filepath, events[kept], durations[kept])
+
+
+def convert_file(src: str | Path, dst: str | Path | None = None) -> Path:
+    """Convert a mode2 text capture, by default to <src> with a .cap suffix."""
+    dst = Path(dst) if dst is not None else Path(src).with_suffix(SUFFIX)
+    convert_lines(Path(src).read_text().splitlines(), dst)
+    return dst
+
+
+def is_capture(filepath: str | Path) -> bool:
+    """Check for the binary capture magic."""
+    with open(filepath, "rb") as ifp:
+        return ifp.read(len(MAGIC)) == MAGIC
+
+
+@timed("decode.load")
+def load_capture(filepath: str | Path) -> Capture:
+    """Memory map a binary capture.
+
+    Raises:
+        ValueError: if the file is not a binary capture of this version
+    """
+    with open(filepath, "rb") as ifp:
+        magic, version, _, symbol_count, frame_count = HEADER.unpack(ifp.read(HEADER.size))
+
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a binary capture (version {VERSION}): {filepath}")
+
+    symbols = frame_index = np.zeros(0, dtype="<u4")
+    if symbol_count:
+        symbols = np.memmap(filepath, dtype="<u4", mode="r", offset=HEADER.size, shape=(symbol_count,))
+    if frame_count:
+        frame_index = np.memmap(filepath, dtype="<u4", mode="r",
+                                offset=HEADER.size + 4 * symbol_count, shape=(frame_count,))
+
+    return Capture(symbols, frame_index)
+
+
+if __name__ == "__main__":
+    convert_file(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
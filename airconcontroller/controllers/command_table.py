@@ -0,0 +1,141 @@
+"""Precomputed table of every Panasonic data frame.
+
+The protocol state space is small: 5 modes, 29 half degree temperatures,
+6 fan settings and 6 swing settings, 5220 data frames of 19 bytes. The
+table stores every frame, CRC applied, in one contiguous buffer so looking
+up a command is an index calculation and a slice, with no bit manipulation.
+
+Build the table file once:
+
+    python -m airconcontroller.controllers.command_table commands.bin
+
+then look commands up from the memory mapped file:
+
+    table = CommandTable.load("commands.bin")
+    cmd = table.command("COOL", 24, "AUTO", "AUTO")
+"""
+from __future__ import annotations
+
+import mmap
+import struct
+import sys
+
+from pathlib import Path
+
+from airconcontroller.controllers.panasonic import Panasonic
+
+
+class CommandTable:
+    """Contiguous table of data frames, indexed by (mode, temperature, fan, swing)."""
+
+    MAGIC = b"PNCT"
+    VERSION = 1
+    # magic, version, record size, mode/temperature/fan/swing counts, frame1
+    HEADER = struct.Struct("<4sHH4H8s")
+
+    MODES = [mode.name for mode in Panasonic.MODES]
+    TEMPERATURES = [Panasonic.TEMPERATURE_MIN + idx / 2
+                    for idx in range(2 * (Panasonic.TEMPERATURE_MAX - Panasonic.TEMPERATURE_MIN) + 1)]
+    FANS = list(Panasonic.FAN_SETTINGS.keys())
+    SWINGS = list(Panasonic.SWING_SETTINGS.keys())
+
+    RECORD_SIZE = len(Panasonic.FRAME2_DEFAULT) // 8
+
+    _MODE_INDEX = {name: idx for idx, name in enumerate(MODES)}
+    _FAN_INDEX = {name: idx for idx, name in enumerate(FANS)}
+    _SWING_INDEX = {name: idx for idx, name in enumerate(SWINGS)}
+
+    def __init__(self, buffer: bytes | bytearray | mmap.mmap, cmd_frame: bytes):
+        self._buffer = buffer
+        self._view = memoryview(buffer)
+        self.cmd_frame = cmd_frame
+
+    def __len__(self) -> int:
+        return len(self._view) // CommandTable.RECORD_SIZE
+
+    @staticmethod
+    def shape() -> tuple[int, int, int, int]:
+        return (len(CommandTable.MODES), len(CommandTable.TEMPERATURES),
+                len(CommandTable.FANS), len(CommandTable.SWINGS))
+
+    @classmethod
+    def build(cls, base: Panasonic | None = None) -> CommandTable:
+        """Encode every state, starting from the frames of <base>.
+
+        Args:
+            base (Panasonic | None): command providing the bytes not covered
+                by the table (eg timers, on/off). Defaults to Panasonic().
+        """
+        base = base or Panasonic()
+        buffer = bytearray(cls.RECORD_SIZE * len(cls.MODES) * len(cls.TEMPERATURES)
+                           * len(cls.FANS) * len(cls.SWINGS))
+
+        cmd = Panasonic(bytes(base.cmd_frame), bytes(base.data_frame))
+        offset = 0
+        for mode in cls.MODES:
+            cmd.mode = Panasonic.MODES[mode]
+            for temperature in cls.TEMPERATURES:
+                cmd.temperature = temperature
+                for fan in cls.FANS:
+                    cmd.fan = fan
+                    for swing in cls.SWINGS:
+                        cmd.swing = swing
+                        cmd.set_crc()
+                        buffer[offset:offset + cls.RECORD_SIZE] = cmd.data_frame.view(writable=False)
+                        offset += cls.RECORD_SIZE
+
+        return cls(buffer, bytes(base.cmd_frame))
+
+    def save(self, filepath: str | Path) -> None:
+        header = CommandTable.HEADER.pack(
+            CommandTable.MAGIC, CommandTable.VERSION, CommandTable.RECORD_SIZE,
+            *CommandTable.shape(), self.cmd_frame)
+        with open(filepath, "wb") as ofp:
+            ofp.write(header)
+            ofp.write(self._view)
+
+    @classmethod
+    def load(cls, filepath: str | Path) -> CommandTable:
+        """Memory map a table written by save."""
+        with open(filepath, "rb") as ifp:
+            mapped = mmap.mmap(ifp.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, record_size, *shape, cmd_frame = cls.HEADER.unpack_from(mapped)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError(f"Not a command table (version {cls.VERSION}): {filepath}")
+        if record_size != cls.RECORD_SIZE or tuple(shape) != cls.shape():
+            raise ValueError(f"Command table layout does not match Panasonic: {filepath}")
+
+        table = cls(mapped, cmd_frame)
+        table._view = table._view[cls.HEADER.size:]
+        return table
+
+    def index(self, mode: str | Panasonic.MODES, temperature: float, fan: str, swing: str) -> int:
+        """Record index of a state.
+
+        Raises:
+            KeyError: for an unknown mode, fan or swing setting
+            ValueError: for a temperature outside of the half degree steps
+        """
+        if isinstance(mode, Panasonic.MODES):
+            mode = mode.name
+
+        temperature_idx = (temperature - Panasonic.TEMPERATURE_MIN) * 2
+        if temperature_idx % 1 or not 0 <= temperature_idx < len(CommandTable.TEMPERATURES):
+            raise ValueError(f"Temperature not in table: {temperature}")
+
+        _, temperatures, fans, swings = CommandTable.shape()
+        return ((CommandTable._MODE_INDEX[mode] * temperatures + int(temperature_idx)) * fans
+                + CommandTable._FAN_INDEX[fan]) * swings + CommandTable._SWING_INDEX[swing]
+
+    def data_frame(self, mode: str | Panasonic.MODES, temperature: float, fan: str, swing: str) -> memoryview:
+        """Raw data frame of a state, CRC applied."""
+        offset = self.index(mode, temperature, fan, swing) * CommandTable.RECORD_SIZE
+        return self._view[offset:offset + CommandTable.RECORD_SIZE]
+
+    def command(self, mode: str | Panasonic.MODES, temperature: float, fan: str, swing: str) -> Panasonic:
+        return Panasonic(self.cmd_frame, self.data_frame(mode, temperature, fan, swing))
+
+
+if __name__ == "__main__":
+    CommandTable.build().save(sys.argv[1])
@@ -1,16 +1,130 @@
+from __future__ import annotations
 
 import re
 
-from dataclasses import dataclass
+from typing import Any, Iterable
+
+from airconcontroller.controllers.conversion import bits_to_bytes, bytes_to_bits
 
 
-@dataclass
 class Frame:
     """Storage of Frame byte data.
 
-    Data is stored as a string of ints
+    Data is stored as raw bytes. Bits are received LSB first, so bit ``n`` of
+    the frame is bit ``n % 8`` of byte ``n // 8``. The bit list form used by
+    the decoders is still accepted and available through ``data``.
+
+    Values decoded from the bytes may be memoized with ``remember``: each is
+    dropped from ``derived`` as soon as one of the bytes it was decoded from
+    is set.
     """
-    data: list[int]
+    __slots__ = ("_buffer", "_bit_count", "derived", "_dependents")
+
+    def __init__(self, data: Iterable[int] | bytes | bytearray | memoryview = ()):
+        """Create a frame from a list of bit values or from raw bytes.
+
+        Args:
+            data (Iterable[int] | bytes | bytearray | memoryview): list of bit
+                values, or the raw frame bytes
+        """
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            self._buffer = bytearray(data)
+            self._bit_count = len(self._buffer) * 8
+        else:
+            bits = list(data)
+            self._buffer = bytearray(bits_to_bytes(bits))
+            self._bit_count = len(bits)
+
+        self.derived: dict[str, Any] = {}
+        self._dependents: dict[int, set[str]] = {}
+
+    @classmethod
+    def from_bytes(cls, data: bytes | bytearray | memoryview) -> Frame:
+        """Create a frame from raw bytes."""
+        return cls(bytes(data))
+
+    @property
+    def data(self) -> list[int]:
+        """The frame as a list of bit values."""
+        return bytes_to_bits(self._buffer, self._bit_count)
+
+    @data.setter
+    def data(self, bits: list[int]):
+        self._buffer = bytearray(bits_to_bytes(bits))
+        self._bit_count = len(bits)
+        self.forget()
+
+    @property
+    def bit_count(self) -> int:
+        return self._bit_count
+
+    def view(self, writable: bool = True) -> memoryview:
+        """Return a view of the raw frame bytes.
+
+        Writes through the view are not tracked, so a writable view drops
+        every remembered value.
+
+        Args:
+            writable (bool): False for a read only view, keeping the
+                remembered values
+        """
+        if not writable:
+            return memoryview(self._buffer).toreadonly()
+        self.forget()
+        return memoryview(self._buffer)
+
+    def remember(self, name: str, value: Any, byte_nums: Iterable[int]) -> Any:
+        """Memoize <value> in ``derived`` until one of <byte_nums> is set.
+
+        Args:
+            name (str): key of the value in ``derived``
+            value (Any): value decoded from the bytes
+            byte_nums (Iterable[int]): 1-indexed bytes it was decoded from
+
+        Returns:
+            Any: <value>
+        """
+        self.derived[name] = value
+        for byte_num in byte_nums:
+            self._dependents.setdefault(byte_num, set()).add(name)
+        return value
+
+    def forget(self) -> None:
+        """Drop every remembered value."""
+        self.derived.clear()
+        self._dependents.clear()
+
+    def get_byte_value(self, byte_num: int) -> int:
+        """Return specified byte of the frame.
+
+        Bytes beyond the end of a short frame read as 0, as with the bit list.
+
+        Args:
+            byte_num (int): 1-indexed byte index
+
+        Returns:
+            int: byte value
+        """
+        if byte_num > len(self._buffer):
+            return 0
+        return self._buffer[byte_num - 1]
+
+    def set_byte_value(self, byte_num: int, value: int):
+        """Set specified byte of the frame.
+
+        Args:
+            byte_num (int): 1-indexed byte index
+            value (int): byte value
+        """
+        if byte_num > len(self._buffer):
+            self._buffer.extend(bytes(byte_num - len(self._buffer)))
+        self._bit_count = max(self._bit_count, byte_num * 8)
+        self._buffer[byte_num - 1] = value
+
+        names = self._dependents.pop(byte_num, None)
+        if names:
+            for name in names:
+                self.derived.pop(name, None)
 
     def get_byte(self, byte_num: int) -> list[int]:
         """Return specified byte of the frame.
@@ -22,9 +136,8 @@ class Frame:
             list[int]: list of bit values
         """
         start_idx = (byte_num - 1) * 8
-        end_idx = start_idx + 8
-        byte_data_msb = self.data[start_idx:end_idx]
-        return byte_data_msb
+        bit_count = min(max(self._bit_count - start_idx, 0), 8)
+        return bytes_to_bits(self._buffer[byte_num - 1:byte_num], bit_count)
 
     def set_byte(self, byte_num: int, value: list[int]):
         """Set specified byte of the frame.
@@ -33,11 +146,23 @@ class Frame:
             byte_num (int): 1-indexed byte index
             value (list[int]): list of bit values
         """
-        start_idx = (byte_num - 1) * 8
-        end_idx = start_idx + 8
-        self.data[start_idx:end_idx] = value
+        self.set_byte_value(byte_num, bits_to_bytes(value)[0])
+
+    def __bytes__(self) -> bytes:
+        return bytes(self._buffer)
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Frame):
+            return NotImplemented
+        return self._bit_count == other._bit_count and self._buffer == other._buffer
+
+    def __repr__(self) -> str:
+        return f"Frame({bytes(self._buffer)!r})"
 
     def __str__(self) -> str:
         data_str = ''.join([f'{d}' for d in self.data])
         data_str = re.sub(r'([01]{8})', r'\1 ', data_str)
-        return data_str
\ No newline at end of file
+        return data_str
@@ -0,0 +1,58 @@
+"""Precomputed tables for bit/byte conversion.
+
+Frame bits are received LSB first, so the bit list of a byte value ``v`` is
+``[v & 1, (v >> 1) & 1, ..., (v >> 7) & 1]``. Every table is built once at
+import and indexed by the byte value (or bit tuple), replacing per call
+string formatting and ``int(..., base=2)`` parsing.
+"""
+from __future__ import annotations
+
+from itertools import product
+
+
+# byte value -> bit tuple (LSB first)
+BYTE_TO_BITS: tuple[tuple[int, ...], ...] = tuple(
+    tuple((value >> idx) & 1 for idx in range(8)) for value in range(256)
+)
+
+# bit tuple (LSB first, 0 to 8 bits long) -> value
+BITS_TO_BYTE: dict[tuple[int, ...], int] = {
+    bits: sum(bit << idx for idx, bit in enumerate(bits))
+    for length in range(9)
+    for bits in product((0, 1), repeat=length)
+}
+
+# byte value -> nibble
+LOW_NIBBLE: tuple[int, ...] = tuple(value & 0x0F for value in range(256))
+HIGH_NIBBLE: tuple[int, ...] = tuple(value >> 4 for value in range(256))
+
+
+def int_to_bits(value: int, width: int = 8) -> list[int]:
+    """Convert int to a list of <width> bit values, LSB first."""
+    if 0 <= value < 256 and width <= 8:
+        return list(BYTE_TO_BITS[value][:max(width, value.bit_length())])
+    return [(value >> idx) & 1 for idx in range(max(width, value.bit_length()))]
+
+
+def bits_to_int(bits: list[int]) -> int:
+    """Convert a list of bit values, LSB first, to int."""
+    if len(bits) <= 8:
+        return BITS_TO_BYTE[tuple(bits)]
+    return sum(bit << idx for idx, bit in enumerate(bits))
+
+
+def bits_to_bytes(bits: list[int]) -> bytes:
+    """Pack a list of bit values (LSB first) into bytes."""
+    return bytes([BITS_TO_BYTE[tuple(bits[idx:idx + 8])] for idx in range(0, len(bits), 8)])
+
+
+def bytes_to_bits(data: bytes | bytearray | memoryview, bit_count: int | None = None) -> list[int]:
+    """Unpack bytes into a list of bit values (LSB first)."""
+    bits: list[int] = []
+    for value in data:
+        bits.extend(BYTE_TO_BITS[value])
+
+    if bit_count is not None:
+        del bits[bit_count:]
+
+    return bits
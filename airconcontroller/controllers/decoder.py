@@ -0,0 +1,512 @@
+"""Vectorised decoding of LIRC mode2 captures.
+
+A mode2 capture is a stream of ``pulse <us>``, ``space <us>`` and
+``timeout <us>`` lines. Rather than testing every space event in turn, blocks
+of the capture are tokenised into integer arrays and every symbol is
+classified against the protocol timing windows in a single pass.
+"""
+from __future__ import annotations
+
+from typing import Any, Iterable, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from airconcontroller.controllers.instrumentation import timed
+
+
+# Event codes
+EVENT_PULSE = 0
+EVENT_SPACE = 1
+EVENT_TIMEOUT = 2
+EVENT_BANNER = 3
+EVENT_INVALID = 4
+
+EVENT_CODES = {
+    "pulse": EVENT_PULSE,
+    "space": EVENT_SPACE,
+    "timeout": EVENT_TIMEOUT,
+}
+
+EVENT_NAMES = {event: name for name, event in EVENT_CODES.items()}
+
+# mode2 prints this line on start-up, before any symbol is received.
+BANNER_PREFIX = "Running"
+
+# Longest duration converted exactly by the bulk tokenizer
+MAX_DIGITS = 15
+_POWERS_OF_TEN = 10.0 ** np.arange(MAX_DIGITS + 1)
+
+# Lines buffered by the stream decoder before a block is decoded
+BLOCK_SIZE = 4096
+
+# Symbol codes (BIT0, BIT1 and INVALID match ``Panasonic.get_value``)
+SYMBOL_NONE = -1
+SYMBOL_BIT0 = 0
+SYMBOL_BIT1 = 1
+SYMBOL_INVALID = 2
+SYMBOL_HEADER = 3
+SYMBOL_END_OF_FRAME = 4
+
+
+@timed("decode.tokenize")
+def tokenize(lines: Sequence[str]) -> tuple[np.ndarray, np.ndarray]:
+    """Convert mode2 lines to event and duration arrays.
+
+    Canonical ``<event> <digits>`` lines are converted in bulk on a byte view
+    of the capture; anything else falls back to the line by line rules.
+
+    Args:
+        lines (Sequence[str]): mode2 lines, without line endings
+
+    Raises:
+        ValueError: if a pulse/space/timeout duration is not an integer
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: event codes and durations (us)
+    """
+    count = len(lines)
+    events = np.full(count, EVENT_INVALID, dtype=np.int8)
+    durations = np.zeros(count, dtype=np.int64)
+    if not count:
+        return events, durations
+
+    # Padded so the keyword comparison may look past the final line
+    raw = ("\n".join(lines) + "\n").encode()
+    buf = np.frombuffer(raw + bytes(8), dtype=np.uint8)
+    ends = np.flatnonzero(buf == 0x0A)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+
+    value_starts = ends.copy()
+    for word, event in EVENT_CODES.items():
+        matched = np.ones(count, dtype=bool)
+        for offset, char in enumerate(f"{word} ".encode()):
+            matched &= buf[starts + offset] == char
+        events[matched] = event
+        value_starts[matched] = starts[matched] + len(word) + 1
+
+    digit_pos = np.flatnonzero((buf >= 0x30) & (buf <= 0x39))
+    digit_line = np.searchsorted(ends, digit_pos)
+    in_value = digit_pos >= value_starts[digit_line]
+    digit_pos = digit_pos[in_value]
+    digit_line = digit_line[in_value]
+
+    digit_count = np.bincount(digit_line, minlength=count)
+    canonical = (digit_count == ends - value_starts) & (digit_count > 0) & (digit_count <= MAX_DIGITS)
+    exponents = np.minimum(ends[digit_line] - digit_pos - 1, MAX_DIGITS)
+    weights = (buf[digit_pos] - 0x30) * _POWERS_OF_TEN[exponents]
+    durations[:] = np.bincount(digit_line, weights=weights, minlength=count)
+    events[~canonical] = EVENT_INVALID
+    durations[~canonical] = 0
+
+    for idx in np.flatnonzero(~canonical).tolist():
+        fields = lines[idx].split(" ")
+        if len(fields) == 2 and fields[0] in EVENT_CODES:
+            events[idx] = EVENT_CODES[fields[0]]
+            durations[idx] = int(fields[1])
+        elif fields[0] == BANNER_PREFIX:
+            events[idx] = EVENT_BANNER
+
+    return events, durations
+
+
+# Pulse classes of TimingThresholds
+PULSE_MARK = 0
+PULSE_HEADER = 1
+PULSE_NONE = 2
+
+# Space classes of TimingThresholds
+SPACE_ZERO = 0
+SPACE_ONE = 1
+SPACE_HEADER = 2
+SPACE_END_OF_FRAME = 3
+SPACE_NONE = 4
+
+PULSE_CLASSES = {"MARK": PULSE_MARK, "HEADER": PULSE_HEADER}
+SPACE_CLASSES = {"SPACE0": SPACE_ZERO, "SPACE1": SPACE_ONE,
+                 "HEADERSPACE": SPACE_HEADER, "ENDOFFRAMESPACE": SPACE_END_OF_FRAME}
+
+# Symbol of each (pulse class, space class) pair
+_SYMBOL_TABLE = np.full((PULSE_NONE + 1, SPACE_NONE + 1), SYMBOL_INVALID, dtype=np.int8)
+_SYMBOL_TABLE[PULSE_MARK, SPACE_ZERO] = SYMBOL_BIT0
+_SYMBOL_TABLE[PULSE_MARK, SPACE_ONE] = SYMBOL_BIT1
+_SYMBOL_TABLE[PULSE_MARK, SPACE_END_OF_FRAME] = SYMBOL_END_OF_FRAME
+_SYMBOL_TABLE[PULSE_HEADER, SPACE_HEADER] = SYMBOL_HEADER
+
+Window = Tuple[int, int]
+
+
+def _window_edges(windows: dict[int, Window], invalid: int) -> tuple[np.ndarray, np.ndarray]:
+    """Sorted searchsorted edges of inclusive windows, and the class of each bin.
+
+    Windows are ordered by their centre and overlapping windows are split
+    at the midpoint of the overlap.
+    """
+    ordered = sorted(windows.items(), key=lambda item: sum(item[1]))
+    edges = np.array([bound for _, (low, high) in ordered for bound in (low, high + 1)], dtype=np.int64)
+    for idx in range(1, len(edges) - 1, 2):
+        if edges[idx] > edges[idx + 1]:
+            edges[idx] = edges[idx + 1] = (edges[idx] + edges[idx + 1]) // 2
+    np.maximum.accumulate(edges, out=edges)
+
+    lookup = np.full(len(edges) + 1, invalid, dtype=np.int8)
+    lookup[1::2] = [cls for cls, _ in ordered]
+    return edges, lookup
+
+
+class TimingThresholds:
+    """Pulse and space classification windows.
+
+    Each duration is classified with a single ``np.searchsorted`` against
+    the sorted window edges: odd bins fall within a window, even bins
+    between windows and are invalid.
+
+    Windows are inclusive (low, high) durations keyed by the pulse classes
+    (PULSE_MARK, PULSE_HEADER) and space classes (SPACE_ZERO, SPACE_ONE,
+    SPACE_HEADER, SPACE_END_OF_FRAME). Missing classes never match.
+    """
+
+    def __init__(self, pulses: dict[int, Window], spaces: dict[int, Window]):
+        self.pulses = dict(pulses)
+        self.spaces = dict(spaces)
+        self._pulse_edges, self._pulse_lookup = _window_edges(self.pulses, PULSE_NONE)
+        self._space_edges, self._space_lookup = _window_edges(self.spaces, SPACE_NONE)
+
+    @classmethod
+    def from_protocol(cls, protocol: Any) -> TimingThresholds:
+        """Nominal windows, each timing constant +/- protocol.DELTA."""
+        delta = protocol.DELTA
+        return cls(
+            {cls_: (getattr(protocol, name) - delta, getattr(protocol, name) + delta)
+             for name, cls_ in (("MARK", PULSE_MARK), ("HEADER", PULSE_HEADER))},
+            {cls_: (getattr(protocol, name) - delta, getattr(protocol, name) + delta)
+             for name, cls_ in SPACE_CLASSES.items()})
+
+    def classify_pulses(self, durations: np.ndarray) -> np.ndarray:
+        return self._pulse_lookup[np.searchsorted(self._pulse_edges, durations, side="right")]
+
+    def classify_spaces(self, durations: np.ndarray) -> np.ndarray:
+        return self._space_lookup[np.searchsorted(self._space_edges, durations, side="right")]
+
+    def to_dict(self) -> dict[str, dict[str, list[int]]]:
+        """Windows keyed by the protocol constant names, eg for JSON."""
+        return {
+            "pulses": {name: list(self.pulses[cls_]) for name, cls_ in PULSE_CLASSES.items() if cls_ in self.pulses},
+            "spaces": {name: list(self.spaces[cls_]) for name, cls_ in SPACE_CLASSES.items() if cls_ in self.spaces},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, dict[str, Sequence[int]]]) -> TimingThresholds:
+        return cls({PULSE_CLASSES[name]: tuple(window) for name, window in data["pulses"].items()},
+                   {SPACE_CLASSES[name]: tuple(window) for name, window in data["spaces"].items()})
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, TimingThresholds):
+            return NotImplemented
+        return self.pulses == other.pulses and self.spaces == other.spaces
+
+    def __repr__(self) -> str:
+        return f"TimingThresholds({self.to_dict()})"
+
+
+def _last_of(mask: np.ndarray, durations: np.ndarray, initial: int = 0) -> np.ndarray:
+    """Duration of the most recent masked event at or before each index."""
+    last_idx = np.where(mask, np.arange(len(mask)), -1)
+    np.maximum.accumulate(last_idx, out=last_idx)
+    return np.where(last_idx >= 0, durations[last_idx], initial)
+
+
+@timed("decode.classify")
+def classify(events: np.ndarray, durations: np.ndarray, protocol: Any,
+             initial_pulse: int = 0, thresholds: TimingThresholds | None = None) -> np.ndarray:
+    """Classify every space event against the protocol timing windows.
+
+    Each space is paired with the most recent pulse, as the line by line
+    parser does.
+
+    Args:
+        events (np.ndarray): event codes
+        durations (np.ndarray): event durations (us)
+        protocol (Any): class providing the timing constants (eg Panasonic)
+        initial_pulse (int): pulse duration in effect before the first event
+        thresholds (TimingThresholds | None): windows to classify against,
+            eg from calibration.calibrate. Defaults to the nominal windows.
+
+    Returns:
+        np.ndarray: symbol code for each event, SYMBOL_NONE for non-spaces
+    """
+    thresholds = thresholds or TimingThresholds.from_protocol(protocol)
+    pulses = _last_of(events == EVENT_PULSE, durations, initial_pulse)
+
+    symbols = _SYMBOL_TABLE[thresholds.classify_pulses(pulses), thresholds.classify_spaces(durations)]
+    symbols[events != EVENT_SPACE] = SYMBOL_NONE
+
+    return symbols
+
+
+FramePair = Tuple[List[int], List[int]]
+
+
+class Mode2Decoder:
+    """Incremental decoder for a mode2 stream.
+
+    Lines are decoded in blocks, each block classified in one vectorised
+    pass. The pulse, frame index and partially received frame pair are kept
+    between blocks, so a capture may be fed in any number of pieces and
+    memory is bounded by the block size rather than the stream length.
+
+    A frame pair is closed by each ``timeout``; the frame index toggles on
+    every end-of-frame space and every timeout.
+    """
+
+    def __init__(self, protocol: Any, block_size: int = BLOCK_SIZE,
+                 thresholds: TimingThresholds | None = None):
+        self.protocol = protocol
+        self.block_size = block_size
+        self.thresholds = thresholds or TimingThresholds.from_protocol(protocol)
+
+        self._pulse_duration = 0
+        self._space_duration = 0
+        self._frame_idx = 0
+        self._frames: FramePair = ([], [])
+        self._line_idx = 0
+        self._block: list[str] = []
+        self._partial = ""
+
+    @property
+    def frame_idx(self) -> int:
+        """Frame the next bit is added to, toggled by each end-of-frame space and timeout."""
+        return self._frame_idx
+
+    def resume(self, line_idx: int, pulse_duration: int = 0, space_duration: int = 0) -> None:
+        """Start decoding part way through a capture, just after a timeout.
+
+        Only the state a timeout does not reset is restored, so errors are
+        reported against the position in the whole capture. The frame index
+        is not known without decoding everything before: a part starting at
+        an odd frame index has the frames of each pair swapped.
+
+        Args:
+            line_idx (int): line (event) index of the first event to decode
+            pulse_duration (int): last pulse duration before it
+            space_duration (int): last space duration before it
+        """
+        self._line_idx = line_idx
+        self._pulse_duration = pulse_duration
+        self._space_duration = space_duration
+
+    def decode(self, lines: Sequence[str]) -> list[FramePair]:
+        """Decode a block of complete lines.
+
+        Args:
+            lines (Sequence[str]): mode2 lines, without line endings
+
+        Raises:
+            ValueError: on the first symbol outside of the timing windows
+
+        Returns:
+            list[FramePair]: frame pairs completed within the block
+        """
+        return self._join_pairs(*self.decode_block(lines)[:2])
+
+    def decode_symbols(self, events: np.ndarray, durations: np.ndarray,
+                       lines: Sequence[str] | None = None) -> list[FramePair]:
+        """Decode a block of already tokenised events, eg a binary capture.
+
+        Args:
+            events (np.ndarray): event codes
+            durations (np.ndarray): event durations (us)
+            lines (Sequence[str] | None): source lines, quoted in errors
+
+        Raises:
+            ValueError: on the first symbol outside of the timing windows
+
+        Returns:
+            list[FramePair]: frame pairs completed within the block
+        """
+        return self._join_pairs(*self.decode_events(events, durations, lines)[:2])
+
+    @timed("decode.frames")
+    def _join_pairs(self, bits: np.ndarray, counts: np.ndarray) -> list[FramePair]:
+        bits = bits.tolist()
+        offsets = np.concatenate(([0], np.cumsum(counts))).tolist()
+
+        pairs = [
+            (bits[offsets[2 * p]:offsets[2 * p + 1]], bits[offsets[2 * p + 1]:offsets[2 * p + 2]])
+            for p in range(len(counts) // 2)
+        ]
+        self._frames[0].extend(pairs[0][0])
+        self._frames[1].extend(pairs[0][1])
+        pairs[0] = self._frames
+        self._frames = pairs.pop()
+
+        return pairs
+
+    def decode_block(self, lines: Sequence[str]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Decode a block of complete lines into bit arrays.
+
+        Bits of the pair left incomplete by the previous block are not
+        included, use decode to have them joined.
+
+        Args:
+            lines (Sequence[str]): mode2 lines, without line endings
+
+        Raises:
+            ValueError: on the first symbol outside of the timing windows
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray]: bits of every frame
+                back to back; bit count of each frame (frame1 and frame2 of
+                each pair, the last pair being incomplete); and the line
+                index each pair starts at
+        """
+        events, durations = tokenize(lines)
+        return self.decode_events(events, durations, lines)
+
+    def decode_events(self, events: np.ndarray, durations: np.ndarray,
+                      lines: Sequence[str] | None = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Decode a block of tokenised events into bit arrays, see decode_block.
+
+        Args:
+            events (np.ndarray): event codes
+            durations (np.ndarray): event durations (us)
+            lines (Sequence[str] | None): source lines, quoted in errors
+        """
+        durations = durations.astype(np.int64, copy=False)
+        symbols = classify(events, durations, self.protocol, self._pulse_duration, self.thresholds)
+        self._raise_first_error(lines, events, durations, symbols)
+
+        is_timeout = events == EVENT_TIMEOUT
+        toggles = is_timeout | (symbols == SYMBOL_END_OF_FRAME)
+        is_bit = (symbols == SYMBOL_BIT0) | (symbols == SYMBOL_BIT1)
+
+        # Frame index and pair index in effect at each event
+        frame_idx = (self._frame_idx + np.cumsum(toggles) - toggles) % 2
+        pair_idx = np.cumsum(is_timeout) - is_timeout
+
+        pair_count = int(is_timeout.sum())
+        keys = (pair_idx * 2 + frame_idx)[is_bit]
+        bits = symbols[is_bit][np.argsort(keys, kind="stable")]
+        counts = np.bincount(keys, minlength=2 * (pair_count + 1))
+        pair_starts = self._line_idx + np.concatenate(([0], np.flatnonzero(is_timeout) + 1))
+
+        self._frame_idx = (self._frame_idx + int(toggles.sum())) % 2
+        self._line_idx += len(events)
+        self._pulse_duration = self._last_duration(events, durations, EVENT_PULSE, self._pulse_duration)
+        self._space_duration = self._last_duration(events, durations, EVENT_SPACE, self._space_duration)
+
+        return bits, counts, pair_starts
+
+    def feed_line(self, line: str | bytes) -> list[FramePair]:
+        """Add a single line, decoding once a frame pair may be complete."""
+        if isinstance(line, bytes):
+            line = line.decode()
+        line = line.rstrip("\r\n")
+
+        self._block.append(line)
+        if len(self._block) < self.block_size and not line.startswith("timeout"):
+            return []
+
+        return self.flush()
+
+    def feed(self, chunk: str | bytes) -> list[FramePair]:
+        """Add an arbitrary chunk of the stream, eg as read from a pipe."""
+        if isinstance(chunk, bytes):
+            chunk = chunk.decode()
+
+        lines = (self._partial + chunk).split("\n")
+        self._partial = lines.pop()
+
+        pairs = []
+        for line in lines:
+            pairs.extend(self.feed_line(line))
+
+        return pairs
+
+    def flush(self) -> list[FramePair]:
+        """Decode any buffered lines."""
+        block, self._block = self._block, []
+        if not block:
+            return []
+
+        return self.decode(block)
+
+    def close(self) -> list[FramePair]:
+        """Decode the remainder of the stream, including an unterminated line."""
+        if self._partial:
+            self._block.append(self._partial.rstrip("\r"))
+            self._partial = ""
+
+        return self.flush()
+
+    def _raise_first_error(self, lines: Sequence[str] | None, events: np.ndarray,
+                           durations: np.ndarray, symbols: np.ndarray) -> None:
+        """Raise the same ValueError the line by line parser would raise first."""
+        errors = np.flatnonzero((symbols == SYMBOL_INVALID) | (events == EVENT_INVALID))
+        if not len(errors):
+            return
+
+        idx = int(errors[0])
+        if lines is not None:
+            line = lines[idx]
+        else:
+            line = f"{EVENT_NAMES.get(int(events[idx]), '?')} {durations[idx]}"
+        line_idx = self._line_idx + idx
+        pulse_duration = self._last_duration(events[:idx + 1], durations, EVENT_PULSE, self._pulse_duration)
+        space_duration = self._last_duration(events[:idx + 1], durations, EVENT_SPACE, self._space_duration)
+
+        if events[idx] == EVENT_SPACE:
+            raise ValueError(f"Bit value error at: ln{line_idx:>4}: {line} [{pulse_duration}, {space_duration}]")
+
+        raise ValueError(f"Error of some sort at: ln{line_idx:>4}: {line} [{pulse_duration}, {space_duration}]")
+
+    @staticmethod
+    def _last_duration(events: np.ndarray, durations: np.ndarray, event: int, default: int) -> int:
+        indices = np.flatnonzero(events == event)
+        if not len(indices):
+            return default
+        return int(durations[indices[-1]])
+
+
+def decode_lines(lines: Sequence[str], protocol: Any,
+                 thresholds: TimingThresholds | None = None) -> list[FramePair]:
+    """Decode a complete capture into (frame1, frame2) bit lists.
+
+    Args:
+        lines (Sequence[str]): mode2 lines, without line endings
+        protocol (Any): class providing the timing constants (eg Panasonic)
+        thresholds (TimingThresholds | None): windows to classify against
+
+    Raises:
+        ValueError: on the first symbol outside of the timing windows
+
+    Returns:
+        list[FramePair]: bit lists of each complete pair
+    """
+    return Mode2Decoder(protocol, thresholds=thresholds).decode(lines)
+
+
+def iter_decode(source: Iterable[str | bytes], protocol: Any, chunked: bool = False,
+                block_size: int = BLOCK_SIZE, thresholds: TimingThresholds | None = None) -> Iterator[FramePair]:
+    """Decode an unbounded mode2 stream, yielding each pair once complete.
+
+    Args:
+        source (Iterable[str | bytes]): lines (eg a file object), or arbitrary
+            chunks of the stream when ``chunked`` is set
+        protocol (Any): class providing the timing constants (eg Panasonic)
+        chunked (bool): items of ``source`` are not aligned to lines
+        block_size (int): maximum number of lines decoded per block
+        thresholds (TimingThresholds | None): windows to classify against
+
+    Raises:
+        ValueError: on the first symbol outside of the timing windows
+
+    Yields:
+        FramePair: bit lists of each complete pair
+    """
+    decoder = Mode2Decoder(protocol, block_size, thresholds)
+    feed = decoder.feed if chunked else decoder.feed_line
+
+    for item in source:
+        yield from feed(item)
+
+    yield from decoder.close()
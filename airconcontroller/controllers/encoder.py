@@ -0,0 +1,92 @@
+"""Encoding of frames into pulse/space timings.
+
+Each bit is sent as a MARK pulse followed by a SPACE0 or SPACE1 space, LSB
+first. Frames start with a HEADER/HEADERSPACE pair, are separated by a
+MARK/ENDOFFRAMESPACE pair and the last frame ends with a single MARK.
+"""
+from __future__ import annotations
+
+from array import array
+from functools import lru_cache
+from typing import Any
+
+from airconcontroller.controllers.conversion import BYTE_TO_BITS
+from airconcontroller.controllers.instrumentation import timed
+
+
+# Typecode of the timing arrays (uint32, us)
+TIMING_TYPECODE = "I"
+
+# Number of distinct frame sets kept by the encoder cache
+ENCODE_CACHE_SIZE = 256
+
+
+def timing_count(bit_counts: tuple[int, ...]) -> int:
+    """Number of pulses and spaces needed to send frames of <bit_counts>."""
+    return sum(2 + 2 * bits for bits in bit_counts) + 2 * (len(bit_counts) - 1) + 1
+
+
+@lru_cache(maxsize=None)
+def _byte_timings(protocol: Any) -> tuple[array, ...]:
+    """MARK/SPACE pairs of every byte value, indexed by value."""
+    spaces = (protocol.SPACE0, protocol.SPACE1)
+    return tuple(
+        array(TIMING_TYPECODE, [t for bit in BYTE_TO_BITS[value] for t in (protocol.MARK, spaces[bit])])
+        for value in range(256)
+    )
+
+
+@lru_cache(maxsize=ENCODE_CACHE_SIZE)
+def _encode(frames: tuple[tuple[bytes, int], ...], protocol: Any) -> array:
+    byte_timings = _byte_timings(protocol)
+    spaces = (protocol.SPACE0, protocol.SPACE1)
+
+    timings = array(TIMING_TYPECODE, [0]) * timing_count(tuple(bits for _, bits in frames))
+    pos = 0
+    for frame_idx, (data, bit_count) in enumerate(frames):
+        if frame_idx:
+            timings[pos:pos + 2] = array(TIMING_TYPECODE, (protocol.MARK, protocol.ENDOFFRAMESPACE))
+            pos += 2
+
+        timings[pos:pos + 2] = array(TIMING_TYPECODE, (protocol.HEADER, protocol.HEADERSPACE))
+        pos += 2
+
+        full_bytes, extra_bits = divmod(bit_count, 8)
+        for value in data[:full_bytes]:
+            timings[pos:pos + 16] = byte_timings[value]
+            pos += 16
+
+        if extra_bits:
+            for bit in BYTE_TO_BITS[data[full_bytes]][:extra_bits]:
+                timings[pos:pos + 2] = array(TIMING_TYPECODE, (protocol.MARK, spaces[bit]))
+                pos += 2
+
+    timings[pos] = protocol.MARK
+
+    return timings
+
+
+@timed("encode")
+def encode_timings(frames: tuple[tuple[bytes, int], ...], protocol: Any) -> array:
+    """Encode frames as alternating pulse/space durations.
+
+    Encodings are cached by frame content, so repeatedly sending the same
+    command state only costs a copy.
+
+    Args:
+        frames (tuple[tuple[bytes, int], ...]): raw bytes and bit count of
+            each frame, in transmission order
+        protocol (Any): class providing the timing constants (eg Panasonic)
+
+    Returns:
+        array: pulse/space durations (us), starting and ending with a pulse
+    """
+    return array(TIMING_TYPECODE, _encode(frames, protocol))
+
+
+def timings_to_mode2(timings: array, timeout: int | None = None) -> str:
+    """Format pulse/space durations as mode2 text."""
+    lines = [f"{'space' if idx % 2 else 'pulse'} {duration}" for idx, duration in enumerate(timings)]
+    if timeout is not None:
+        lines.append(f"timeout {timeout}")
+    return "\n".join(lines) + "\n"
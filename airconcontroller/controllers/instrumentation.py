@@ -0,0 +1,164 @@
+"""Opt-in timing of the decode and encode stages.
+
+Hot functions are wrapped with ``timed(stage)``. While instrumentation is
+disabled, the default, the wrapper only tests a flag before calling through.
+Once enabled every call records its count, cumulative time and a latency
+histogram under its stage name. Stages nest, a stage's time includes that of
+the stages it calls (eg decode.read includes decode.tokenize).
+
+    instrumentation.enable()
+    Panasonic.parse_file("data/cool_set.dat")
+    print(instrumentation.to_prometheus())
+
+Set AIRCON_INSTRUMENT=1 to enable it from the start of the process.
+"""
+from __future__ import annotations
+
+import os
+
+from bisect import bisect_left
+from functools import wraps
+from time import perf_counter
+from typing import Any, Callable, TypeVar
+
+
+# Environment variable enabling instrumentation at import
+ENV_VAR = "AIRCON_INSTRUMENT"
+
+# Histogram bucket upper bounds (s), an implicit +Inf bucket follows
+BUCKETS = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 1e-2, 5e-2, 0.1, 0.5, 1.0)
+
+# Prefix of the exported Prometheus metric names
+METRIC_PREFIX = "airconcontroller"
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_enabled = os.environ.get(ENV_VAR, "") not in ("", "0")
+
+
+class StageStats:
+    """Calls, cumulative time (s) and histogram of one stage."""
+    __slots__ = ("count", "total", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.buckets[bisect_left(BUCKETS, seconds)] += 1
+
+    def to_dict(self) -> dict[str, Any]:
+        """Count, total and mean time, and cumulative bucket counts keyed by bound."""
+        cumulative = 0
+        histogram = {}
+        for bound, count in zip((*BUCKETS, float("inf")), self.buckets):
+            cumulative += count
+            histogram[_format_bound(bound)] = cumulative
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "histogram": histogram,
+        }
+
+
+_stats: dict[str, StageStats] = {}
+
+
+def enable() -> None:
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset() -> None:
+    """Drop everything recorded so far."""
+    _stats.clear()
+
+
+def record(stage: str, seconds: float) -> None:
+    """Record one call of <stage> taking <seconds>, whether enabled or not."""
+    stats = _stats.get(stage)
+    if stats is None:
+        stats = _stats[stage] = StageStats()
+    stats.add(seconds)
+
+
+def timed(stage: str) -> Callable[[F], F]:
+    """Decorator recording each call of the function under <stage> while enabled."""
+    def decorate(func: F) -> F:
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(stage, perf_counter() - start)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorate
+
+
+class span:
+    """Context manager recording the time of a block under <stage> while enabled.
+
+        with span("decode.commands"):
+            ...
+    """
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.start = 0.0
+
+    def __enter__(self) -> span:
+        if _enabled:
+            self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        if _enabled and self.start:
+            record(self.stage, perf_counter() - self.start)
+
+
+def stats(stage: str) -> StageStats | None:
+    return _stats.get(stage)
+
+
+def to_dict() -> dict[str, dict[str, Any]]:
+    """Statistics of every stage called while enabled, by stage name."""
+    return {stage: _stats[stage].to_dict() for stage in sorted(_stats)}
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+def to_prometheus(prefix: str = METRIC_PREFIX) -> str:
+    """Statistics in the Prometheus text exposition format, one histogram
+    labelled by stage."""
+    name = f"{prefix}_stage_seconds"
+    lines = [
+        f"# HELP {name} Time spent in each decode/encode stage.",
+        f"# TYPE {name} histogram",
+    ]
+    for stage, data in to_dict().items():
+        for bound, count in data["histogram"].items():
+            lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {count}')
+        lines.append(f'{name}_sum{{stage="{stage}"}} {data["total"]!r}')
+        lines.append(f'{name}_count{{stage="{stage}"}} {data["count"]}')
+    return "\n".join(lines) + "\n"
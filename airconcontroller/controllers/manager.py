@@ -0,0 +1,200 @@
+"""Multi-unit controller manager.
+
+A UnitManager owns the Panasonic state of every unit on a site and sends it
+through a TransmitterPool: a few transmitter backends (eg IR blasters), each
+fronted by a TransmitScheduler. Every unit is bound to one backend. All of
+it runs on the event loop, a unit is only a dict entry, so hundreds of
+units need no threads.
+
+Group commands encode each distinct resulting state once, units left in
+the same state share the timings:
+
+    pool = TransmitterPool([blaster1, blaster2])
+    async with UnitManager(pool) as manager:
+        for name in ("lounge", "office", "lab"):
+            manager.add_unit(name)
+        await manager.broadcast(mode="COOL", temperature=24)
+"""
+from __future__ import annotations
+
+import asyncio
+
+from array import array
+from dataclasses import dataclass, field
+from itertools import cycle
+from typing import Any, Hashable, Iterable, Sequence
+
+from airconcontroller.controllers.panasonic import Panasonic
+from airconcontroller.controllers.scheduler import MIN_GAP, TransmitScheduler, Transmitter
+
+
+class TransmitterPool:
+    """Transmitter backends, each behind its own TransmitScheduler.
+
+    Args:
+        transmitters (Sequence[Transmitter]): backends, at least one
+        min_gap (float): minimum idle time between transmissions of a backend (s)
+        skip_unchanged (bool): suppress commands identical to the last one
+            sent to their unit
+    """
+
+    def __init__(self, transmitters: Sequence[Transmitter], min_gap: float = MIN_GAP, skip_unchanged: bool = True):
+        if not transmitters:
+            raise ValueError("A transmitter pool needs at least one transmitter")
+        self.schedulers = [TransmitScheduler(transmitter, min_gap, skip_unchanged) for transmitter in transmitters]
+        self._next = cycle(range(len(self.schedulers)))
+
+    def __len__(self) -> int:
+        return len(self.schedulers)
+
+    @property
+    def transmitters(self) -> list[Transmitter]:
+        return [scheduler.transmitter for scheduler in self.schedulers]
+
+    def next_backend(self) -> int:
+        """Backend index for a new unit, round robin."""
+        return next(self._next)
+
+    def start(self) -> None:
+        for scheduler in self.schedulers:
+            scheduler.start()
+
+    async def stop(self, drain: bool = True) -> None:
+        await asyncio.gather(*(scheduler.stop(drain) for scheduler in self.schedulers))
+
+    async def join(self) -> None:
+        await asyncio.gather(*(scheduler.join() for scheduler in self.schedulers))
+
+    def metrics(self) -> list[dict[str, Any]]:
+        return [scheduler.metrics.to_dict() for scheduler in self.schedulers]
+
+
+@dataclass
+class Unit:
+    """A managed AC unit, bound to backend <backend> of the pool."""
+    name: Hashable
+    backend: int
+    state: Panasonic = field(default_factory=Panasonic)
+
+
+@dataclass
+class ManagerMetrics:
+    commands: int = 0   # unit commands submitted
+    encoded: int = 0    # states encoded to timings
+
+    def to_dict(self) -> dict[str, int]:
+        return {"commands": self.commands, "encoded": self.encoded}
+
+
+class UnitManager:
+    """Per unit Panasonic state sent through a shared TransmitterPool.
+
+    Args:
+        pool (TransmitterPool): backends the units are bound to
+    """
+
+    def __init__(self, pool: TransmitterPool):
+        self.pool = pool
+        self.units: dict[Hashable, Unit] = {}
+        self.metrics = ManagerMetrics()
+
+    def add_unit(self, name: Hashable, backend: int | None = None, state: Panasonic | None = None) -> Unit:
+        """Manage a new unit.
+
+        Args:
+            name (Hashable): unit name, unique within the manager
+            backend (int | None): pool backend index, default round robin
+            state (Panasonic | None): current state of the unit, default OFF
+
+        Raises:
+            KeyError: for a name already managed
+            IndexError: for a backend outside of the pool
+        """
+        if name in self.units:
+            raise KeyError(f"Unit already managed: {name}")
+        if backend is None:
+            backend = self.pool.next_backend()
+        elif not 0 <= backend < len(self.pool):
+            raise IndexError(f"No backend {backend} in a pool of {len(self.pool)}")
+
+        unit = Unit(name, backend, state if state is not None else Panasonic())
+        self.units[name] = unit
+        return unit
+
+    def remove_unit(self, name: Hashable) -> Unit:
+        return self.units.pop(name)
+
+    def __len__(self) -> int:
+        return len(self.units)
+
+    def __getitem__(self, name: Hashable) -> Unit:
+        return self.units[name]
+
+    def set(self, name: Hashable, **settings: Any) -> asyncio.Future:
+        """Change the given settings of one unit and queue its state for sending.
+
+        Unlike broadcast, only the given settings change: a unit that is
+        OFF stays OFF unless power="ON" is given.
+
+        Args:
+            name (Hashable): unit to change
+            **settings: see Panasonic.check_settings
+
+        Returns:
+            asyncio.Future: resolved once the unit state has been transmitted
+
+        Raises:
+            ValueError: for an unknown setting or an invalid value
+            KeyError: for a unit not managed
+        """
+        settings = Panasonic.check_settings(settings)
+        return self._apply([self.units[name]], settings)
+
+    def broadcast(self, names: Iterable[Hashable] | None = None, **settings: Any) -> asyncio.Future:
+        """Change the state of several units, by default all, and queue them.
+
+        Each distinct resulting state is encoded once and its timings shared
+        by every unit left in that state. Units are switched on unless
+        power="OFF" is given. The settings are checked before any unit is
+        changed.
+
+        Args:
+            names (Iterable[Hashable] | None): units to change, default all
+            **settings: see Panasonic.check_settings
+
+        Returns:
+            asyncio.Future: resolved once every unit state has been transmitted
+
+        Raises:
+            ValueError: for an unknown setting or an invalid value
+            KeyError: for a unit not managed
+        """
+        settings = Panasonic.check_settings({"power": "ON", **settings})
+        units = list(self.units.values()) if names is None else [self.units[name] for name in names]
+        return self._apply(units, settings)
+
+    def _apply(self, units: list[Unit], settings: dict[str, Any]) -> asyncio.Future:
+        """Update <units> with the checked <settings> and submit their states."""
+        encoded: dict[tuple[bytes, bytes], array] = {}
+        waiters = []
+        for unit in units:
+            unit.state.update(**settings)
+            key = (bytes(unit.state.cmd_frame), bytes(unit.state.data_frame))
+            timings = encoded.get(key)
+            if timings is None:
+                timings = encoded[key] = unit.state.to_timings()
+            waiters.append(self.pool.schedulers[unit.backend].submit(unit.name, unit.state, timings))
+
+        self.metrics.commands += len(units)
+        self.metrics.encoded += len(encoded)
+        return asyncio.gather(*waiters)
+
+    async def join(self) -> None:
+        await self.pool.join()
+
+    async def __aenter__(self) -> UnitManager:
+        self.pool.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.pool.stop(drain=exc_info[0] is None)
@@ -1,28 +1,45 @@
 from __future__ import annotations
+from array import array
 from enum import Enum
 
 from pathlib import Path
 from airconcontroller.controllers.controller import Frame
+from airconcontroller.controllers.conversion import bits_to_int, int_to_bits
+from airconcontroller.controllers.encoder import encode_timings, timings_to_mode2
+from airconcontroller.controllers.instrumentation import span, timed
+from airconcontroller.controllers.protocol import PANASONIC, ProtocolConstant, ProtocolConstants
 
 from dataclasses import InitVar, dataclass, field
-from math import isclose
+from math import isclose, isfinite
+from numbers import Real
+from typing import TYPE_CHECKING, Iterable, Iterator
+
+if TYPE_CHECKING:
+    import numpy as np
+
+    from airconcontroller.controllers.decoder import TimingThresholds
+    from airconcontroller.controllers.recovery import DecodeReport
 
 
 def byte_reverse(byte_list: list[int]) -> list[int]:
+    """Reverse a bit list, eg LSB first to MSB first."""
     return list(reversed(byte_list))
 
 
 @dataclass
-class Panasonic:
+class Panasonic(metaclass=ProtocolConstants):
     """Controller for Panasonic AC Protocol
+
+    Timing constants and field positions are those of PROTOCOL; the timing
+    attributes (HEADER, MARK, ...) are read only aliases of it.
     """
-    frame1_data: InitVar[list[int] | None] = None
-    frame2_data: InitVar[list[int] | None] = None
+    frame1_data: InitVar[list[int] | bytes | None] = None
+    frame2_data: InitVar[list[int] | bytes | None] = None
 
     cmd_frame: Frame = field(init=False)
     data_frame: Frame = field(init=False)
 
-    def __post_init__(self, frame1_data: list[int] | None, frame2_data: list[int] | None):
+    def __post_init__(self, frame1_data: list[int] | bytes | None, frame2_data: list[int] | bytes | None):
         if frame1_data is None:
             self.cmd_frame = Frame(Panasonic.FRAME1_DEFAULT)
         else:
@@ -39,6 +56,18 @@ class Panasonic:
         output.append(f"Frame2  {self.data_frame}")
         return "\n".join(output)
 
+    def to_timings(self) -> array:
+        """Encode both frames as pulse/space durations (us), ready to send."""
+        frames = (
+            (bytes(self.cmd_frame), self.cmd_frame.bit_count),
+            (bytes(self.data_frame), self.data_frame.bit_count),
+        )
+        return encode_timings(frames, Panasonic.PROTOCOL)
+
+    def to_mode2(self) -> str:
+        """Encode both frames as mode2 text, as read by parse_file."""
+        return timings_to_mode2(self.to_timings(), Panasonic.TIMEOUT)
+
 
 
 
@@ -83,32 +112,43 @@ class Panasonic:
             0, 1, 1, 0, 0, 0, 0, 0,
             1, 0, 1, 1, 0, 0, 0, 1]
 
-    # Protocol Properties
-    HEADER = 3500
-    HEADERSPACE = 1750
-    MARK = 435
-    SPACE0 = 435
-    SPACE1 = 1300
-    ENDOFFRAMESPACE = 9900
-    DELTA = 200
-
-    # Byte Index:
-    MODE_SWITCH_BYTE = 6
-    TEMPERATURE_BYTE = 7
-    SWING_FAN_BYTE = 9
+    # Protocol Properties (see controllers.protocol)
+    PROTOCOL = PANASONIC
+    HEADER = ProtocolConstant()
+    HEADERSPACE = ProtocolConstant()
+    MARK = ProtocolConstant()
+    SPACE0 = ProtocolConstant()
+    SPACE1 = ProtocolConstant()
+    ENDOFFRAMESPACE = ProtocolConstant()
+    DELTA = ProtocolConstant()
+    TIMEOUT = ProtocolConstant() # Gap reported by mode2 after each command
+
+    # Byte Index (of the fields of PROTOCOL):
+    MODE_SWITCH_BYTE = PANASONIC.field_map["mode"].byte
+    TEMPERATURE_BYTE = PANASONIC.field_map["temperature"].byte
+    SWING_FAN_BYTE = PANASONIC.field_map["fan"].byte
     ON_TIMER_1 = 11
     ON_TIMER_2 = 12 # First half of byte?
     ON_TIMER_1 = 12 # Last half of byte?
     ON_TIMER_2 = 13
     PROFILE_BYTE = 14
-    TEMPERATURE_HALF_BYTE = 15
-    MODE_MISC_BYTE = 18
-    CHECKSUM_BYTE = 19
+    TEMPERATURE_HALF_BYTE = PANASONIC.field_map["temperature_half"].byte
+    MODE_MISC_BYTE = PANASONIC.field_map["mode_misc"].byte
+    CHECKSUM_BYTE = PANASONIC.checksum.byte
 
     # Limits:
     TEMPERATURE_MIN = 16
     TEMPERATURE_MAX = 30
 
+    POWER_VALUES = {
+        0: "OFF",
+        1: "ON",
+    }
+    POWER_SETTINGS = {
+        "OFF": 0,
+        "ON": 1,
+    }
+
     FAN_VALUES = {
         int("0b1010", base=2): "AUTO",
         int("0b0011", base=2): "F1", # (Slowest)
@@ -177,86 +217,140 @@ class Panasonic:
     ################################################################
 
     @staticmethod
-    def parse_file(filepath: str | Path) -> list[Panasonic]:
-        lines = Path(filepath).read_text().splitlines()
-
-        data: list[list[list[int]]] = [[[], []]]
-
-        frame_idx = 0
-
-        pulse_duration: int = 0
-        space_duration: int = 0
+    def parse_file(filepath: str | Path, thresholds: TimingThresholds | None = None,
+                   calibrate: bool = False) -> list[Panasonic]:
+        """Decode a mode2 text capture, or a binary capture (see controllers.capture).
+
+        Args:
+            filepath (str | Path): capture file
+            thresholds (TimingThresholds | None): timing windows of the
+                receiver (see controllers.calibration), default nominal
+            calibrate (bool): learn the timing windows from this capture
+        """
+        events, durations, lines = Panasonic._read_capture(filepath)
+        if calibrate:
+            from airconcontroller.controllers.calibration import calibrate as calibrate_timings
+
+            thresholds = calibrate_timings(events, durations, Panasonic.PROTOCOL)
+
+        pairs = Panasonic.PROTOCOL.decoder(thresholds).decode_symbols(events, durations, lines)
+        with span("decode.commands"):
+            return [Panasonic(frame1, frame2) for frame1, frame2 in pairs]
 
-        for line_idx, line in enumerate(lines):
-            event, duration = line.split(" ")
-            if event == "pulse":
-                pulse_duration = int(duration)
-                continue
-
-            if event == "space":
-                space_duration = int(duration)
-
-                if Panasonic.check_header(pulse_duration, space_duration):
-                    continue
+    @staticmethod
+    def recover_file(filepath: str | Path, thresholds: TimingThresholds | None = None,
+                     calibrate: bool = False) -> DecodeReport:
+        """Decode a noisy capture, keeping every intact command.
+
+        Frames holding a bad symbol are dropped and decoding resyncs on the
+        next header (see controllers.recovery). Commands failing the data
+        frame checksum are dropped too.
+
+        On a clean capture the commands are those of parse_file, except for
+        a capture opening with a stray pulse and timeout (eg clear.dat):
+        parse_file keeps its legacy empty first command and swapped frames,
+        here each command has its frames in order.
+
+        Args:
+            filepath (str | Path): capture file
+            thresholds (TimingThresholds | None): timing windows of the
+                receiver (see controllers.calibration), default nominal
+            calibrate (bool): learn the timing windows from this capture
+
+        Returns:
+            DecodeReport: Panasonic commands, the line each starts at, and
+                an error for everything dropped
+        """
+        from airconcontroller.controllers.recovery import ERROR_CRC, DecodeError, decode_tolerant
+
+        events, durations, lines = Panasonic._read_capture(filepath)
+        if calibrate:
+            from airconcontroller.controllers.calibration import calibrate as calibrate_timings
+
+            thresholds = calibrate_timings(events, durations, Panasonic.PROTOCOL)
+
+        report = decode_tolerant(events, durations, Panasonic.PROTOCOL, thresholds, lines)
+        commands, report.commands = report.commands, []
+        starts, report.lines = report.lines, []
+        for (frame1, frame2), line in zip(commands, starts):
+            cmd = Panasonic(frame1, frame2)
+            if cmd.crc_valid:
+                report.commands.append(cmd)
+                report.lines.append(line)
+            else:
+                report.errors.append(DecodeError(
+                    ERROR_CRC, line, f"Checksum {cmd.crc} does not match {cmd.calculate_crc()}"))
 
-                if Panasonic.check_end_of_frame(pulse_duration, space_duration):
-                    frame_idx = not frame_idx
-                    continue
+        report.errors.sort(key=lambda error: error.line)
+        return report
 
-                bit_value = Panasonic.get_value(pulse_duration, space_duration)
-                if bit_value == 2:
-                    raise ValueError(f"Bit value error at: ln{line_idx:>4}: {line} [{pulse_duration}, {space_duration}]")
-                else:
-                    data[-1][frame_idx].append(bit_value)
+    @staticmethod
+    @timed("decode.read")
+    def _read_capture(filepath: str | Path) -> tuple[np.ndarray, np.ndarray, list[str] | None]:
+        """Events, durations and (text captures only) lines of a capture file."""
+        from airconcontroller.controllers.capture import is_capture, load_capture
+        from airconcontroller.controllers.decoder import tokenize
 
-                continue
+        if is_capture(filepath):
+            capture = load_capture(filepath)
+            return capture.events, capture.durations, None
 
-            elif event == "timeout":
-                frame_idx = not frame_idx
-                data.append([[], []])
-            else:
-                raise ValueError(f"Error of some sort at: ln{line_idx:>4}: {line} [{pulse_duration}, {space_duration}]")
+        lines = Path(filepath).read_text().splitlines()
+        return *tokenize(lines), lines
 
-        return [Panasonic(d[0], d[1]) for d in data[:-1]]
+    @staticmethod
+    def parse_stream(source: Iterable[str | bytes], chunked: bool = False,
+                     thresholds: TimingThresholds | None = None) -> Iterator[Panasonic]:
+        """Decode a mode2 stream, eg ``mode2`` piped from a LIRC device.
+
+        Each command is yielded as soon as its frame pair is complete.
+
+        Args:
+            source (Iterable[str | bytes]): lines, or arbitrary chunks of the
+                stream when ``chunked`` is set
+            chunked (bool): items of ``source`` are not aligned to lines
+            thresholds (TimingThresholds | None): timing windows of the
+                receiver (see controllers.calibration), default nominal
+        """
+        for frame1, frame2 in Panasonic.PROTOCOL.iter_decode(source, chunked=chunked, thresholds=thresholds):
+            yield Panasonic(frame1, frame2)
 
     @staticmethod
     def check_header(pulse_duration: int, space_duration: int) -> bool:
-        if isclose(pulse_duration, Panasonic.HEADER, abs_tol=Panasonic.DELTA) and \
-        isclose(space_duration, Panasonic.HEADERSPACE, abs_tol=Panasonic.DELTA): return True
+        protocol = Panasonic.PROTOCOL
+        if isclose(pulse_duration, protocol.HEADER, abs_tol=protocol.DELTA) and \
+        isclose(space_duration, protocol.HEADERSPACE, abs_tol=protocol.DELTA): return True
 
         return False
 
     @staticmethod
     def check_end_of_frame(pulse_duration: int, space_duration: int) -> bool:
-        if isclose(pulse_duration, Panasonic.MARK, abs_tol=Panasonic.DELTA) and \
-        isclose(space_duration, Panasonic.ENDOFFRAMESPACE, abs_tol=Panasonic.DELTA): return True
+        protocol = Panasonic.PROTOCOL
+        if isclose(pulse_duration, protocol.MARK, abs_tol=protocol.DELTA) and \
+        isclose(space_duration, protocol.ENDOFFRAMESPACE, abs_tol=protocol.DELTA): return True
 
         return False
 
     @staticmethod
     def get_value(pulse_duration: int, space_duration: int) -> int:
-        if isclose(pulse_duration, Panasonic.MARK, abs_tol=Panasonic.DELTA) and \
-        isclose(space_duration, Panasonic.SPACE0, abs_tol=Panasonic.DELTA): return 0
+        protocol = Panasonic.PROTOCOL
+        if isclose(pulse_duration, protocol.MARK, abs_tol=protocol.DELTA) and \
+        isclose(space_duration, protocol.SPACE0, abs_tol=protocol.DELTA): return 0
 
-        if isclose(pulse_duration, Panasonic.MARK, abs_tol=Panasonic.DELTA) and \
-        isclose(space_duration, Panasonic.SPACE1, abs_tol=Panasonic.DELTA): return 1
+        if isclose(pulse_duration, protocol.MARK, abs_tol=protocol.DELTA) and \
+        isclose(space_duration, protocol.SPACE1, abs_tol=protocol.DELTA): return 1
 
         return 2
 
     @staticmethod
     def int_to_data_byte(value: int, byte_size: int = 8) -> list[int]:
         """Convert int to lsb byte, of width <byte_size>."""
-        byte_data_lsb = [int(s) for s in format(value, 'b').zfill(byte_size)]
-        byte_data_msb = list(reversed(byte_data_lsb))
-        return byte_data_msb
+        return int_to_bits(value, byte_size)
 
     @staticmethod
     def data_byte_to_int(byte_msb: list[int], byte_size: int = 8) -> int:
         """Convert lsb byte, of width <byte_size>, to int."""
-        byte_lsb = list(reversed(byte_msb))
-        byte_str = "".join([f"{d}" for d in byte_lsb])
-        return int(f'0b{byte_str:0{byte_size}}', base=2)
-
+        return bits_to_int(byte_msb)
 
 
 
@@ -270,116 +364,285 @@ class Panasonic:
     ################################################################
     ################################################################
 
+    @property
+    def frames(self) -> tuple[Frame, Frame]:
+        """Command and data frame, as indexed by the fields of PROTOCOL."""
+        return self.cmd_frame, self.data_frame
+
+    def get_field(self, name: str) -> int:
+        """Raw value of a field of PROTOCOL (see controllers.protocol.Field)."""
+        return Panasonic.PROTOCOL.field_map[name].get(self.frames)
+
+    def set_field(self, name: str, value: int) -> None:
+        Panasonic.PROTOCOL.field_map[name].set(self.frames, value)
+
+    # Fields of PROTOCOL each decoded property is read from. Decoded values
+    # are memoized on the data frame (see Frame.remember) until one of their
+    # bytes is set
+    PROPERTY_FIELDS = {
+        "power": ("power",),
+        "temperature": ("temperature", "temperature_half", "temperature_limit"),
+        "fan": ("fan",),
+        "swing": ("swing",),
+        "mode": ("mode",),
+    }
+    FIELD_BYTES = {
+        name: tuple(sorted({PANASONIC.field_map[field].byte for field in fields}))
+        for name, fields in PROPERTY_FIELDS.items()
+    }
+
+    @property
+    def power(self) -> str:
+        power = self.data_frame.derived.get("power")
+        if power is not None:
+            return power
+
+        return self.data_frame.remember("power", Panasonic.POWER_VALUES[self.get_field("power")],
+                                        Panasonic.FIELD_BYTES["power"])
+
+    @power.setter
+    def power(self, power_setting: str):
+        self.set_field("power", Panasonic.POWER_SETTINGS[power_setting])
+
     @property
     def temperature(self) -> float:
-        temp_degree_byte = self.data_frame.get_byte(Panasonic.TEMPERATURE_BYTE)
-        half_degree_byte = self.data_frame.get_byte(Panasonic.TEMPERATURE_HALF_BYTE)
-        temp_degree = Panasonic.data_byte_to_int(temp_degree_byte) // 2
-        half_degree = (Panasonic.data_byte_to_int(half_degree_byte) == 128) * 0.5
-        return temp_degree + half_degree
+        temperature = self.data_frame.derived.get("temperature")
+        if temperature is not None:
+            return temperature
+
+        # The half degree only counts away from the limits
+        half_degree = self.get_field("temperature_half") and not self.get_field("temperature_limit")
+        return self.data_frame.remember("temperature", self.get_field("temperature") + half_degree * 0.5,
+                                        Panasonic.FIELD_BYTES["temperature"])
 
     @temperature.setter
     def temperature(self, value: int):
-        print(f"Setting to {value}°C")
-        half_degree = 0
+        half_degree = limit = 0
         if value <= Panasonic.TEMPERATURE_MIN:
             value = Panasonic.TEMPERATURE_MIN
-            half_degree = 2
+            limit = 1
 
         elif value >= Panasonic.TEMPERATURE_MAX:
             value = Panasonic.TEMPERATURE_MAX
-            half_degree = 2
-
-        temp_degree = int(int(value) - 16)
+            limit = 1
 
         if value % 1 == 0.5:
-            half_degree = 128
+            half_degree = 1
 
-        temp_degree_nibble = Panasonic.int_to_data_byte(temp_degree, byte_size=4)
-        temp_degree_byte = [0, *temp_degree_nibble, 1, 0, 0]
-        half_degree_byte = Panasonic.int_to_data_byte(half_degree)
-
-        self.data_frame.set_byte(Panasonic.TEMPERATURE_BYTE, temp_degree_byte)
-        self.data_frame.set_byte(Panasonic.TEMPERATURE_HALF_BYTE, half_degree_byte)
+        # The temperature bytes hold nothing else, they are written whole
+        for byte_num in Panasonic.FIELD_BYTES["temperature"]:
+            self.data_frame.set_byte_value(byte_num, 0)
+        self.set_field("temperature", int(value))
+        self.set_field("temperature_half", half_degree)
+        self.set_field("temperature_limit", limit)
 
     @property
     def fan(self) -> str:
-        fan_byte = self.data_frame.get_byte(Panasonic.SWING_FAN_BYTE)
-        fan_half_byte = fan_byte[4:]
-        fan_value = Panasonic.data_byte_to_int(fan_half_byte, 4)
+        fan = self.data_frame.derived.get("fan")
+        if fan is not None:
+            return fan
+
+        fan_value = self.get_field("fan")
 
         if fan_value in Panasonic.FAN_VALUES.keys():
-            return Panasonic.FAN_VALUES[fan_value]
+            fan = Panasonic.FAN_VALUES[fan_value]
+        else:
+            fan = f"Unknown Fan Setting {fan_value}"
 
-        return f"Unknown Fan Setting {fan_value}"
+        return self.data_frame.remember("fan", fan, Panasonic.FIELD_BYTES["fan"])
 
     @fan.setter
     def fan(self, fan_setting: str):
-        set_value = Panasonic.FAN_SETTINGS[fan_setting]
-        fan_half_byte = Panasonic.int_to_data_byte(set_value, byte_size=4)
-        fan_byte = self.data_frame.get_byte(Panasonic.SWING_FAN_BYTE)
-        fan_byte[4:] = fan_half_byte
-        self.data_frame.set_byte(Panasonic.SWING_FAN_BYTE, fan_byte)
+        self.set_field("fan", Panasonic.FAN_SETTINGS[fan_setting])
 
     @property
     def swing(self) -> str:
-        swing_byte = self.data_frame.get_byte(Panasonic.SWING_FAN_BYTE)
-        swing_value = Panasonic.data_byte_to_int(swing_byte[:4], 4)
+        swing = self.data_frame.derived.get("swing")
+        if swing is not None:
+            return swing
+
+        swing_value = self.get_field("swing")
 
         if swing_value in Panasonic.SWING_VALUES.keys():
-            return Panasonic.SWING_VALUES[swing_value]
+            swing = Panasonic.SWING_VALUES[swing_value]
+        else:
+            swing = f"Unknown Swing Setting {swing_value}"
 
-        return f"Unknown Swing Setting {swing_value}"
+        return self.data_frame.remember("swing", swing, Panasonic.FIELD_BYTES["swing"])
 
     @swing.setter
     def swing(self, swing_setting: str):
-        set_value = Panasonic.SWING_SETTINGS[swing_setting]
-        swing_half_byte = Panasonic.int_to_data_byte(set_value, byte_size=4)
-        swing_byte = self.data_frame.get_byte(Panasonic.SWING_FAN_BYTE)
-        swing_byte[4:] = swing_half_byte
-        self.data_frame.set_byte(Panasonic.SWING_FAN_BYTE, swing_byte)
+        self.set_field("swing", Panasonic.SWING_SETTINGS[swing_setting])
 
     @property
     def mode(self) -> str:
-        mode_byte_lsb = self.data_frame.get_byte(Panasonic.MODE_SWITCH_BYTE)
-        mode_byte_msb = byte_reverse(mode_byte_lsb)
-        mode_nibble = mode_byte_msb[:4]
-        modes = [e.value for e in Panasonic.MODES]
-        try:
-            mode_name = [e.name for e in Panasonic.MODES][modes.index(mode_nibble)]
-        except ValueError:
-            print(f"{modes=}")
-            print(f"{mode_byte_lsb=}")
-            print(f"{mode_byte_msb=}")
-            raise
-        return mode_name
+        mode = self.data_frame.derived.get("mode")
+        if mode is not None:
+            return mode
+
+        mode_value = self.get_field("mode")
+
+        if mode_value not in Panasonic.MODE_VALUES.keys():
+            raise ValueError(f"Unknown Mode Setting {mode_value}")
+
+        return self.data_frame.remember("mode", Panasonic.MODE_VALUES[mode_value], Panasonic.FIELD_BYTES["mode"])
 
     @mode.setter
     def mode(self, mode: Panasonic.MODES):
-        mode_byte_lsb = self.data_frame.get_byte(Panasonic.MODE_SWITCH_BYTE)
-        mode_byte_msb = byte_reverse(mode_byte_lsb)
-        mode_byte_msb[4:] = mode.value
-        mode_byte_lsb = byte_reverse(mode_byte_msb)
-        self.data_frame.set_byte(Panasonic.MODE_SWITCH_BYTE, mode_byte_lsb)
-
-        misc_byte_lsb = self.data_frame.get_byte(Panasonic.MODE_MISC_BYTE)
-        misc_byte_msb = byte_reverse(misc_byte_lsb)
+        self.set_field("mode", Panasonic.MODE_SETTINGS[mode.name])
+
+        misc_value = self.get_field("mode_misc")
         if mode in [Panasonic.MODES.COOL, Panasonic.MODES.DRY]:
-            misc_byte_msb[4] = 1
+            misc_value |= 0x10
         if mode in [Panasonic.MODES.HEAT]:
-            misc_byte_msb[4] = 0
-        misc_byte_lsb = byte_reverse(misc_byte_msb)
-        self.data_frame.set_byte(Panasonic.MODE_MISC_BYTE, misc_byte_lsb)
+            misc_value &= ~0x10
+        self.set_field("mode_misc", misc_value)
 
     @property
     def crc(self) -> int:
-        crc_byte = self.data_frame.get_byte(Panasonic.CHECKSUM_BYTE)
-        crc_value = Panasonic.data_byte_to_int(crc_byte)
-        return crc_value
+        return self.data_frame.get_byte_value(Panasonic.CHECKSUM_BYTE)
+
+    @property
+    def crc_valid(self) -> bool:
+        """Complete data frame whose checksum matches its content."""
+        return (self.data_frame.bit_count == len(Panasonic.FRAME2_DEFAULT)
+                and self.crc == self.calculate_crc())
+
+    @timed("crc")
+    def calculate_crc(self) -> int:
+        return Panasonic.PROTOCOL.checksum.calculate(self.frames)
 
     def set_crc(self) -> None:
-        byte_list = [self.data_frame.get_byte(idx + 1) for idx in range(18)]
-        value_list = [Panasonic.data_byte_to_int(b) for b in byte_list]
-        crc_value = sum(value_list) % 256
-        crc_byte = Panasonic.int_to_data_byte(crc_value)
-        self.data_frame.set_byte(Panasonic.CHECKSUM_BYTE, crc_byte)
+        self.data_frame.set_byte_value(Panasonic.CHECKSUM_BYTE, self.calculate_crc())
+
+    ################################################################
+    ################################################################
+    ###
+    ### State Diffing
+    ###
+    ################################################################
+    ################################################################
+
+    # Decoded fields compared by diff, and set by update in this order
+    STATE_FIELDS = ("power", "mode", "temperature", "fan", "swing")
+
+    @staticmethod
+    def check_settings(settings: dict[str, str | float | Panasonic.MODES]) -> dict[str, str | float | Panasonic.MODES]:
+        """Validate settings for update, without changing any command.
+
+        Args:
+            settings (dict): power (ON or OFF), mode (name or Panasonic.MODES),
+                temperature, fan, swing
+
+        Returns:
+            dict: the settings, with a mode name as its Panasonic.MODES
+
+        Raises:
+            ValueError: for an unknown setting or an invalid value
+        """
+        unknown = set(settings).difference(Panasonic.STATE_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown settings: {', '.join(sorted(unknown))} "
+                             f"(expected {', '.join(Panasonic.STATE_FIELDS)})")
+
+        choices = {
+            "power": Panasonic.POWER_SETTINGS,
+            "mode": Panasonic.MODES.__members__,
+            "fan": Panasonic.FAN_SETTINGS,
+            "swing": Panasonic.SWING_SETTINGS,
+        }
+        checked = dict(settings)
+        for name, value in settings.items():
+            if name == "temperature":
+                if isinstance(value, bool) or not isinstance(value, Real) or not isfinite(value):
+                    raise ValueError(f"Invalid temperature: {value!r}")
+            elif name == "mode" and isinstance(value, Panasonic.MODES):
+                continue
+            elif not isinstance(value, str) or value not in choices[name]:
+                raise ValueError(f"Invalid {name}: {value!r} (expected {', '.join(choices[name])})")
+            elif name == "mode":
+                checked[name] = Panasonic.MODES[value]
+        return checked
+
+    def update(self, **settings: str | float | Panasonic.MODES) -> None:
+        """Set several STATE_FIELDS at once and update the checksum.
+
+        Every setting is checked first, an invalid one leaves the command
+        unchanged.
+
+        Args:
+            **settings: see check_settings
+
+        Raises:
+            ValueError: for an unknown setting or an invalid value
+        """
+        settings = Panasonic.check_settings(settings)
+        for name in Panasonic.STATE_FIELDS:
+            if name in settings:
+                setattr(self, name, settings[name])
+        self.set_crc()
+
+    def state(self) -> dict[str, str | float | None]:
+        """Decoded STATE_FIELDS, None for a mode outside of MODE_VALUES."""
+        state = {}
+        for name in Panasonic.STATE_FIELDS:
+            try:
+                state[name] = getattr(self, name)
+            except ValueError:
+                state[name] = None
+        return state
+
+    def needs_transmission(self, last_sent: Panasonic | None) -> bool:
+        """Whether sending this command would change the state left by <last_sent>.
+
+        Args:
+            last_sent (Panasonic | None): command last sent to the unit, None
+                if unknown
+
+        Returns:
+            bool: False only if both frames are identical to <last_sent>
+        """
+        return last_sent is None or self.cmd_frame != last_sent.cmd_frame or self.data_frame != last_sent.data_frame
+
+    def diff(self, last_sent: Panasonic | None) -> StateDiff:
+        """Changes from <last_sent> to this command.
+
+        Args:
+            last_sent (Panasonic | None): command last sent to the unit, None
+                if unknown (everything differs)
+
+        Returns:
+            StateDiff: changed decoded fields and data frame bytes
+        """
+        if last_sent is None:
+            return StateDiff(
+                {name: (None, value) for name, value in self.state().items()},
+                list(range(1, len(self.data_frame) + 1)), True)
+
+        cmd_changed = self.cmd_frame != last_sent.cmd_frame
+        if not cmd_changed and self.data_frame == last_sent.data_frame:
+            return StateDiff({}, [], False)
+
+        old_state = last_sent.state()
+        fields = {name: (old_state[name], value) for name, value in self.state().items()
+                  if value != old_state[name]}
+        new, old = bytes(self.data_frame), bytes(last_sent.data_frame)
+        changed = [idx + 1 for idx in range(max(len(new), len(old)))
+                   if new[idx:idx + 1] != old[idx:idx + 1]]
+        return StateDiff(fields, changed, True)
+
+
+@dataclass
+class StateDiff:
+    """Result of Panasonic.diff.
+
+    ``fields`` maps each changed decoded field to its (old, new) value and
+    ``data_bytes`` lists the changed data frame bytes, 1 indexed. A change
+    of the command frame only shows in ``changed``.
+    """
+    fields: dict[str, tuple[str | float | None, str | float | None]]
+    data_bytes: list[int]
+    changed: bool
+
+    def __bool__(self) -> bool:
+        return self.changed
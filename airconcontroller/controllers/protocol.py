@@ -0,0 +1,268 @@
+"""Protocol descriptions and registry.
+
+A Protocol describes an IR protocol as data: its timing constants, the
+default content and length of each frame, and the bit range of each field
+within a frame. The shared engine does the rest: the vectorised
+decoder (controllers.decoder) and the cached encoder (controllers.encoder)
+take any object with the timing constants, so a new model only needs a
+description to get the optimised decode and encode paths.
+
+Encoding only needs the standard library; the decoder, and NumPy with it,
+is imported on first use of a decoding method.
+
+    protocol = get_protocol("panasonic")
+    frames = protocol.new_frames()
+    protocol.set_field(frames, "temperature", 24)
+    protocol.set_checksum(frames)
+    timings = protocol.encode(frames)
+"""
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import TYPE_CHECKING, Iterable, Iterator, Sequence
+
+from airconcontroller.controllers.controller import Frame
+from airconcontroller.controllers.encoder import encode_timings, timings_to_mode2
+
+if TYPE_CHECKING:
+    from airconcontroller.controllers.decoder import FramePair, Mode2Decoder, TimingThresholds
+
+
+# Timing constants of a Protocol, as read by the decoder and encoder
+TIMING_NAMES = ("HEADER", "HEADERSPACE", "MARK", "SPACE0", "SPACE1", "ENDOFFRAMESPACE", "DELTA", "TIMEOUT")
+
+
+class ProtocolConstant:
+    """Read only alias, on a class and its instances, of an attribute of the class PROTOCOL."""
+
+    def __set_name__(self, owner: type, name: str):
+        self.name = name
+
+    def __get__(self, obj: object, owner: type | None = None):
+        return getattr((owner or type(obj)).PROTOCOL, self.name)
+
+    def __set__(self, obj: object, value: object):
+        raise AttributeError(f"{self.name} is read only, it is PROTOCOL.{self.name}")
+
+
+class ProtocolConstants(type):
+    """Metaclass keeping the ProtocolConstant aliases of a class read only.
+
+    Rebinding an alias, on the class or in a subclass body, would leave two
+    sources of the constant; override PROTOCOL instead.
+    """
+
+    def __init__(cls, name: str, bases: tuple[type, ...], namespace: dict):
+        super().__init__(name, bases, namespace)
+        for attr in namespace:
+            if not isinstance(namespace[attr], ProtocolConstant) and cls._is_alias(bases, attr):
+                raise TypeError(f"{name}.{attr} is read only, override PROTOCOL instead")
+
+    def __setattr__(cls, attr: str, value: object):
+        if cls._is_alias(cls.__mro__, attr):
+            raise AttributeError(f"{cls.__name__}.{attr} is read only, override PROTOCOL instead")
+        super().__setattr__(attr, value)
+
+    @staticmethod
+    def _is_alias(classes: Iterable[type], attr: str) -> bool:
+        return any(isinstance(klass.__dict__.get(attr), ProtocolConstant) for klass in classes)
+
+
+@dataclass(frozen=True)
+class Field:
+    """A bit range of one frame.
+
+    Args:
+        name (str): field name
+        frame (int): index of the frame holding the field
+        byte (int): byte number, 1 indexed as Frame.get_byte_value
+        shift (int): position of the lowest bit within the byte
+        width (int): number of bits, at most to the end of the byte
+    """
+    name: str
+    frame: int
+    byte: int
+    shift: int = 0
+    width: int = 8
+
+    @property
+    def mask(self) -> int:
+        return ((1 << self.width) - 1) << self.shift
+
+    @property
+    def bit_range(self) -> range:
+        """Bit positions of the field within its frame."""
+        start = (self.byte - 1) * 8 + self.shift
+        return range(start, start + self.width)
+
+    def get(self, frames: Sequence[Frame]) -> int:
+        return (frames[self.frame].get_byte_value(self.byte) & self.mask) >> self.shift
+
+    def set(self, frames: Sequence[Frame], value: int) -> None:
+        if not 0 <= value < 1 << self.width:
+            raise ValueError(f"{self.name} must fit in {self.width} bits: {value}")
+        frame = frames[self.frame]
+        frame.set_byte_value(self.byte, (frame.get_byte_value(self.byte) & ~self.mask) | (value << self.shift))
+
+
+@dataclass(frozen=True)
+class Checksum:
+    """A byte holding the sum, mod 256, of the bytes before it in the frame."""
+    frame: int
+    byte: int
+
+    def calculate(self, frames: Sequence[Frame]) -> int:
+        return sum(frames[self.frame].view(writable=False)[:self.byte - 1]) % 256
+
+
+@dataclass(frozen=True, eq=False)
+class Protocol:
+    """Description of a pulse distance protocol.
+
+    Every frame is sent as HEADER/HEADERSPACE then a MARK and a SPACE0 or
+    SPACE1 space per bit, LSB first. Frames are separated by
+    MARK/ENDOFFRAMESPACE and the last frame ends with a MARK. The timing
+    attribute names are those the decoder and encoder read.
+
+    Instances compare by identity, so they key the encoder caches directly.
+    """
+    name: str
+    HEADER: int
+    HEADERSPACE: int
+    MARK: int
+    SPACE0: int
+    SPACE1: int
+    ENDOFFRAMESPACE: int
+    DELTA: int
+    TIMEOUT: int
+    frames: tuple[bytes, ...]
+    frame_bits: tuple[int, ...]
+    fields: tuple[Field, ...] = ()
+    checksum: Checksum | None = None
+    description: str = field(default="", compare=False)
+
+    @cached_property
+    def field_map(self) -> dict[str, Field]:
+        return {f.name: f for f in self.fields}
+
+    @cached_property
+    def thresholds(self) -> TimingThresholds:
+        from airconcontroller.controllers.decoder import TimingThresholds
+
+        return TimingThresholds.from_protocol(self)
+
+    @property
+    def FRAME1_DEFAULT(self) -> list[int]:
+        return Frame.from_bytes(self.frames[0]).data[:self.frame_bits[0]]
+
+    @property
+    def FRAME2_DEFAULT(self) -> list[int]:
+        return Frame.from_bytes(self.frames[-1]).data[:self.frame_bits[-1]]
+
+    def new_frames(self) -> list[Frame]:
+        """Frames holding the default content."""
+        return [Frame.from_bytes(data) for data in self.frames]
+
+    def get_field(self, frames: Sequence[Frame], name: str) -> int:
+        return self.field_map[name].get(frames)
+
+    def set_field(self, frames: Sequence[Frame], name: str, value: int) -> None:
+        self.field_map[name].set(frames, value)
+
+    def read_fields(self, frames: Sequence[Frame]) -> dict[str, int]:
+        return {f.name: f.get(frames) for f in self.fields}
+
+    def set_checksum(self, frames: Sequence[Frame]) -> None:
+        if self.checksum is not None:
+            frames[self.checksum.frame].set_byte_value(self.checksum.byte, self.checksum.calculate(frames))
+
+    def checksum_valid(self, frames: Sequence[Frame]) -> bool:
+        if self.checksum is None:
+            return True
+        return frames[self.checksum.frame].get_byte_value(self.checksum.byte) == self.checksum.calculate(frames)
+
+    def encode(self, frames: Sequence[Frame]) -> array:
+        """Pulse/space durations (us) of the frames, see controllers.encoder."""
+        return encode_timings(tuple((bytes(f), f.bit_count) for f in frames), self)
+
+    def to_mode2(self, frames: Sequence[Frame]) -> str:
+        return timings_to_mode2(self.encode(frames), self.TIMEOUT)
+
+    def decoder(self, thresholds: TimingThresholds | None = None) -> Mode2Decoder:
+        from airconcontroller.controllers.decoder import Mode2Decoder
+
+        return Mode2Decoder(self, thresholds=thresholds or self.thresholds)
+
+    def decode_lines(self, lines: Sequence[str], thresholds: TimingThresholds | None = None) -> list[FramePair]:
+        """Decode a complete mode2 capture into (frame1, frame2) bit lists."""
+        return self.decoder(thresholds).decode(lines)
+
+    def iter_decode(self, source: Iterable[str | bytes], chunked: bool = False,
+                    thresholds: TimingThresholds | None = None) -> Iterator[FramePair]:
+        from airconcontroller.controllers.decoder import iter_decode
+
+        return iter_decode(source, self, chunked=chunked, thresholds=thresholds or self.thresholds)
+
+
+PROTOCOLS: dict[str, Protocol] = {}
+
+
+def register(protocol: Protocol) -> Protocol:
+    """Add a protocol to the registry, replacing any of the same name."""
+    PROTOCOLS[protocol.name] = protocol
+    return protocol
+
+
+def get_protocol(name: str) -> Protocol:
+    """Registered protocol by name.
+
+    Raises:
+        KeyError: for an unregistered protocol
+    """
+    try:
+        return PROTOCOLS[name]
+    except KeyError:
+        raise KeyError(f"Unknown protocol: {name} (registered: {', '.join(sorted(PROTOCOLS))})") from None
+
+
+# Panasonic.FRAME1_DEFAULT and FRAME2_DEFAULT (the OFF command), packed
+_PANASONIC_FRAME1 = bytes.fromhex("0220e00400000006")
+_PANASONIC_FRAME2 = bytes.fromhex("0220e00400402c80af0000066000008000068d")
+
+# Fields of the data frame, frame 1
+_PANASONIC_FIELDS = (
+    Field("power", 1, 6, 0, 1),
+    Field("mode", 1, 6, 4, 4),
+    Field("temperature", 1, 7, 1, 7),
+    Field("swing", 1, 9, 0, 4),
+    Field("fan", 1, 9, 4, 4),
+    Field("temperature_half", 1, 15, 7, 1),
+    Field("temperature_limit", 1, 15, 1, 1),
+    Field("mode_misc", 1, 18),
+)
+
+PANASONIC = register(Protocol(
+    "panasonic",
+    HEADER=3500, HEADERSPACE=1750, MARK=435, SPACE0=435, SPACE1=1300, ENDOFFRAMESPACE=9900,
+    DELTA=200, TIMEOUT=125000,
+    frames=(_PANASONIC_FRAME1, _PANASONIC_FRAME2),
+    frame_bits=(64, 152),
+    fields=_PANASONIC_FIELDS,
+    checksum=Checksum(1, 19),
+    description="Panasonic AC, 64 bit command frame and 152 bit data frame (controllers.Panasonic)",
+))
+
+# The same frames with the timings measured for cCmdString.CmdString. Its
+# MARGIN (100us) rejects real captures, so the window is the Panasonic DELTA.
+CMDSTRING = register(Protocol(
+    "cmdstring",
+    HEADER=3550, HEADERSPACE=1680, MARK=496, SPACE0=394, SPACE1=1250, ENDOFFRAMESPACE=9990,
+    DELTA=200, TIMEOUT=125000,
+    frames=(_PANASONIC_FRAME1, _PANASONIC_FRAME2),
+    frame_bits=(64, 152),
+    fields=_PANASONIC_FIELDS,
+    checksum=Checksum(1, 19),
+    description="Panasonic AC with the cCmdString timings (SPACE_SHORT, PULSE_INTRO, ...)",
+))
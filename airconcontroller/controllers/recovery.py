@@ -0,0 +1,185 @@
+"""Error tolerant decoding of noisy mode2 captures.
+
+The strict decoder raises on the first symbol outside of the timing windows
+and the whole capture is lost. Here frames are delimited by their HEADER
+symbol instead: a frame holding a bad symbol is dropped and decoding
+resynchronises on the next header, so one corrupted symbol costs only the
+command it falls in. Each problem is recorded as a DecodeError.
+
+A command is a frame of len(protocol.FRAME1_DEFAULT) bits closed by an
+end-of-frame space, directly followed, before the next timeout, by a frame
+of len(protocol.FRAME2_DEFAULT) bits.
+
+Pairs are found by their headers, not by counting frame toggles from the
+start of the capture as the strict decoder does. On most clean captures
+both give the same commands; a capture opening with a stray pulse and
+timeout (clear.dat, timer_off.dat) decodes strictly to an empty pair
+followed by pairs with swapped frames, kept for compatibility, while here
+it gives the commands as sent.
+"""
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field
+from typing import Any, Sequence
+
+import numpy as np
+
+from airconcontroller.controllers.decoder import (EVENT_INVALID, EVENT_NAMES, EVENT_TIMEOUT, SYMBOL_BIT0,
+                                                  SYMBOL_BIT1, SYMBOL_END_OF_FRAME, SYMBOL_HEADER,
+                                                  SYMBOL_INVALID, TimingThresholds, classify)
+from airconcontroller.controllers.instrumentation import timed
+
+
+# DecodeError kinds
+ERROR_SYMBOL = "symbol"          # symbol outside the timing windows, its frame is dropped
+ERROR_NO_HEADER = "no_header"    # bits received outside of a frame
+ERROR_LENGTH = "length"          # frame of neither protocol length
+ERROR_UNPAIRED = "unpaired"      # frame1 without frame2, or frame2 without frame1
+ERROR_TRUNCATED = "truncated"    # frame still open at the end of the capture
+ERROR_CRC = "crc"                # data frame checksum mismatch
+
+
+@dataclass
+class DecodeError:
+    """A problem found while decoding, at line (event) index <line>."""
+    kind: str
+    line: int
+    message: str
+
+
+@dataclass
+class DecodeReport:
+    """Commands recovered from a capture, and everything that was dropped.
+
+    ``lines`` holds the line index of the first header of each command.
+    """
+    commands: list[Any] = field(default_factory=list)
+    lines: list[int] = field(default_factory=list)
+    errors: list[DecodeError] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def error_counts(self) -> dict[str, int]:
+        counts: dict[str, int] = {}
+        for error in self.errors:
+            counts[error.kind] = counts.get(error.kind, 0) + 1
+        return counts
+
+    def to_dict(self) -> dict[str, Any]:
+        """Summary of the report, eg for JSON (commands are not included)."""
+        return {
+            "commands": len(self.commands),
+            "lines": self.lines,
+            "error_counts": self.error_counts(),
+            "errors": [asdict(error) for error in self.errors],
+        }
+
+
+def _describe(lines: Sequence[str] | None, events: np.ndarray, durations: np.ndarray, idx: int) -> str:
+    if lines is not None:
+        return lines[idx]
+    return f"{EVENT_NAMES.get(int(events[idx]), '?')} {durations[idx]}"
+
+
+@timed("decode.recover")
+def decode_tolerant(events: np.ndarray, durations: np.ndarray, protocol: Any,
+                    thresholds: TimingThresholds | None = None,
+                    lines: Sequence[str] | None = None) -> DecodeReport:
+    """Decode every intact frame pair of a capture, reporting the rest.
+
+    Args:
+        events (np.ndarray): event codes
+        durations (np.ndarray): event durations (us)
+        protocol (Any): class providing the timing constants and default
+            frames (eg Panasonic)
+        thresholds (TimingThresholds | None): windows to classify against
+        lines (Sequence[str] | None): source lines, quoted in errors
+
+    Returns:
+        DecodeReport: (frame1, frame2) bit lists of each command
+    """
+    durations = np.asarray(durations, dtype=np.int64)
+    symbols = classify(events, durations, protocol, thresholds=thresholds)
+    frame1_len = len(protocol.FRAME1_DEFAULT)
+    frame2_len = len(protocol.FRAME2_DEFAULT)
+
+    # Segment k is opened by boundary k - 1, segment 0 precedes any boundary
+    is_header = symbols == SYMBOL_HEADER
+    is_timeout = events == EVENT_TIMEOUT
+    boundaries = np.flatnonzero(is_header | is_timeout | (symbols == SYMBOL_END_OF_FRAME))
+    segment = np.cumsum(is_header | is_timeout | (symbols == SYMBOL_END_OF_FRAME))
+    segment_count = len(boundaries) + 1
+
+    is_bit = (symbols == SYMBOL_BIT0) | (symbols == SYMBOL_BIT1)
+    bit_idx = np.flatnonzero(is_bit)
+    bit_counts = np.bincount(segment[bit_idx], minlength=segment_count)
+    offsets = np.concatenate(([0], np.cumsum(bit_counts))).tolist()
+    bits = symbols[bit_idx].tolist()
+
+    # First bad symbol of each segment, -1 if none
+    bad_idx = np.flatnonzero((symbols == SYMBOL_INVALID) | (events == EVENT_INVALID))[::-1]
+    first_bad = np.full(segment_count, -1, dtype=np.int64)
+    first_bad[segment[bad_idx]] = bad_idx
+
+    burst = np.cumsum(is_timeout)[boundaries].tolist()
+    opened_by_header = is_header[boundaries].tolist()
+    closed_by_end = (symbols[boundaries] == SYMBOL_END_OF_FRAME).tolist()
+    boundaries = boundaries.tolist()
+    first_bit = np.full(segment_count, -1, dtype=np.int64)
+    first_bit[segment[bit_idx[::-1]]] = bit_idx[::-1]
+
+    report = DecodeReport()
+    failed_bursts = set()
+    pending = None  # (bits, line, burst) of a frame1 waiting for its frame2
+
+    def fail(kind: str, line: int, message: str, burst_idx: int) -> None:
+        report.errors.append(DecodeError(kind, line, message))
+        failed_bursts.add(burst_idx)
+
+    def drop_pending() -> None:
+        nonlocal pending
+        if pending is not None and pending[2] not in failed_bursts:
+            fail(ERROR_UNPAIRED, pending[1], "Frame1 without a frame2", pending[2])
+        pending = None
+
+    for seg, (count, bad) in enumerate(zip(bit_counts.tolist(), first_bad.tolist())):
+        seg_burst = burst[seg - 1] if seg else 0
+        if bad >= 0:
+            line = _describe(lines, events, durations, bad)
+            fail(ERROR_SYMBOL, bad, f"Symbol out of the timing windows: {line}", seg_burst)
+            if seg and opened_by_header[seg - 1]:
+                pending = None
+            continue
+
+        if not (seg and opened_by_header[seg - 1]):
+            if count:
+                fail(ERROR_NO_HEADER, int(first_bit[seg]), f"{count} bits outside of a frame", seg_burst)
+            continue
+
+        start = boundaries[seg - 1]
+        if seg == len(boundaries):
+            fail(ERROR_TRUNCATED, start, f"Frame of {count} bits open at the end of the capture", seg_burst)
+            continue
+
+        frame = bits[offsets[seg]:offsets[seg + 1]]
+        if count == frame1_len and closed_by_end[seg]:
+            drop_pending()
+            pending = (frame, start, seg_burst)
+        elif count == frame2_len:
+            if pending is not None and pending[2] == seg_burst:
+                report.commands.append((pending[0], frame))
+                report.lines.append(pending[1])
+                pending = None
+            else:
+                drop_pending()
+                if seg_burst not in failed_bursts:
+                    fail(ERROR_UNPAIRED, start, "Frame2 without a frame1", seg_burst)
+        else:
+            drop_pending()
+            fail(ERROR_LENGTH, start, f"Frame of {count} bits, expected {frame1_len} or {frame2_len}", seg_burst)
+
+    drop_pending()
+    report.errors.sort(key=lambda error: error.line)
+    return report
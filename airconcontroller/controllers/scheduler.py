@@ -0,0 +1,275 @@
+"""Asynchronous transmit scheduler.
+
+Commands are queued per unit (eg one per indoor unit / IR blaster) and
+coalesced: a unit only ever has one pending command, each submit replaces
+it, so a burst of setpoint changes is sent once with the final state.
+Transmissions are spaced by at least one end-of-frame gap so the receiver
+sees distinct commands, and a command identical to the one last sent to
+its unit is not sent again (see Panasonic.needs_transmission).
+
+    async with TransmitScheduler(transmitter) as scheduler:
+        cmd = Panasonic()
+        for temperature in (22, 23, 24):
+            cmd.temperature = temperature
+            done = scheduler.submit("lounge", cmd)
+        await done  # only the 24 degC command is sent
+"""
+from __future__ import annotations
+
+import asyncio
+import statistics
+
+from array import array
+from collections import deque
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Hashable, Protocol
+
+from airconcontroller.controllers.panasonic import Panasonic
+
+
+# Minimum gap between the end of one transmission and the start of the next (s)
+MIN_GAP = Panasonic.ENDOFFRAMESPACE / 1e6
+
+# Number of recent send latencies kept for the metrics
+LATENCY_WINDOW = 1024
+
+
+class Transmitter(Protocol):
+    """Sends pulse/space durations (us), returning once transmitted."""
+
+    async def send(self, timings: array) -> None:
+        ...
+
+
+@dataclass
+class SchedulerMetrics:
+    submitted: int = 0
+    coalesced: int = 0
+    suppressed: int = 0
+    sent: int = 0
+    failed: int = 0
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    latencies: deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+
+    def latency_summary(self) -> dict[str, float]:
+        """Submit to transmitted latency (s) over the recent sends."""
+        if not self.latencies:
+            return {}
+        ordered = sorted(self.latencies)
+        return {
+            "mean": statistics.fmean(ordered),
+            "p50": ordered[len(ordered) // 2],
+            "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+            "max": ordered[-1],
+        }
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "suppressed": self.suppressed,
+            "sent": self.sent,
+            "failed": self.failed,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "latency": self.latency_summary(),
+        }
+
+
+@dataclass
+class _Pending:
+    command: Panasonic
+    timings: array | None
+    submitted_at: float
+    waiters: list[asyncio.Future] = field(default_factory=list)
+
+
+class TransmitScheduler:
+    """Per unit coalescing command queue in front of a transmitter.
+
+    Units are served in the order their pending command was first queued.
+
+    Args:
+        transmitter (Transmitter): sends the encoded commands
+        min_gap (float): minimum idle time between transmissions (s)
+        skip_unchanged (bool): suppress commands identical to the last one
+            sent to their unit
+        clock (Callable[[], float]): time source (s) for the gap and latencies
+        sleep (Callable[[float], Awaitable]): waits out the gap, in <clock> time
+    """
+
+    def __init__(self, transmitter: Transmitter, min_gap: float = MIN_GAP, skip_unchanged: bool = True,
+                 clock: Callable[[], float] = perf_counter,
+                 sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep):
+        self.transmitter = transmitter
+        self.min_gap = min_gap
+        self.skip_unchanged = skip_unchanged
+        self.clock = clock
+        self.sleep = sleep
+        self.metrics = SchedulerMetrics()
+
+        self._pending: dict[Hashable, _Pending] = {}
+        # Command being transmitted, no longer in _pending
+        self._sending: _Pending | None = None
+        self._last_sent: dict[Hashable, Panasonic] = {}
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._last_end = float("-inf")
+        self._task: asyncio.Task | None = None
+
+    def submit(self, unit: Hashable, command: Panasonic, timings: array | None = None,
+               force: bool = False) -> asyncio.Future:
+        """Queue the state of <command> for <unit>, replacing any pending command.
+
+        The command is copied, so the caller may keep changing it. A command
+        identical to the one last sent to <unit> is suppressed, along with
+        any pending command it replaces.
+
+        Args:
+            unit (Hashable): unit the command is for
+            command (Panasonic): state to send
+            timings (array | None): <command> already encoded, eg shared by
+                the units of a group command; encoded when sent if omitted
+            force (bool): send even if the unit should already be in this state
+
+        Returns:
+            asyncio.Future: resolved once the command, or a later one
+                replacing it, has been transmitted
+        """
+        waiter = asyncio.get_running_loop().create_future()
+        snapshot = Panasonic(bytes(command.cmd_frame), bytes(command.data_frame))
+        self.metrics.submitted += 1
+
+        pending = self._pending.get(unit)
+        if (self.skip_unchanged and not force
+                and not snapshot.needs_transmission(self._last_sent.get(unit))):
+            self.metrics.suppressed += 1
+            waiter.set_result(None)
+            if pending is not None:
+                del self._pending[unit]
+                self.metrics.queue_depth = len(self._pending)
+                for pending_waiter in pending.waiters:
+                    if not pending_waiter.done():
+                        pending_waiter.set_result(None)
+            return waiter
+
+        if pending is None:
+            self._pending[unit] = _Pending(snapshot, timings, self.clock(), [waiter])
+        else:
+            pending.command = snapshot
+            pending.timings = timings
+            pending.waiters.append(waiter)
+            self.metrics.coalesced += 1
+
+        self.metrics.queue_depth = len(self._pending)
+        self.metrics.max_queue_depth = max(self.metrics.max_queue_depth, self.metrics.queue_depth)
+        self._idle.clear()
+        self._wakeup.set()
+        return waiter
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+    def last_sent(self, unit: Hashable) -> Panasonic | None:
+        """Command last transmitted to <unit>, None if none or forgotten."""
+        return self._last_sent.get(unit)
+
+    def forget(self, unit: Hashable | None = None) -> None:
+        """Drop the last sent state of <unit>, default all units, eg after
+        the unit was changed with its own remote; its next command is sent."""
+        if unit is None:
+            self._last_sent.clear()
+        else:
+            self._last_sent.pop(unit, None)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self, drain: bool = True) -> None:
+        """Stop the scheduler, by default once every pending command is sent.
+
+        Without <drain>, a transmission in progress is abandoned and the
+        futures of it and of every pending command are cancelled.
+        """
+        if drain:
+            await self.join()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._sending is not None:
+            for waiter in self._sending.waiters:
+                waiter.cancel()
+            self._sending = None
+        for pending in self._pending.values():
+            for waiter in pending.waiters:
+                waiter.cancel()
+        self._pending.clear()
+        self.metrics.queue_depth = 0
+
+    async def join(self) -> None:
+        """Wait until no command is pending or being sent."""
+        await self._idle.wait()
+
+    async def __aenter__(self) -> TransmitScheduler:
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.stop(drain=exc_info[0] is None)
+
+    async def _run(self) -> None:
+        while True:
+            if not self._pending:
+                self._idle.set()
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            delay = self._last_end + self.min_gap - self.clock()
+            if delay > 0:
+                # Commands submitted meanwhile are still coalesced
+                await self.sleep(delay)
+                if not self._pending:
+                    # Suppressed meanwhile (see submit)
+                    continue
+
+            unit = next(iter(self._pending))
+            self._sending = self._pending.pop(unit)
+            self.metrics.queue_depth = len(self._pending)
+            await self._send(unit, self._sending)
+            self._sending = None
+
+    async def _send(self, unit: Hashable, pending: _Pending) -> None:
+        try:
+            timings = pending.timings if pending.timings is not None else pending.command.to_timings()
+            await self.transmitter.send(timings)
+        except Exception as e:
+            self.metrics.failed += 1
+            # Whatever the unit received is unknown now
+            self._last_sent.pop(unit, None)
+            for waiter in pending.waiters:
+                if not waiter.done():
+                    waiter.set_exception(e)
+        except asyncio.CancelledError:
+            # Whether the unit received the command is unknown (see stop)
+            self._last_sent.pop(unit, None)
+            raise
+        else:
+            self._last_sent[unit] = pending.command
+            self.metrics.sent += 1
+            self.metrics.latencies.append(self.clock() - pending.submitted_at)
+            for waiter in pending.waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+        finally:
+            self._last_end = self.clock()
@@ -0,0 +1,281 @@
+"""Columnar storage of decoded commands.
+
+One row per command in a structured NumPy array, with the raw frame bytes
+and every decoded field as columns. Fields are extracted for the whole batch
+at once with array operations rather than per object property calls, read
+at the positions of the Panasonic.PROTOCOL fields and decoded by the same
+rules as the Panasonic properties. The store saves to and loads from a
+single ``.npy`` file.
+
+The frame columns hold the nominal frame lengths, widened when a capture
+holds longer frames (eg the swapped pairs of clear.dat) so every decoded
+frame round trips.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Iterable, Sequence
+
+import numpy as np
+
+from airconcontroller.controllers.capture import is_capture, load_capture
+from airconcontroller.controllers.conversion import bytes_to_bits
+from airconcontroller.controllers.decoder import TimingThresholds, tokenize
+from airconcontroller.controllers.panasonic import Panasonic
+from airconcontroller.controllers.protocol import Field
+
+
+# Nominal frame lengths of Panasonic.PROTOCOL
+FRAME1_BITS, FRAME2_BITS = Panasonic.PROTOCOL.frame_bits
+FRAME1_BYTES = FRAME1_BITS // 8
+FRAME2_BYTES = FRAME2_BITS // 8
+
+# Columns holding the raw value of a field of Panasonic.PROTOCOL, of the same name
+FIELD_COLUMNS = ("power", "mode", "fan", "swing")
+
+
+def command_dtype(frame1_bytes: int = FRAME1_BYTES, frame2_bytes: int = FRAME2_BYTES) -> np.dtype:
+    """Row type of a store whose frame columns hold <frame1_bytes> and <frame2_bytes>."""
+    return np.dtype([
+        ("frame1", np.uint8, (frame1_bytes,)),
+        ("frame2", np.uint8, (frame2_bytes,)),
+        ("frame1_bits", np.uint16),
+        ("frame2_bits", np.uint16),
+        ("power", np.uint8),
+        ("mode", np.uint8),
+        ("temperature", np.float32),
+        ("fan", np.uint8),
+        ("swing", np.uint8),
+        ("crc", np.uint8),
+        ("crc_valid", np.bool_),
+        ("offset", np.uint64),
+    ])
+
+
+COMMAND_DTYPE = command_dtype()
+
+
+def frame_bytes(records: np.ndarray) -> tuple[int, int]:
+    """Widths of the frame columns of <records>, raising ValueError if not store rows."""
+    dtype = records.dtype
+    if dtype.names != COMMAND_DTYPE.names:
+        raise ValueError("Not command store rows")
+    widths = dtype["frame1"].shape[0], dtype["frame2"].shape[0]
+    if dtype != command_dtype(*widths) or widths[0] < FRAME1_BYTES or widths[1] < FRAME2_BYTES:
+        raise ValueError("Not command store rows")
+    return widths
+
+
+def widen(records: np.ndarray, frame1_bytes: int, frame2_bytes: int) -> np.ndarray:
+    """Copy of <records> with frame columns of <frame1_bytes> and <frame2_bytes>."""
+    widened = np.zeros(len(records), dtype=command_dtype(frame1_bytes, frame2_bytes))
+    for name in COMMAND_DTYPE.names:
+        if name in ("frame1", "frame2"):
+            widened[name][:, :records.dtype[name].shape[0]] = records[name]
+        else:
+            widened[name] = records[name]
+    return widened
+
+
+def field_values(frames: Sequence[np.ndarray], field: Field) -> np.ndarray:
+    """Raw value of <field> in every row of the packed frame columns <frames>."""
+    return (frames[field.frame][:, field.byte - 1] & field.mask) >> field.shift
+
+
+def _lookup(values: np.ndarray, field: str, names: dict[int, str], unknown: str) -> np.ndarray:
+    """Name of every raw value of <field>, <unknown> for a value not in <names>."""
+    width = Panasonic.PROTOCOL.field_map[field].width
+    table = np.array([names.get(idx, unknown) for idx in range(1 << width)], dtype=object)
+    return table[values]
+
+
+def pack_frames(bits: np.ndarray, counts: np.ndarray, frame_idx: int, width: int) -> np.ndarray:
+    """Pack one frame of every pair into a (pairs, width / 8) byte matrix.
+
+    Args:
+        bits (np.ndarray): bits of every frame back to back
+        counts (np.ndarray): bit count of each frame, frame1/frame2 alternating
+        frame_idx (int): 0 for frame1, 1 for frame2
+        width (int): frame length in bits
+
+    Raises:
+        ValueError: for a frame longer than <width> bits, which would not
+            round trip through the store
+
+    Returns:
+        np.ndarray: LSB first packed bytes, short frames zero padded
+    """
+    pair_count = len(counts) // 2
+    overlong = np.flatnonzero(counts[frame_idx::2] > width)
+    if len(overlong):
+        raise ValueError(f"Frame{frame_idx + 1} of command {overlong[0]} has "
+                         f"{counts[frame_idx::2][overlong[0]]} bits, more than {width}")
+
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    group = np.repeat(np.arange(len(counts)), counts)
+    position = np.arange(len(group)) - offsets[group]
+
+    selected = group % 2 == frame_idx
+    matrix = np.zeros((pair_count, width), dtype=np.uint8)
+    matrix[group[selected] // 2, position[selected]] = bits[:len(group)][selected]
+
+    return np.packbits(matrix, axis=1, bitorder="little")
+
+
+class CommandStore:
+    """Decoded commands, one row per command."""
+
+    def __init__(self, records: np.ndarray | None = None):
+        self.records = records if records is not None else np.zeros(0, dtype=COMMAND_DTYPE)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, key: Any) -> np.ndarray:
+        return self.records[key]
+
+    @classmethod
+    def from_frames(cls, frame1: np.ndarray, frame2: np.ndarray, offsets: np.ndarray,
+                    frame1_bits: np.ndarray | None = None,
+                    frame2_bits: np.ndarray | None = None) -> CommandStore:
+        """Build a store from packed frame bytes, extracting every field.
+
+        Args:
+            frame1 (np.ndarray): (commands, 8 or more) command frame bytes
+            frame2 (np.ndarray): (commands, 19 or more) data frame bytes
+            offsets (np.ndarray): line index each command starts at
+            frame1_bits (np.ndarray | None): received bits of each frame1
+            frame2_bits (np.ndarray | None): received bits of each frame2
+        """
+        records = np.zeros(len(frame2), dtype=command_dtype(frame1.shape[1], frame2.shape[1]))
+        records["frame1"] = frame1
+        records["frame2"] = frame2
+        records["frame1_bits"] = FRAME1_BITS if frame1_bits is None else frame1_bits
+        records["frame2_bits"] = FRAME2_BITS if frame2_bits is None else frame2_bits
+        records["offset"] = offsets
+
+        frames = (frame1, frame2)
+        fields = Panasonic.PROTOCOL.field_map
+        for name in FIELD_COLUMNS:
+            records[name] = field_values(frames, fields[name])
+
+        # As Panasonic.temperature, the half degree only counts away from the limits
+        half_degree = (field_values(frames, fields["temperature_half"]).astype(bool)
+                       & ~field_values(frames, fields["temperature_limit"]).astype(bool))
+        records["temperature"] = field_values(frames, fields["temperature"]) + half_degree * 0.5
+        # As Checksum.calculate and Panasonic.crc_valid, over complete data frames only
+        checksum = Panasonic.PROTOCOL.checksum
+        summed = frames[checksum.frame]
+        records["crc"] = summed[:, checksum.byte - 1]
+        records["crc_valid"] = (
+            (summed[:, :checksum.byte - 1].sum(axis=1, dtype=np.uint32) % 256 == records["crc"])
+            & (records[f"frame{checksum.frame + 1}_bits"] == Panasonic.PROTOCOL.frame_bits[checksum.frame])
+        )
+
+        return cls(records)
+
+    @classmethod
+    def from_symbols(cls, events: np.ndarray, durations: np.ndarray, lines: Sequence[str] | None = None,
+                     thresholds: TimingThresholds | None = None) -> CommandStore:
+        """Decode the tokenised events of a complete capture straight into a store.
+
+        Args:
+            events (np.ndarray): event codes
+            durations (np.ndarray): event durations (us)
+            lines (Sequence[str] | None): source lines, quoted in errors
+            thresholds (TimingThresholds | None): timing windows of the
+                receiver, default nominal
+
+        Raises:
+            ValueError: on the first symbol outside of the timing windows
+        """
+        decoder = Panasonic.PROTOCOL.decoder(thresholds)
+        bits, counts, pair_starts = decoder.decode_events(events, durations, lines)
+        counts = counts[:-2]  # pair left open after the last timeout
+
+        # Frame columns widened to whole bytes for any longer frame
+        width1 = -(-max(FRAME1_BITS, int(counts[0::2].max(initial=0))) // 8) * 8
+        width2 = -(-max(FRAME2_BITS, int(counts[1::2].max(initial=0))) // 8) * 8
+
+        return cls.from_frames(
+            pack_frames(bits, counts, 0, width1),
+            pack_frames(bits, counts, 1, width2),
+            pair_starts[:len(counts) // 2],
+            counts[0::2], counts[1::2])
+
+    @classmethod
+    def from_lines(cls, lines: Sequence[str], thresholds: TimingThresholds | None = None) -> CommandStore:
+        """Decode a complete mode2 capture straight into a store."""
+        return cls.from_symbols(*tokenize(lines), lines, thresholds)
+
+    @classmethod
+    def from_file(cls, filepath: str | Path, thresholds: TimingThresholds | None = None,
+                  calibrate: bool = False) -> CommandStore:
+        """Decode a mode2 text capture, or a binary capture, as Panasonic.parse_file does.
+
+        Args:
+            filepath (str | Path): capture file
+            thresholds (TimingThresholds | None): timing windows of the
+                receiver (see controllers.calibration), default nominal
+            calibrate (bool): learn the timing windows from this capture
+        """
+        lines = None
+        if is_capture(filepath):
+            capture = load_capture(filepath)
+            events, durations = capture.events, capture.durations
+        else:
+            lines = Path(filepath).read_text().splitlines()
+            events, durations = tokenize(lines)
+
+        if calibrate:
+            from airconcontroller.controllers.calibration import calibrate as calibrate_timings
+
+            thresholds = calibrate_timings(events, durations, Panasonic.PROTOCOL)
+
+        return cls.from_symbols(events, durations, lines, thresholds)
+
+    @classmethod
+    def concatenate(cls, stores: Iterable[CommandStore]) -> CommandStore:
+        """Rows of every store, widening the frame columns to the widest."""
+        records = [s.records for s in stores] or [np.zeros(0, dtype=COMMAND_DTYPE)]
+        widths = [frame_bytes(r) for r in records]
+        frame1_bytes = max(w[0] for w in widths)
+        frame2_bytes = max(w[1] for w in widths)
+        return cls(np.concatenate([r if w == (frame1_bytes, frame2_bytes) else widen(r, frame1_bytes, frame2_bytes)
+                                   for r, w in zip(records, widths)]))
+
+    @property
+    def power_names(self) -> np.ndarray:
+        return _lookup(self.records["power"], "power", Panasonic.POWER_VALUES, "UNKNOWN")
+
+    @property
+    def mode_names(self) -> np.ndarray:
+        return _lookup(self.records["mode"], "mode", Panasonic.MODE_VALUES, "UNKNOWN")
+
+    @property
+    def fan_names(self) -> np.ndarray:
+        return _lookup(self.records["fan"], "fan", Panasonic.FAN_VALUES, "UNKNOWN")
+
+    @property
+    def swing_names(self) -> np.ndarray:
+        return _lookup(self.records["swing"], "swing", Panasonic.SWING_VALUES, "UNKNOWN")
+
+    def commands(self) -> list[Panasonic]:
+        """Materialise the rows as Panasonic objects."""
+        return [
+            Panasonic(bytes_to_bits(row["frame1"].tobytes(), int(row["frame1_bits"])),
+                      bytes_to_bits(row["frame2"].tobytes(), int(row["frame2_bits"])))
+            for row in self.records
+        ]
+
+    def save(self, filepath: str | Path) -> None:
+        np.save(filepath, self.records, allow_pickle=False)
+
+    @classmethod
+    def load(cls, filepath: str | Path, mmap: bool = False) -> CommandStore:
+        records = np.load(filepath, mmap_mode="r" if mmap else None, allow_pickle=False)
+        try:
+            frame_bytes(records)
+        except ValueError:
+            raise ValueError(f"Not a command store: {filepath}") from None
+        return cls(records)
@@ -3,98 +3,177 @@ from __future__ import annotations
 
 import argparse
 import csv
+
+from dataclasses import dataclass
+from itertools import islice
 from pathlib import Path
 from struct import pack, unpack
-from typing import Tuple, Union
+from typing import Iterator, Tuple, Union
 
 import numpy as np
-from colorama import Fore, Style, init
 
-from cCmdString import CmdString
+from airconcontroller.controllers.cache import DecodeCache
+from airconcontroller.controllers.capture import DURATION_MASK, EVENT_SHIFT, is_capture, load_capture
+from airconcontroller.controllers.decoder import (EVENT_BANNER, EVENT_INVALID, EVENT_NAMES, EVENT_SPACE,
+                                                  EVENT_TIMEOUT, tokenize)
+from airconcontroller.cCmdString import CmdString
+
+
+# Decode cache used by parse_file, set by --cache
+CACHE: DecodeCache | None = None
+
+
+@dataclass
+class CaptureDiff:
+    """Bit changes between adjacent captures, all per bit of the widest capture."""
+    changes: np.ndarray
+    first: np.ndarray
+    last: np.ndarray
+    mask: np.ndarray
+    pairs: int
+
+    @property
+    def frequency(self) -> np.ndarray:
+        """Fraction of adjacent capture pairs each bit changes between."""
+        return self.changes / max(self.pairs, 1)
+
+
+def stack_captures(collected: list[list[int]], width: int | None = None) -> np.ndarray:
+    """Stack captures into a (captures, width) bool matrix.
+
+    Captures shorter than <width> (default the first capture's length) are
+    padded with 0 bits, longer ones truncated.
+    """
+    width = len(collected[0]) if width is None else width
+    lengths = np.fromiter((min(len(c), width) for c in collected), dtype=np.int64, count=len(collected))
+
+    if (lengths == width).all():
+        return np.array([c[:width] for c in collected], dtype=bool).reshape(len(collected), width)
+
+    stacked = np.zeros((len(collected), width), dtype=bool)
+    filled = np.arange(width) < lengths[:, None]
+    stacked[filled] = np.fromiter((b for c, n in zip(collected, lengths.tolist()) for b in c[:n]),
+                                  dtype=bool, count=int(lengths.sum()))
+    return stacked
+
+
+def diff_captures(stacked: np.ndarray, spacing: int = 8) -> CaptureDiff:
+    """Reduce a stacked capture matrix to its per bit and per byte changes.
+
+    Args:
+        stacked (np.ndarray): (captures, bits) matrix from stack_captures
+        spacing (int): bits per mask entry
 
+    Returns:
+        CaptureDiff: per bit change count, the first/last capture each bit
+            differs from its predecessor in (-1 if never) and the per
+            <spacing> bit change mask
+    """
+    changed = stacked[1:] ^ stacked[:-1]
+    changes = changed.sum(axis=0)
+    ever = changes > 0
 
-# Colorama settings
-init(autoreset=True)
+    first = last = np.full(stacked.shape[1], -1)
+    if len(changed):
+        first = np.where(ever, changed.argmax(axis=0) + 1, -1)
+        last = np.where(ever, len(changed) - changed[::-1].argmax(axis=0), -1)
+
+    groups = -(-stacked.shape[1] // spacing)
+    padded = np.zeros(groups * spacing, dtype=bool)
+    padded[:len(ever)] = ever
+
+    return CaptureDiff(changes, first, last, padded.reshape(groups, spacing).any(axis=1), len(changed))
 
 
 def make_mask(collected, ref=None, spacing=8):
-    c = collected.copy()
+    c = list(collected)
     if ref is not None:
         if isinstance(ref[0], (list,)):
             c.extend(ref)
         else:
             c.append(ref)
 
-    mask = [False] * (len(c[0]) // spacing)
-    for cIdx in range(len(c) - 1):
-        for mIdx in range(len(c[0])):
-            mask[mIdx // spacing] |= (
-                c[cIdx][mIdx] ^ c[cIdx + 1][mIdx])
+    return diff_captures(stack_captures(c), spacing=spacing).mask
 
-    return mask
+
+def format_capture(bits: str, mask=None, spacing=8, display_filter=None) -> str:
+    """Render a capture bit string in <spacing> groups, highlighting masked groups."""
+    cc = [bits[idx:idx + spacing] for idx in range(0, len(bits), spacing)]
+    if mask is not None and len(mask):
+        from colorama import Fore, Style
+    for mIdx in range(min(len(cc), len(mask if mask is not None else []))):
+        if mask[mIdx]:
+            cc[mIdx] = Style.BRIGHT + cc[mIdx] + Style.RESET_ALL
+        else:
+            cc[mIdx] = Fore.LIGHTBLACK_EX + cc[mIdx] + Style.RESET_ALL
+
+    if display_filter is not None:
+        cc = [cc[idx] for idx in range(len(cc)) if idx * 8 in display_filter]
+
+    return f"{' '.join(cc).strip()}   {len(bits)}"
 
 
 def print_capture(c, mask=None, spacing=8, display_filter=None):
     if isinstance(c[0], (list,)):
-        mask = make_mask(c, mask, spacing=spacing)
-        [print_capture(d, mask, spacing=spacing,
-                       display_filter=display_filter) for d in c]
+        mask = make_mask(c, mask, spacing=spacing).tolist()
+
+        stacked = stack_captures(c, max(len(d) for d in c))
+        rows = (stacked.view(np.uint8) + ord("0")).tobytes().decode()
+        width = stacked.shape[1]
+        for idx, d in enumerate(c):
+            print(format_capture(rows[idx * width:idx * width + len(d)], mask, spacing, display_filter))
 
     else:
-        length = len(c)
+        print(format_capture("".join(str(b) for b in c), mask, spacing, display_filter))
 
-        cc = [f"{''.join([f'{j}' for j in c[spacing * i:spacing * i + spacing]])}" for i in range(38)]  # noqa
-        for mIdx in range(len(mask or [])):
-            if mask[mIdx]:
-                cc[mIdx] = Style.BRIGHT + cc[mIdx] + Style.RESET_ALL
-            else:
-                cc[mIdx] = Fore.LIGHTBLACK_EX + cc[mIdx] + Style.RESET_ALL
 
-        if display_filter is not None:
-            cc = [cc[idx] for idx in range(len(cc)) if idx * 8 in display_filter]
+SPACE_LENGTHS = np.array([
+    CmdString.SPACE_SHORT,
+    CmdString.SPACE_LONG,
+    CmdString.SEPARATOR,
+    CmdString.SPACE_INTRO],
+    dtype=np.int64)
 
-        print((" ".join(cc)).strip(), f"  {length}")
 
+def collect_bits(events: np.ndarray, durations: np.ndarray) -> list[list[int]]:
+    """Split the space bits into one capture per timeout.
 
-def parse_file(file: Path):
-    # CmdStr = CmdString.default()
-    out: list[int] = []
-    collected = []
-    with open(file) as ifp:
-        for line in ifp:
+    Every space is matched to its nearest nominal length (as
+    CmdString.get_space does) in one pass. A SEPARATOR space drops the
+    lead-in received so far; captures without bits are skipped.
+    """
+    durations = durations.astype(np.int64)
+    spaces = events == EVENT_SPACE
+    timeouts = events == EVENT_TIMEOUT
 
-            line = line.strip()
-            t, pulse_len, *_ = line.split(" ")
+    nearest = SPACE_LENGTHS[np.argmin(np.abs(durations[:, None] - SPACE_LENGTHS), axis=1)]
+    resets = timeouts | (spaces & (nearest == CmdString.SEPARATOR))
+    is_bit = spaces & ((nearest == CmdString.SPACE_SHORT) | (nearest == CmdString.SPACE_LONG))
 
-            if t == "space":
-                length = int(pulse_len)
+    segments = np.cumsum(resets) - resets
+    counts = np.bincount(segments[is_bit], minlength=int(resets.sum()) + 1)
+    offsets = np.concatenate(([0], np.cumsum(counts))).tolist()
+    bits = (nearest[is_bit] == CmdString.SPACE_LONG).astype(int).tolist()
 
-                if CmdString.get_space(length) == CmdString.SEPARATOR:
-                    out = []  # uncomment to exclude leadin
-                    continue
+    return [bits[offsets[seg]:offsets[seg + 1]] for seg in segments[timeouts].tolist() if counts[seg]]
 
-                elif CmdString.get_space(length) == CmdString.SPACE_INTRO:
-                    continue
 
-                elif CmdString.get_space(length) == CmdString.SPACE_SHORT:
-                    out.append(0)
-                    continue
+def decode_file(file: Path) -> list[list[int]]:
+    if is_capture(file):
+        capture = load_capture(file)
+        events, durations = capture.events, capture.durations
+    else:
+        with open(file) as ifp:
+            events, durations = tokenize(ifp.read().splitlines())
 
-                elif CmdString.get_space(length) == CmdString.SPACE_LONG:
-                    out.append(1)
-                    continue
+    return collect_bits(events, durations)
 
-            elif t == "timeout":
-                if len(out):
-                    collected.append(list(out))
-                # if len(out) == CmdString.EXPECTED_LENGTH:
-                #     collected.append(list(out))
-                # else:
-                #     print(f"Line too short ({len(out)}), dropped")
-                #     print(out)
 
-                out = []
-                # break
+def parse_file(file: Path):
+    if CACHE is not None:
+        collected = CACHE.cached(file, "data_convert.collect_bits", {"spaces": SPACE_LENGTHS.tolist()}, decode_file)
+    else:
+        collected = decode_file(file)
 
     print(f"{file.name}: {len(collected or [])}")
     if len(collected):
@@ -103,30 +182,148 @@ def parse_file(file: Path):
     return None
 
 
-def process_to_csv(files: list[Path]):
+# Lines tokenized at a time while reading a capture for export
+EXPORT_BLOCK_LINES = 65536
+
+# Event code of the cells padding ragged captures
+EVENT_PAD = -1
 
+
+@dataclass
+class CaptureMatrix:
+    """Symbol index x capture matrix, one column per timeout terminated capture.
+
+    Captures shorter than the longest are padded with EVENT_PAD events and 0
+    durations; <lengths> holds the real symbol count of each capture.
+    """
+    events: np.ndarray
+    durations: np.ndarray
+    lengths: np.ndarray
+
+    @property
+    def padding(self) -> np.ndarray:
+        return self.events == EVENT_PAD
+
+    def event_names(self) -> list[str]:
+        """Event of each row, from the first capture long enough to have it."""
+        first = (~self.padding).argmax(axis=1)
+        row_events = self.events[np.arange(len(self.events)), first]
+        return [EVENT_NAMES[event] for event in row_events.tolist()]
+
+
+def iter_captures(file: Path) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+    """Stream the (events, durations) of each capture of a text or binary capture file.
+
+    Text captures are tokenized EXPORT_BLOCK_LINES lines at a time, so only
+    the capture being assembled is held besides the block. Symbols after
+    the last timeout are dropped.
+
+    Raises:
+        ValueError: for a line that is not a pulse, space or timeout
+    """
+    if is_capture(file):
+        capture = load_capture(file)
+        start = 0
+        for end in capture.frame_index.tolist():
+            symbols = capture.symbols[start:end + 1]
+            yield (symbols >> EVENT_SHIFT).astype(np.int8), (symbols & DURATION_MASK).astype(np.uint32)
+            start = end + 1
+        return
+
+    pending_events = np.zeros(0, dtype=np.int8)
+    pending_durations = np.zeros(0, dtype=np.uint32)
+    line_idx = 0
+    with open(file) as ifp:
+        while block := [line.rstrip("\r\n") for line in islice(ifp, EXPORT_BLOCK_LINES)]:
+            events, durations = tokenize(block)
+            invalid = np.flatnonzero(events == EVENT_INVALID)
+            if len(invalid):
+                raise ValueError(f"Unknown event at: ln{line_idx + invalid[0]:>4}: {block[invalid[0]]}")
+            line_idx += len(block)
+
+            kept = events != EVENT_BANNER
+            events = np.concatenate((pending_events, events[kept]))
+            durations = np.concatenate((pending_durations, durations[kept].astype(np.uint32)))
+
+            start = 0
+            for end in np.flatnonzero(events == EVENT_TIMEOUT).tolist():
+                yield events[start:end + 1], durations[start:end + 1]
+                start = end + 1
+            pending_events, pending_durations = events[start:], durations[start:]
+
+
+def capture_lengths(file: Path) -> np.ndarray:
+    """Symbol count of each capture of a file, see iter_captures."""
+    if is_capture(file):
+        ends = load_capture(file).frame_index.astype(np.int64)
+        return np.diff(ends, prepend=-1)
+    return np.array([len(events) for events, _ in iter_captures(file)], dtype=np.int64)
+
+
+def capture_matrix(file: Path, directory: Path | None = None) -> CaptureMatrix:
+    """Collect every capture of a file into a padded symbol x capture matrix.
+
+    The file is streamed twice, once to size the matrix and once to fill it,
+    so only the matrix and a single capture are held.
+
+    Args:
+        file (Path): text or binary capture file
+        directory (Path | None): directory to memory map the matrix in, as
+            events.npy and durations.npy, rather than holding it in memory
+    """
+    lengths = capture_lengths(file)
+    shape = (int(lengths.max(initial=0)), len(lengths))
+
+    # Column major, so each capture is contiguous as it is filled and saved
+    if directory is not None:
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        events = np.lib.format.open_memmap(Path(directory) / "events.npy", "w+", np.int8, shape, fortran_order=True)
+        durations = np.lib.format.open_memmap(Path(directory) / "durations.npy", "w+", np.uint32, shape,
+                                              fortran_order=True)
+        events[:] = EVENT_PAD
+    else:
+        events = np.full(shape, EVENT_PAD, dtype=np.int8, order="F")
+        durations = np.zeros(shape, dtype=np.uint32, order="F")
+
+    for idx, (capture_events, capture_durations) in enumerate(iter_captures(file)):
+        events[:len(capture_events), idx] = capture_events
+        durations[:len(capture_durations), idx] = capture_durations
+
+    return CaptureMatrix(events, durations, lengths)
+
+
+def write_csv(matrix: CaptureMatrix, outfile: Path, block_rows: int = 4096):
+    """Write one row per symbol index: its event, then its duration in each capture.
+
+    Padding cells are left empty. Rows are formatted <block_rows> at a time.
+    """
+    names = matrix.event_names()
+    with open(outfile, 'w', newline='') as ofp:
+        csvwriter = csv.writer(ofp)
+        for start in range(0, len(names), block_rows):
+            cells = matrix.durations[start:start + block_rows].astype(str).astype(object)
+            cells[matrix.padding[start:start + block_rows]] = ""
+            csvwriter.writerows([name, *row] for name, row in zip(names[start:start + block_rows], cells.tolist()))
+
+
+def write_columnar(matrix: CaptureMatrix, outfile: Path):
+    """Save the matrix as an uncompressed .npz of events, durations and lengths."""
+    np.savez(outfile, events=matrix.events, durations=matrix.durations, lengths=matrix.lengths)
+
+
+def load_columnar(infile: Path) -> CaptureMatrix:
+    with np.load(infile, allow_pickle=False) as data:
+        return CaptureMatrix(data["events"], data["durations"], data["lengths"])
+
+
+def process_to_csv(files: list[Path], columnar: bool = False):
+    """Export each capture file next to itself as .csv, or .npz if <columnar>."""
     for file in files:
-        outfile = file.with_suffix(".csv")
-        with open(file) as ifp:
-            data = []
-            data_set = []
-            for line in ifp:
-                if line.startswith("Running"):
-                    continue
-                t, length, *_ = line.strip().split(" ")
-                data_set.append([t, int(length)])
-                if t == "timeout":
-                    data.append(data_set.copy())
-                    data_set = []
-
-        csv_data = [[data[0][dIdx][0]] for dIdx in range(len(data[0]))]
-        for dsIdx in range(len(data)):
-            for dIdx in range(len(data[dsIdx])):
-                csv_data[dIdx].append(data[dsIdx][dIdx][1])
-
-        with open(outfile, 'w', newline='') as ofp:
-            csvwriter = csv.writer(ofp)
-            csvwriter.writerows(csv_data)
+        matrix = capture_matrix(file)
+        if columnar:
+            write_columnar(matrix, file.with_suffix(".npz"))
+        else:
+            write_csv(matrix, file.with_suffix(".csv"))
 
 
 def processs(
@@ -147,6 +344,11 @@ def processs(
 
 
 if __name__ == '__main__':
+    # Colorama settings, imported here as only the terminal output needs it
+    from colorama import init
+
+    init(autoreset=True)
+
     parser = argparse.ArgumentParser()
     parser.add_argument("-s", "--startswith")
     parser.add_argument("-e", "--endswith")
@@ -154,10 +356,16 @@ if __name__ == '__main__':
     parser.add_argument("-me", "--mask-endswith")
     parser.add_argument("-f", "--filter", action="append")
     parser.add_argument("--to-csv", action="store_true")
+    parser.add_argument("--to-npz", action="store_true", help="export to a columnar .npz instead of CSV")
+    parser.add_argument("--cache", nargs="?", const="", metavar="DIR",
+                        help="reuse decoded captures from a decode cache (default directory if no DIR)")
 
     args = parser.parse_args()
 
-    FILES = [f.resolve() for f in Path("./data").iterdir()]
+    if args.cache is not None:
+        CACHE = DecodeCache(args.cache or None)
+
+    FILES = [f.resolve() for f in (Path(__file__).parent / "data").iterdir()]
     FILES = [f for f in FILES if f.name.endswith(".dat")]
 
     files = list(FILES)
@@ -219,8 +427,8 @@ if __name__ == '__main__':
             if fil in ["BYTE_18", "CHECKSUM1_BYTE"]:
                 filters.append(CmdString.BYTE_18)
 
-    if args.to_csv:
-        process_to_csv(files)
+    if args.to_csv or args.to_npz:
+        process_to_csv(files, columnar=args.to_npz)
     else:
         processs(files, mask, display_filter=filters)
 
@@ -1,18 +1,19 @@
 # from dataclasses import InitVar, dataclass, field
-from cgi import test
 from pathlib import Path
 # from math import isclose
 # import re
+import os
 
-from controllers import Panasonic
+from airconcontroller.controllers import Panasonic
+from airconcontroller.controllers.cache import ENV_VAR as CACHE_ENV_VAR, DecodeCache
 
 
-def extract_cmds(filepaths: list[str]) -> dict[str, list[Panasonic]]:
+def extract_cmds(filepaths: list[str], cache: DecodeCache | None = None) -> dict[str, list[Panasonic]]:
     cmds: dict[str, list[Panasonic]] = {}
 
     for filepath in filepaths:
         fp = Path(filepath)
-        cmds[fp.name] = Panasonic.parse_file(fp)
+        cmds[fp.name] = cache.parse_file(fp) if cache is not None else Panasonic.parse_file(fp)
 
     return cmds
 
@@ -32,19 +33,22 @@ def print_cmds(cmds_dict: dict[str, list[Panasonic]]):
 
 if __name__ == "__main__":
 
+    data_dir = Path(__file__).parent / "data"
     testfiles = [
-        "airconcontroller\data\off_set.dat",
-        "airconcontroller\data\heat_16_to_30.dat",
-        "airconcontroller\data\dry_16_strength_auto_strong.dat",
-        "airconcontroller\data\dry_16_angle_auto_shallow_steep.dat",
-        # "airconcontroller\data\dry_16_timer_off_1_12.dat",
-        # "airconcontroller\data\dry_16_timer_on_1_12.dat",
-        "airconcontroller\data\cool_16.dat",
-        "airconcontroller\data\dry_16.dat",
-        "airconcontroller\data\heat_16.dat",
+        data_dir / "off_set.dat",
+        data_dir / "heat_16_to_30.dat",
+        data_dir / "dry_16_strength_auto_strong.dat",
+        data_dir / "dry_16_angle_auto_shallow_steep.dat",
+        # data_dir / "dry_16_timer_off_1_12.dat",
+        # data_dir / "dry_16_timer_on_1_12.dat",
+        data_dir / "cool_16.dat",
+        data_dir / "dry_16.dat",
+        data_dir / "heat_16.dat",
     ]
 
-    cmds_dict = extract_cmds(testfiles)
+    # Only cache the decoded captures when asked to, in $AIRCON_CACHE_DIR
+    cache = DecodeCache() if os.environ.get(CACHE_ENV_VAR) else None
+    cmds_dict = extract_cmds(testfiles, cache)
     print_cmds(cmds_dict)
 
     # cmds = Panasonic.parse_file(testfile)[-5:]
@@ -2,14 +2,19 @@
 
 # Learn more: https://github.com/kennethreitz/setup.py
 
+import os
+
 from setuptools import setup, find_packages
 
 
 with open('README.md') as f:
     readme = f.read()
 
-with open('LICENSE') as f:
-    license = f.read()
+# LICENSE is not in every checkout
+license = None
+if os.path.exists('LICENSE'):
+    with open('LICENSE') as f:
+        license = f.read()
 
 setup(
     name='airconcontroller',
@@ -20,5 +25,12 @@ setup(
     author_email='frazier.cameron@gmail.com',
     url='https://github.com/cameronfrazier/AirConController',
     license=license,
-    packages=["airconcontroller"]
+    packages=find_packages(include=["airconcontroller", "airconcontroller.*"]),
+    package_data={"airconcontroller": ["data/*.dat"]},
+    install_requires=["attrs", "colorama", "numpy"],
+    entry_points={
+        "console_scripts": [
+            "aircon=airconcontroller.cli:main",
+        ],
+    },
 )
@@ -0,0 +1,36 @@
+"""The bundled capture corpus and what it decodes to."""
+from __future__ import annotations
+
+from pathlib import Path
+
+DATA_DIR = Path(__file__).parent.parent / "airconcontroller" / "data"
+
+# Data frame checksum of each command of the captures decoding cleanly
+EXPECTED_CRCS = {
+    "cool_16.dat": [130] * 10,
+    "cool_set.dat": [54] * 10,
+    "dry_16.dat": [114] * 10,
+    "dry_16_angle_auto_shallow_steep.dat": [114, 100, 101, 102, 103, 104] * 2 + [114],
+    "dry_16_strength_auto_strong.dat": [114, 242, 2, 18, 50] * 2 + [114],
+    "dry_16_timer_off_1_12.dat": [195, 135, 75, 15, 210, 150, 90, 30, 225, 165, 105, 45] * 2 + [195],
+    "dry_16_timer_on_1_12.dat": [12, 72, 132, 192, 253, 57, 117, 177, 238, 42, 102, 162] * 2 + [12],
+    "dry_set.dat": [38] * 11,
+    "heat.dat": [142],
+    "heat_16.dat": [130] * 10,
+    "heat_16_to_30.dat": [132, 2, 132, 4, 134, 6, 136, 8, 138, 10, 140, 12, 142, 14, 144, 16, 146, 18, 148, 20,
+                          150, 22, 152, 24, 154, 26, 156, 28, 160, 160, 160, 160],
+    "heat_set.dat": [142] * 10,
+    "off_set.dat": [141] * 9,
+    "timer_on.dat": ([99, 39, 234, 174, 114, 54, 249, 189, 129, 69, 219, 159] * 2)[:23],
+}
+
+# Captures opening with a stray pulse and timeout: every frame pair is
+# swapped, so no data frame is complete (see Panasonic.recover_file)
+SWAPPED_CAPTURES = {"clear.dat": 9, "timer_off.dat": 23}
+
+# Captures with a symbol outside of the nominal timing windows
+BAD_CAPTURES = {"temp_change.dat": "ln7482: space 1685"}
+
+
+def capture(name: str) -> Path:
+    return DATA_DIR / name
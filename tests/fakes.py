@@ -0,0 +1,51 @@
+"""In-process stand-ins for the transmit scheduler tests."""
+from __future__ import annotations
+
+import asyncio
+
+from array import array
+from dataclasses import dataclass, field
+
+
+class FakeClock:
+    """Virtual time (s), only advanced by sleep, so spacing is exact and instant."""
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, delay: float) -> None:
+        self.now += max(delay, 0.0)
+        # Still yield, as asyncio.sleep does, so submits can interleave
+        await asyncio.sleep(0)
+
+
+@dataclass
+class FakeTransmitter:
+    """Transmitter recording what it is asked to send.
+
+    Args:
+        clock (FakeClock): time source, advanced by the transmission time
+        duration (float | None): simulated transmission time (s), default the
+            sum of the timings
+        fail_at (set[int]): indices of the send calls raising OSError
+    """
+    clock: FakeClock = field(default_factory=FakeClock)
+    duration: float | None = None
+    fail_at: set[int] = field(default_factory=set)
+    sent: list[array] = field(default_factory=list)
+    started_at: list[float] = field(default_factory=list)
+    ended_at: list[float] = field(default_factory=list)
+    calls: int = 0
+
+    async def send(self, timings: array) -> None:
+        call = self.calls
+        self.calls += 1
+        self.started_at.append(self.clock())
+        await self.clock.sleep(sum(timings) / 1e6 if self.duration is None else self.duration)
+        self.ended_at.append(self.clock())
+        if call in self.fail_at:
+            raise OSError(f"Transmit {call} failed")
+        self.sent.append(timings)
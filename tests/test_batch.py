@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from airconcontroller.controllers import Panasonic
+from airconcontroller.controllers.batch import decode_capture, decode_file, decode_files, split_capture
+from airconcontroller.controllers.capture import convert_file
+from tests.corpus import BAD_CAPTURES, EXPECTED_CRCS, capture
+
+FILES = ["cool_16.dat", "temp_change.dat", "missing.dat", "heat_16_to_30.dat"]
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_decode_files_collects_errors(max_workers):
+    result = decode_files([capture(name) for name in FILES], max_workers=max_workers)
+
+    assert [f.name for f in result.files] == FILES
+    assert list(result.commands) == ["cool_16.dat", "heat_16_to_30.dat"]
+    for name, commands in result.commands.items():
+        assert [cmd.crc for cmd in commands] == EXPECTED_CRCS[name]
+
+    assert list(result.errors) == ["temp_change.dat", "missing.dat"]
+    assert result.errors["temp_change.dat"].startswith(
+        f"ValueError: Bit value error at: {BAD_CAPTURES['temp_change.dat']}")
+    assert result.errors["missing.dat"].startswith("FileNotFoundError: ")
+    assert set(result.timings) == set(FILES)
+
+
+def test_decode_file_reports_unexpected_errors(monkeypatch):
+    def parse_file(filepath):
+        raise KeyError("frame")
+
+    monkeypatch.setattr(Panasonic, "parse_file", staticmethod(parse_file))
+    result = decode_file(capture("cool_16.dat"))
+    assert result.commands == []
+    assert result.error.startswith("Traceback (most recent call last):")
+    assert result.error.endswith("KeyError: 'frame'")
+
+
+def test_decode_files_cache(tmp_path):
+    names = ["cool_16.dat", "dry_set.dat"]
+    for _ in range(2):
+        result = decode_files([capture(name) for name in names], max_workers=1, cache_dir=tmp_path)
+        assert {name: [cmd.crc for cmd in commands] for name, commands in result.commands.items()} == {
+            name: EXPECTED_CRCS[name] for name in names}
+    assert any(tmp_path.iterdir())
+
+
+def frames(commands: list[Panasonic]) -> list[tuple[list[int], list[int]]]:
+    return [(cmd.cmd_frame.data, cmd.data_frame.data) for cmd in commands]
+
+
+def capture_file(name: str, binary: bool, tmp_path) -> Path:
+    return convert_file(capture(name), tmp_path / name) if binary else capture(name)
+
+
+@pytest.mark.parametrize("binary", [False, True], ids=["text", "binary"])
+@pytest.mark.parametrize("name", ["heat_16_to_30.dat", "timer_off.dat", "dry_16_timer_on_1_12.dat"])
+@pytest.mark.parametrize("max_workers, chunks", [(1, 4), (2, 2), (2, 5), (3, 3), (3, 16)])
+def test_decode_capture_matches_parse_file(name, binary, max_workers, chunks, tmp_path):
+    filepath = capture_file(name, binary, tmp_path)
+    assert len(split_capture(filepath, chunks)) > 1
+    assert frames(decode_capture(filepath, max_workers, chunks)) == frames(Panasonic.parse_file(filepath))
+
+
+@pytest.mark.parametrize("binary", [False, True], ids=["text", "binary"])
+@pytest.mark.parametrize("chunks", [2, 7])
+def test_decode_capture_error_matches_parse_file(binary, chunks, tmp_path):
+    filepath = capture_file("temp_change.dat", binary, tmp_path)
+    assert len(split_capture(filepath, chunks)) > 1
+    with pytest.raises(ValueError) as expected:
+        Panasonic.parse_file(filepath)
+    with pytest.raises(ValueError) as raised:
+        decode_capture(filepath, max_workers=2, chunks=chunks)
+    assert str(raised.value) == str(expected.value)
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import dataclasses
+import shutil
+
+from airconcontroller.controllers.cache import ENV_VAR, DecodeCache
+from airconcontroller.controllers.decoder import TimingThresholds
+from airconcontroller.controllers.panasonic import Panasonic
+from tests.corpus import capture
+
+
+def frames(cmds: list[Panasonic]) -> list[tuple[bytes, bytes]]:
+    return [(bytes(cmd.cmd_frame), bytes(cmd.data_frame)) for cmd in cmds]
+
+
+def test_hit_and_miss(tmp_path):
+    cache = DecodeCache(tmp_path / "cache")
+    expected = frames(Panasonic.parse_file(capture("cool_set.dat")))
+
+    assert frames(cache.parse_file(capture("cool_set.dat"))) == expected
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert frames(cache.parse_file(capture("cool_set.dat"))) == expected
+    assert (cache.hits, cache.misses) == (1, 1)
+    # A fresh instance reads the stored entry
+    other = DecodeCache(tmp_path / "cache")
+    assert frames(other.parse_file(capture("cool_set.dat"))) == expected
+    assert (other.hits, other.misses) == (1, 0)
+    assert cache.clear() == 1
+    assert cache.parse_file(capture("cool_set.dat")) and cache.misses == 2
+
+
+def test_content_change_invalidates(tmp_path):
+    cache = DecodeCache(tmp_path / "cache")
+    copy = tmp_path / "capture.dat"
+    shutil.copyfile(capture("cool_set.dat"), copy)
+    assert frames(cache.parse_file(copy)) == frames(Panasonic.parse_file(capture("cool_set.dat")))
+
+    shutil.copyfile(capture("heat_set.dat"), copy)
+    assert frames(cache.parse_file(copy)) == frames(Panasonic.parse_file(capture("heat_set.dat")))
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_thresholds_change_invalidates(tmp_path):
+    cache = DecodeCache(tmp_path)
+    nominal = TimingThresholds.from_protocol(Panasonic)
+    wider = TimingThresholds(
+        {cls: (low - 10, high + 10) for cls, (low, high) in nominal.pulses.items()}, nominal.spaces)
+    cache.parse_file(capture("cool_set.dat"))
+    cache.parse_file(capture("cool_set.dat"), nominal)
+    cache.parse_file(capture("cool_set.dat"), wider)
+    cache.parse_file(capture("cool_set.dat"), calibrate=True)
+    assert (cache.hits, cache.misses) == (0, 4)
+    cache.parse_file(capture("cool_set.dat"), wider)
+    assert (cache.hits, cache.misses) == (1, 4)
+
+
+def test_timing_change_invalidates(tmp_path, monkeypatch):
+    cache = DecodeCache(tmp_path)
+    cache.parse_file(capture("cool_set.dat"))
+    monkeypatch.setattr(Panasonic, "PROTOCOL", dataclasses.replace(Panasonic.PROTOCOL, DELTA=Panasonic.DELTA + 1))
+    cache.parse_file(capture("cool_set.dat"))
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_directory_from_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv(ENV_VAR, str(tmp_path))
+    assert DecodeCache().directory == tmp_path
+    assert DecodeCache(tmp_path / "other").directory == tmp_path / "other"
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from airconcontroller.controllers import Panasonic
+from airconcontroller.controllers.calibration import (calibrate, calibrate_file, kmeans_1d, load_thresholds,
+                                                      save_thresholds)
+from airconcontroller.controllers.decoder import PULSE_MARK, SPACE_ONE, TimingThresholds, tokenize
+from tests.corpus import EXPECTED_CRCS, capture
+
+# Pulse stretch (us) of the simulated receiver, beyond the nominal DELTA
+STRETCH = 300
+
+
+def stretched_capture() -> list[str]:
+    """Commands as received by a demodulator stretching every pulse."""
+    lines = []
+    for temperature in (20, 21.5, 23):
+        cmd = Panasonic()
+        cmd.update(mode="COOL", temperature=temperature, fan="F2")
+        for line in cmd.to_mode2().splitlines():
+            event, duration = line.split()
+            lines.append(f"{event} {int(duration) + STRETCH if event == 'pulse' else duration}")
+    return lines
+
+
+def test_nominal_windows():
+    thresholds = TimingThresholds.from_protocol(Panasonic)
+    assert thresholds.pulses[PULSE_MARK] == (Panasonic.MARK - Panasonic.DELTA, Panasonic.MARK + Panasonic.DELTA)
+    assert thresholds.classify_spaces(np.array([Panasonic.SPACE1])).tolist() == [SPACE_ONE]
+
+
+def test_calibration_decodes_stretched_pulses():
+    lines = stretched_capture()
+    with pytest.raises(ValueError, match=r"^Bit value error at: ln   1"):
+        Panasonic.PROTOCOL.decode_lines(lines)
+
+    thresholds = calibrate(*tokenize(lines), Panasonic)
+    low, high = thresholds.pulses[PULSE_MARK]
+    assert low <= Panasonic.MARK + STRETCH <= high
+    commands = [Panasonic(*pair) for pair in Panasonic.PROTOCOL.decode_lines(lines, thresholds)]
+    assert [cmd.temperature for cmd in commands] == [20, 21.5, 23]
+    assert all(cmd.crc_valid for cmd in commands)
+
+
+@pytest.mark.parametrize("name", ["cool_set.dat", "heat_16_to_30.dat", "timer_on.dat"])
+def test_calibrated_corpus_decodes_the_same(name):
+    commands = Panasonic.parse_file(capture(name), calibrate=True)
+    assert [cmd.crc for cmd in commands] == EXPECTED_CRCS[name]
+
+
+def test_missing_classes_keep_nominal_window():
+    thresholds = calibrate(np.zeros(0, dtype=np.int8), np.zeros(0, dtype=np.int64), Panasonic)
+    assert thresholds == TimingThresholds.from_protocol(Panasonic)
+
+
+def test_save_load(tmp_path):
+    thresholds = calibrate_file(capture("cool_set.dat"), Panasonic)
+    save_thresholds(thresholds, tmp_path / "receiver.json")
+    assert load_thresholds(tmp_path / "receiver.json") == thresholds
+    assert TimingThresholds.from_dict(thresholds.to_dict()) == thresholds
+
+
+def test_kmeans_1d():
+    values = np.array([90, 100, 110, 490, 500, 510, 5000])
+    weights = np.array([1, 2, 1, 1, 2, 1, 1])
+    centroids, spreads, counts = kmeans_1d(values, weights, np.array([120, 450]), np.array([50, 50]))
+    assert centroids.tolist() == [100, 500]
+    # The outlier at 5000 carries no weight
+    assert counts.tolist() == [4, 4]
+    assert spreads[0] == pytest.approx(np.sqrt(50))
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from airconcontroller.controllers import Panasonic
+from airconcontroller.controllers.capture import (EVENT_SHIFT, convert_file, convert_lines, is_capture,
+                                                  load_capture)
+from airconcontroller.controllers.decoder import EVENT_BANNER, EVENT_TIMEOUT, tokenize
+from tests.corpus import DATA_DIR, capture
+
+CORPUS = sorted(path.name for path in DATA_DIR.glob("*.dat"))
+
+
+def frames(commands) -> list[tuple[bytes, int, bytes, int]]:
+    return [(bytes(cmd.cmd_frame), cmd.cmd_frame.bit_count, bytes(cmd.data_frame), cmd.data_frame.bit_count)
+            for cmd in commands]
+
+
+@pytest.mark.parametrize("name", CORPUS)
+def test_convert_round_trip(tmp_path, name):
+    dst = convert_file(capture(name), tmp_path / "capture.cap")
+    assert dst.suffix == ".cap"
+    assert is_capture(dst) and not is_capture(capture(name))
+
+    events, durations = tokenize(capture(name).read_text().splitlines())
+    kept = events != EVENT_BANNER
+    loaded = load_capture(dst)
+    assert np.array_equal(loaded.events, events[kept])
+    assert np.array_equal(loaded.durations, durations[kept])
+    assert np.array_equal(loaded.frame_index, np.flatnonzero(events[kept] == EVENT_TIMEOUT))
+
+
+@pytest.mark.parametrize("name", ["clear.dat", "heat_16_to_30.dat", "timer_on.dat"])
+def test_binary_decodes_as_text(tmp_path, name):
+    dst = convert_file(capture(name), tmp_path / "capture.cap")
+    assert frames(Panasonic.parse_file(dst)) == frames(Panasonic.parse_file(capture(name)))
+
+
+def test_to_lines(tmp_path):
+    lines = Panasonic().to_mode2().splitlines()
+    convert_lines(lines, tmp_path / "capture.cap")
+    assert load_capture(tmp_path / "capture.cap").to_lines() == lines
+
+
+def test_empty_capture(tmp_path):
+    convert_lines([], tmp_path / "empty.cap")
+    loaded = load_capture(tmp_path / "empty.cap")
+    assert len(loaded) == 0 and len(loaded.frame_index) == 0
+
+
+def test_errors(tmp_path):
+    with pytest.raises(ValueError, match=r"Unknown event at: ln   1: bogus"):
+        convert_lines(["pulse 3500", "bogus"], tmp_path / "bad.cap")
+    with pytest.raises(ValueError, match="Durations must be between"):
+        convert_lines([f"pulse {1 << EVENT_SHIFT}"], tmp_path / "long.cap")
+    with pytest.raises(ValueError, match="Not a binary capture"):
+        load_capture(capture("cool_16.dat"))
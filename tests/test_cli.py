@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from airconcontroller.cli import main
+
+
+def encode_json(capsys, *states: str) -> dict:
+    assert main(["encode", "-f", "json", *states]) == 0
+    return json.loads(capsys.readouterr().out)
+
+
+def test_encode_defaults_to_power_on(capsys):
+    record = encode_json(capsys, "mode=COOL", "temperature=24")
+    assert record["power"] == "ON"
+    assert (record["mode"], record["temperature"]) == ("COOL", 24.0)
+    assert record["crc_valid"]
+
+
+def test_encode_power_off(capsys):
+    assert encode_json(capsys, "power=off", "mode=COOL")["power"] == "OFF"
+
+
+@pytest.mark.parametrize("state", ["power=STANDBY", "fan=F9", "speed=F1", "temperature"])
+def test_encode_invalid_state(capsys, state):
+    assert main(["encode", state]) == 2
+    assert "Invalid state" in capsys.readouterr().err
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from airconcontroller.cCmdString import CmdString, CmdStringBatch
+
+
+def command() -> CmdString:
+    cmd = CmdString.default()
+    cmd.temp = 24.5
+    cmd.mode = "COOL"
+    cmd.set_checksum()
+    return cmd
+
+
+@pytest.mark.parametrize("make", [
+    lambda cmd: CmdString(bits=cmd.bits.copy()),
+    lambda cmd: CmdString(cmd.bits.copy()),
+    lambda cmd: CmdString(list(cmd.bits.astype(int))),
+    lambda cmd: CmdString(data=bytes(cmd)),
+    lambda cmd: CmdString.from_array(cmd.bits),
+    lambda cmd: CmdString.from_bytes(bytes(cmd)),
+], ids=["bits", "positional bits", "bit list", "bytes", "from_array", "from_bytes"])
+def test_constructors(make):
+    cmd = command()
+    copy = make(cmd)
+    assert len(copy.data) == 19
+    assert bytes(copy) == bytes(cmd)
+    assert (copy.temp, copy.mode_value, copy.checksum) == (24.5, CmdString.MODES["COOL"], cmd.checksum)
+
+
+@pytest.mark.parametrize("data", [np.zeros(20, dtype=np.uint8), np.full(152, 2), bytes(18), np.zeros((2, 19))])
+def test_invalid_data(data):
+    with pytest.raises(ValueError, match="19 bytes or 152 bits"):
+        CmdString(data)
+
+
+def test_data_and_bits():
+    with pytest.raises(ValueError):
+        CmdString(data=bytes(command()), bits=command().bits)
+
+
+def test_bit_views_write_back():
+    cmd = command()
+    assert cmd.data[0] == 0x02
+    cmd.bits[0] = 1
+    assert cmd.data[0] == 0x03
+    cmd.mode[0] ^= 1
+    assert cmd.mode_value == CmdString.MODES["COOL"] ^ 1
+
+
+def test_batch_rows_share_data():
+    batch = CmdStringBatch.repeat(command(), 3)
+    batch.temp = np.array([16, 20.5, 30])
+    batch.set_checksum()
+    row = batch[1]
+    assert row.temp == 20.5
+    row.temp = 22
+    assert batch.temp.tolist() == [16, 22, 30]
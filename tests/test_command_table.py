@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from itertools import product
+
+import pytest
+
+from airconcontroller.controllers import Panasonic
+from airconcontroller.controllers.command_table import CommandTable
+
+
+@pytest.fixture(scope="module")
+def table() -> CommandTable:
+    return CommandTable.build()
+
+
+def test_every_state_matches_update(table):
+    assert len(table) == 5 * 29 * 6 * 6
+    for mode, temperature, fan, swing in product(CommandTable.MODES, CommandTable.TEMPERATURES,
+                                                 CommandTable.FANS, CommandTable.SWINGS):
+        cmd = Panasonic()
+        cmd.update(mode=mode, temperature=temperature, fan=fan, swing=swing)
+        assert table.data_frame(mode, temperature, fan, swing) == bytes(cmd.data_frame)
+
+
+def test_command(table):
+    cmd = table.command(Panasonic.MODES.COOL, 24.5, "F2", "P3")
+    assert cmd.state() == {"power": "OFF", "mode": "COOL", "temperature": 24.5, "fan": "F2", "swing": "P3"}
+    assert cmd.crc_valid
+    assert cmd.cmd_frame == Panasonic().cmd_frame
+
+
+def test_base_bytes_are_kept():
+    base = Panasonic()
+    base.update(power="ON")
+    cmd = CommandTable.build(base).command("HEAT", 22, "AUTO", "AUTO")
+    assert cmd.power == "ON"
+    assert cmd.crc_valid
+
+
+def test_save_load(table, tmp_path):
+    filepath = tmp_path / "commands.bin"
+    table.save(filepath)
+    loaded = CommandTable.load(filepath)
+    assert len(loaded) == len(table)
+    assert loaded.data_frame("DRY", 16, "F5", "AUTO") == table.data_frame("DRY", 16, "F5", "AUTO")
+    assert loaded.cmd_frame == table.cmd_frame
+
+    filepath.write_bytes(b"XXXX" + filepath.read_bytes()[4:])
+    with pytest.raises(ValueError, match="Not a command table"):
+        CommandTable.load(filepath)
+
+
+@pytest.mark.parametrize("state, error", [
+    (("COOL", 24.25, "AUTO", "AUTO"), ValueError),
+    (("COOL", 31, "AUTO", "AUTO"), ValueError),
+    (("COOL", 15.5, "AUTO", "AUTO"), ValueError),
+    (("WARM", 24, "AUTO", "AUTO"), KeyError),
+    (("COOL", 24, "F9", "AUTO"), KeyError),
+])
+def test_index_errors(table, state, error):
+    with pytest.raises(error):
+        table.index(*state)
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from itertools import product
+
+import pytest
+
+from airconcontroller.controllers import Panasonic
+from airconcontroller.controllers.conversion import (HIGH_NIBBLE, LOW_NIBBLE, bits_to_bytes, bits_to_int,
+                                                     bytes_to_bits, int_to_bits)
+from airconcontroller.controllers.panasonic import byte_reverse
+
+
+def string_int_to_bits(value: int, width: int = 8) -> list[int]:
+    """The string formatting conversion the tables replace."""
+    return list(reversed([int(s) for s in format(value, "b").zfill(width)]))
+
+
+def string_bits_to_int(bits: list[int]) -> int:
+    return int("0b0" + "".join(str(bit) for bit in reversed(bits)), base=2)
+
+
+@pytest.mark.parametrize("width", range(1, 9))
+def test_int_to_bits_matches_string_conversion(width):
+    for value in range(256):
+        assert int_to_bits(value, width) == string_int_to_bits(value, width)
+        assert Panasonic.int_to_data_byte(value, width) == string_int_to_bits(value, width)
+
+
+def test_wide_values():
+    for value in (256, 0x1234, 0xFFFFFF):
+        assert int_to_bits(value, 16) == string_int_to_bits(value, 16)
+        assert bits_to_int(int_to_bits(value, 24)) == value
+
+
+def test_bits_to_int_matches_string_conversion():
+    for length in range(11):
+        for bits in product((0, 1), repeat=length):
+            assert bits_to_int(list(bits)) == string_bits_to_int(list(bits))
+    assert Panasonic.data_byte_to_int([1, 0, 1, 1]) == 0b1101
+
+
+def test_bytes_round_trip():
+    data = bytes(range(256))
+    bits = bytes_to_bits(data)
+    assert bits[8:16] == [1, 0, 0, 0, 0, 0, 0, 0]
+    assert bits_to_bytes(bits) == data
+    # A partial last byte is padded with zero bits
+    assert bytes_to_bits(b"\xff\xff", 11) == [1] * 11
+    assert bits_to_bytes([1] * 11) == b"\xff\x07"
+
+
+def test_nibbles():
+    for value in range(256):
+        assert (HIGH_NIBBLE[value] << 4) | LOW_NIBBLE[value] == value
+
+
+def test_byte_reverse():
+    assert byte_reverse([1, 0, 0, 1, 1]) == [1, 1, 0, 0, 1]
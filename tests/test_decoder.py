@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import pytest
+
+from airconcontroller.controllers import Panasonic
+from tests.corpus import BAD_CAPTURES, EXPECTED_CRCS, SWAPPED_CAPTURES, capture
+
+
+@pytest.mark.parametrize("name", sorted(EXPECTED_CRCS))
+def test_corpus_checksums(name):
+    commands = Panasonic.parse_file(capture(name))
+    assert [cmd.crc for cmd in commands] == EXPECTED_CRCS[name]
+    assert all(cmd.crc_valid for cmd in commands)
+
+
+@pytest.mark.parametrize("name", sorted(SWAPPED_CAPTURES))
+def test_swapped_captures(name):
+    # The legacy empty first command shifts every pair by one frame
+    commands = Panasonic.parse_file(capture(name))
+    assert len(commands) == SWAPPED_CAPTURES[name]
+    assert commands[0].cmd_frame.bit_count == 0
+    assert not any(cmd.crc_valid for cmd in commands)
+
+
+def test_corpus_fields():
+    assert {tuple(cmd.state().values()) for cmd in Panasonic.parse_file(capture("cool_16.dat"))} == {
+        ("ON", "COOL", 16.0, "AUTO", "AUTO")}
+    assert {cmd.power for cmd in Panasonic.parse_file(capture("off_set.dat"))} == {"OFF"}
+
+    temperatures = [cmd.temperature for cmd in Panasonic.parse_file(capture("heat_16_to_30.dat"))]
+    assert temperatures == [16 + idx / 2 for idx in range(29)] + [30.0] * 3
+
+    fans = [cmd.fan for cmd in Panasonic.parse_file(capture("dry_16_strength_auto_strong.dat"))]
+    assert fans == ["AUTO", "F1", "F2", "F3", "F5"] * 2 + ["AUTO"]
+    swings = [cmd.swing for cmd in Panasonic.parse_file(capture("dry_16_angle_auto_shallow_steep.dat"))]
+    assert swings == ["AUTO", "P1", "P2", "P3", "P4", "P5"] * 2 + ["AUTO"]
+
+
+@pytest.mark.parametrize("name", sorted(BAD_CAPTURES))
+def test_corpus_bad_symbol(name):
+    with pytest.raises(ValueError, match=f"^Bit value error at: {BAD_CAPTURES[name]}"):
+        Panasonic.parse_file(capture(name))
+
+
+@pytest.mark.parametrize("line_idx, line, message", [
+    (5, "space 800", "Bit value error at: ln   5: space 800 [435, 800]"),
+    (4, "pulse 2000", "Bit value error at: ln   5: space 1300 [2000, 1300]"),
+    (4, "bogus", "Error of some sort at: ln   4: bogus"),
+])
+def test_invalid_line(tmp_path, line_idx, line, message):
+    # Lines are numbered from 0, as the legacy decoder did
+    lines = Panasonic().to_mode2().splitlines()
+    lines[line_idx] = line
+    filepath = tmp_path / "bad.dat"
+    filepath.write_text("\n".join(lines) + "\n")
+
+    with pytest.raises(ValueError) as error:
+        Panasonic.parse_file(filepath)
+    assert str(error.value).startswith(message)
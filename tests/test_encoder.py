@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import pytest
+
+from airconcontroller.controllers import Panasonic
+from airconcontroller.controllers.encoder import _encode, timing_count
+from tests.corpus import capture
+
+STATES = [
+    {"power": power, "mode": mode, "temperature": temperature, "fan": fan, "swing": swing}
+    for power, mode, temperature, fan, swing in [
+        ("ON", "COOL", 24, "AUTO", "AUTO"),
+        ("ON", "COOL", 16, "F1", "P1"),
+        ("ON", "HEAT", 30, "F5", "P5"),
+        ("ON", "HEAT", 22.5, "F3", "P3"),
+        ("ON", "DRY", 16.5, "F2", "P2"),
+        ("ON", "DRY", 29.5, "F4", "P4"),
+        ("ON", "FAN", 12, "AUTO", "P1"),
+        ("ON", "AUTO", 35, "F1", "AUTO"),
+        ("OFF", "HEAT", 22, "AUTO", "AUTO"),
+    ]
+]
+
+
+def round_trip(cmd: Panasonic) -> Panasonic:
+    decoded = list(Panasonic.parse_stream(cmd.to_mode2().splitlines()))
+    assert len(decoded) == 1
+    return decoded[0]
+
+
+@pytest.mark.parametrize("settings", STATES, ids=lambda settings: "-".join(map(str, settings.values())))
+def test_round_trip(settings):
+    cmd = Panasonic()
+    cmd.update(**settings)
+    decoded = round_trip(cmd)
+
+    assert decoded.cmd_frame == cmd.cmd_frame
+    assert decoded.data_frame == cmd.data_frame
+    assert decoded.crc_valid
+
+    # Out of range temperatures are sent at the limit
+    expected = {**settings, "temperature": min(max(settings["temperature"], 16), 30)}
+    assert decoded.state() == expected
+
+
+@pytest.mark.parametrize("name", ["dry_16_timer_on_1_12.dat", "heat_16_to_30.dat"])
+def test_corpus_round_trip(name):
+    for cmd in Panasonic.parse_file(capture(name)):
+        decoded = round_trip(cmd)
+        assert (decoded.cmd_frame, decoded.data_frame) == (cmd.cmd_frame, cmd.data_frame)
+
+
+def test_timing_layout():
+    cmd = Panasonic()
+    timings = cmd.to_timings()
+    assert len(timings) == timing_count((64, 152))
+    assert timings[:2].tolist() == [Panasonic.HEADER, Panasonic.HEADERSPACE]
+    assert timings[-1] == Panasonic.MARK
+    # The frames are separated by MARK/ENDOFFRAMESPACE
+    frame2 = 2 + 2 * 64
+    assert timings[frame2:frame2 + 4].tolist() == [Panasonic.MARK, Panasonic.ENDOFFRAMESPACE,
+                                                   Panasonic.HEADER, Panasonic.HEADERSPACE]
+
+
+def test_cached_timings_are_copies():
+    cmd = Panasonic()
+    cmd.update(mode="COOL", temperature=21)
+    first = cmd.to_timings()
+    first[0] = 0
+    assert cmd.to_timings()[0] == Panasonic.HEADER
+
+    _encode.cache_clear()
+    cmd.to_timings()
+    cmd.to_timings()
+    info = _encode.cache_info()
+    assert (info.misses, info.hits) == (1, 1)
+
+    # A changed state is a new cache entry
+    cmd.update(temperature=22)
+    assert cmd.to_timings() != first
+    assert _encode.cache_info().misses == 2
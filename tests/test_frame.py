@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import pytest
+
+from airconcontroller.controllers.controller import Frame
+
+BITS = [0, 1, 0, 0, 0, 0, 0, 0,
+        1, 1, 1, 1, 0, 0, 0, 1,
+        1, 0, 1]
+
+
+def test_bits_are_packed_lsb_first():
+    frame = Frame(BITS)
+    assert bytes(frame) == bytes([0x02, 0x8F, 0x05])
+    assert frame.bit_count == 19
+    assert len(frame) == 3
+    assert frame.data == BITS
+
+
+def test_bytes_round_trip():
+    frame = Frame(bytes([0x02, 0x8F]))
+    assert frame.bit_count == 16
+    assert frame.data == BITS[:16]
+    assert Frame.from_bytes(bytearray(b"\x02\x8f")) == frame
+    assert Frame(BITS[:16]) == frame
+    # The same bytes with fewer bits received are a different frame
+    assert Frame(BITS) != Frame(bytes(Frame(BITS)))
+
+
+def test_byte_access():
+    frame = Frame(BITS)
+    assert frame.get_byte_value(2) == 0x8F
+    assert frame.get_byte(2) == [1, 1, 1, 1, 0, 0, 0, 1]
+    # A partial last byte only has its received bits, missing bytes read as 0
+    assert frame.get_byte(3) == [1, 0, 1]
+    assert frame.get_byte_value(10) == 0
+    assert frame.get_byte(10) == []
+
+    frame.set_byte(1, [1, 0, 0, 0, 0, 0, 0, 0])
+    assert frame.get_byte_value(1) == 0x01
+    frame.set_byte_value(5, 0xAA)
+    assert bytes(frame) == bytes([0x01, 0x8F, 0x05, 0x00, 0xAA])
+    assert frame.bit_count == 40
+
+
+def test_view():
+    frame = Frame(bytes(4))
+    frame.view()[1] = 0x7F
+    assert frame.get_byte_value(2) == 0x7F
+    readonly = frame.view(writable=False)
+    assert readonly[1] == 0x7F
+    with pytest.raises(TypeError):
+        readonly[1] = 0
+
+
+def test_data_setter():
+    frame = Frame(bytes(4))
+    frame.remember("value", 1, [1])
+    frame.data = BITS
+    assert bytes(frame) == bytes([0x02, 0x8F, 0x05])
+    assert frame.derived == {}
+
+
+def test_remember_until_byte_set():
+    frame = Frame(bytes(4))
+    assert frame.remember("low", 5, [1, 2]) == 5
+    frame.remember("high", 6, [3])
+
+    frame.set_byte_value(4, 1)
+    assert frame.derived == {"low": 5, "high": 6}
+    frame.set_byte_value(2, 1)
+    assert frame.derived == {"high": 6}
+    frame.set_byte(3, [1] * 8)
+    assert frame.derived == {}
+
+
+def test_view_forgets_unless_readonly():
+    frame = Frame(bytes(4))
+    frame.remember("value", 1, [1])
+    frame.view(writable=False)
+    assert frame.derived == {"value": 1}
+    frame.view()
+    assert frame.derived == {}
+
+    frame.remember("value", 1, [1])
+    frame.forget()
+    assert frame.derived == {}
+    # Forgotten dependents no longer drop a value remembered again
+    frame.remember("other", 2, [2])
+    frame.set_byte_value(1, 0)
+    assert frame.derived == {"other": 2}
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from airconcontroller.benchmark import HEAVY_MODULES, IMPORT_BUDGETS, ROOT_DIR, check_imports, import_time
+
+
+@pytest.mark.parametrize("module", IMPORT_BUDGETS)
+def test_skips_analysis_dependencies(module):
+    # A fresh interpreter, the test session has them all loaded
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, (str(ROOT_DIR), env.get("PYTHONPATH"))))
+    result = subprocess.run(
+        [sys.executable, "-c", f"import sys, {module}; print(*sys.modules)"],
+        cwd=ROOT_DIR, env=env, capture_output=True, text=True, check=True)
+
+    loaded = {name.split(".")[0] for name in result.stdout.split()}
+    assert loaded.isdisjoint(HEAVY_MODULES)
+
+
+@pytest.mark.parametrize("module", IMPORT_BUDGETS)
+def test_import_budget(module):
+    # Best of a few fresh interpreters, as bench_imports
+    samples = [import_time(module) for _ in range(3)]
+    seconds = min(sample[0] for sample in samples)
+    result = {module: {"min_s": seconds, "budget_s": IMPORT_BUDGETS[module], "heavy_modules": samples[0][1]}}
+    assert check_imports(result) == []
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import re
+
+import pytest
+
+from airconcontroller.controllers import instrumentation
+from airconcontroller.controllers.instrumentation import BUCKETS, span, timed
+from airconcontroller.controllers.panasonic import Panasonic
+from tests.corpus import capture
+
+
+@pytest.fixture(autouse=True)
+def clean_instrumentation():
+    was_enabled = instrumentation.is_enabled()
+    instrumentation.disable()
+    instrumentation.reset()
+    yield
+    instrumentation.reset()
+    if was_enabled:
+        instrumentation.enable()
+
+
+def test_disabled_records_nothing():
+    Panasonic.parse_file(capture("cool_set.dat"))
+    with span("block"):
+        pass
+    assert instrumentation.to_dict() == {}
+
+
+def test_decode_stages_recorded():
+    instrumentation.enable()
+    Panasonic.parse_file(capture("cool_set.dat"))
+    stats = instrumentation.to_dict()
+    for stage in ("decode.read", "decode.tokenize", "decode.frames", "decode.commands"):
+        assert stats[stage]["count"] >= 1
+    # Stages nest, the reader includes the tokenizer
+    assert stats["decode.read"]["total"] >= stats["decode.tokenize"]["total"]
+
+
+def test_stage_dict():
+    instrumentation.record("stage", 2e-6)
+    instrumentation.record("stage", 2e-6)
+    instrumentation.record("stage", 2.0)
+    data = instrumentation.to_dict()["stage"]
+    assert data["count"] == 3
+    assert data["total"] == pytest.approx(2.000004)
+    assert data["mean"] == pytest.approx(2.000004 / 3)
+    histogram = data["histogram"]
+    assert list(histogram) == [repr(bound) for bound in BUCKETS] + ["+Inf"]
+    # Cumulative counts
+    assert histogram["1e-06"] == 0
+    assert histogram["5e-06"] == 2
+    assert histogram["1.0"] == 2
+    assert histogram["+Inf"] == 3
+
+
+def test_timed_and_span():
+    @timed("square")
+    def square(value):
+        return value * value
+
+    instrumentation.enable()
+    assert square(3) == 9
+    with span("block"):
+        square(4)
+    with pytest.raises(ZeroDivisionError):
+        timed("fails")(lambda: 1 / 0)()
+    stats = instrumentation.to_dict()
+    assert stats["square"]["count"] == 2
+    assert stats["block"]["count"] == 1
+    assert stats["fails"]["count"] == 1
+
+
+def test_prometheus_export():
+    instrumentation.record("decode.read", 3e-4)
+    instrumentation.record("encode", 0.2)
+    text = instrumentation.to_prometheus()
+    lines = text.splitlines()
+    assert text.endswith("\n")
+    assert lines[:2] == ["# HELP airconcontroller_stage_seconds Time spent in each decode/encode stage.",
+                         "# TYPE airconcontroller_stage_seconds histogram"]
+    sample = re.compile(r'airconcontroller_stage_seconds_(bucket|sum|count)\{stage="[\w.]+"(,le="[^"]+")?\} \S+')
+    assert all(sample.fullmatch(line) for line in lines[2:])
+    assert 'airconcontroller_stage_seconds_bucket{stage="decode.read",le="0.0005"} 1' in lines
+    assert 'airconcontroller_stage_seconds_bucket{stage="decode.read",le="0.0001"} 0' in lines
+    assert 'airconcontroller_stage_seconds_bucket{stage="encode",le="+Inf"} 1' in lines
+    assert 'airconcontroller_stage_seconds_sum{stage="encode"} 0.2' in lines
+    assert 'airconcontroller_stage_seconds_count{stage="decode.read"} 1' in lines
+    assert instrumentation.to_prometheus("ac").startswith("# HELP ac_stage_seconds ")
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from airconcontroller.controllers.manager import TransmitterPool, UnitManager
+from tests.fakes import FakeClock, FakeTransmitter
+
+
+def make_manager(units: int = 3) -> UnitManager:
+    clock = FakeClock()
+    manager = UnitManager(TransmitterPool([FakeTransmitter(clock)]))
+    for scheduler in manager.pool.schedulers:
+        scheduler.clock, scheduler.sleep = clock, clock.sleep
+    for idx in range(units):
+        manager.add_unit(f"unit{idx}")
+    return manager
+
+
+def test_broadcast_switches_units_on():
+    async def scenario():
+        manager = make_manager()
+        async with manager:
+            await manager.broadcast(mode="COOL", temperature=24)
+        return manager
+
+    manager = asyncio.run(scenario())
+    for unit in manager.units.values():
+        assert unit.state.state() == {"power": "ON", "mode": "COOL", "temperature": 24.0,
+                                      "fan": "AUTO", "swing": "AUTO"}
+        assert unit.state.crc_valid
+    assert manager.metrics.encoded == 1
+
+
+def test_broadcast_power_off():
+    async def scenario():
+        manager = make_manager()
+        async with manager:
+            await manager.broadcast(mode="COOL", temperature=24)
+            await manager.broadcast(power="OFF")
+        return manager
+
+    manager = asyncio.run(scenario())
+    assert {unit.state.power for unit in manager.units.values()} == {"OFF"}
+
+
+@pytest.mark.parametrize("settings", [
+    {"temperature": 25, "fan": "F9"},
+    {"mode": "COOL", "swing": "P9"},
+    {"power": "STANDBY"},
+    {"speed": "F1"},
+])
+def test_invalid_broadcast_changes_nothing(settings):
+    async def scenario():
+        manager = make_manager()
+        before = {name: bytes(unit.state.data_frame) for name, unit in manager.units.items()}
+        async with manager:
+            with pytest.raises(ValueError):
+                manager.broadcast(**settings)
+        return manager, before
+
+    manager, before = asyncio.run(scenario())
+    assert {name: bytes(unit.state.data_frame) for name, unit in manager.units.items()} == before
+    assert manager.metrics.commands == 0
+    assert manager.pool.transmitters[0].sent == []
+
+
+def test_set_changes_only_given_fields():
+    async def scenario():
+        manager = make_manager(units=2)
+        before = manager["unit0"].state.state()
+        async with manager:
+            await manager.set("unit0", fan="F3")
+            await manager.set("unit1", power="ON", mode="HEAT", temperature=18)
+            await manager.set("unit1", temperature=22)
+        return manager, before
+
+    manager, before = asyncio.run(scenario())
+    assert before["power"] == "OFF"
+    assert manager["unit0"].state.state() == {**before, "fan": "F3"}
+    assert manager["unit1"].state.state() == {**before, "power": "ON", "mode": "HEAT", "temperature": 22.0}
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from airconcontroller.controllers import Panasonic
+
+
+def decoded(cmd: Panasonic) -> dict:
+    """State decoded afresh from the frame bytes, without any memoized value."""
+    return Panasonic(bytes(cmd.cmd_frame), bytes(cmd.data_frame)).state()
+
+
+def memoized(cmd: Panasonic) -> dict:
+    state = cmd.state()
+    assert set(cmd.data_frame.derived) >= {"power", "temperature", "fan", "swing"}
+    return state
+
+
+@pytest.mark.parametrize("name, value, expected", [
+    ("power", 1, {"power": "ON"}),
+    ("mode", 0x3, {"mode": "COOL"}),
+    ("temperature", 25, {"temperature": 25.0}),
+    ("temperature_half", 1, {"temperature": 22.5}),
+    ("fan", 0x5, {"fan": "F3"}),
+    ("swing", 0x1, {"swing": "P1"}),
+])
+def test_set_field_invalidates(name, value, expected):
+    cmd = Panasonic()
+    before = memoized(cmd)
+    cmd.set_field(name, value)
+    assert cmd.state() == {**before, **expected} == decoded(cmd)
+
+
+def test_temperature_limit_invalidates_half_degree():
+    cmd = Panasonic()
+    cmd.temperature = 22.5
+    assert memoized(cmd)["temperature"] == 22.5
+    # The limit bit shares no byte with the temperature itself
+    cmd.set_field("temperature_limit", 1)
+    assert cmd.temperature == 22.0 == decoded(cmd)["temperature"]
+
+
+def test_set_byte_value_invalidates():
+    rng = random.Random(0)
+    cmd = Panasonic()
+    fields = Panasonic.PROTOCOL.field_map
+    byte_nums = sorted({fields[name].byte for name in ("power", "mode", "temperature", "temperature_half", "fan")})
+    for _ in range(500):
+        memoized(cmd)
+        cmd.data_frame.set_byte_value(rng.choice(byte_nums), rng.randrange(256))
+        assert cmd.state() == decoded(cmd)
+
+
+def test_writable_view_invalidates():
+    cmd = Panasonic()
+    memoized(cmd)
+    cmd.data_frame.view(writable=False)
+    assert cmd.data_frame.derived
+
+    view = cmd.data_frame.view()
+    view[Panasonic.PROTOCOL.field_map["temperature"].byte - 1] = 27 << 1
+    assert cmd.temperature == 27.0 == decoded(cmd)["temperature"]
+
+
+def test_setters_and_data_invalidate():
+    cmd = Panasonic()
+    memoized(cmd)
+    cmd.update(power="ON", mode="DRY", temperature=18.5, fan="F2", swing="P4")
+    assert cmd.state() == decoded(cmd) == {"power": "ON", "mode": "DRY", "temperature": 18.5,
+                                           "fan": "F2", "swing": "P4"}
+
+    memoized(cmd)
+    cmd.data_frame.data = Panasonic().data_frame.data
+    assert cmd.state() == Panasonic().state()
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import pytest
+
+from airconcontroller.controllers import Panasonic
+from airconcontroller.controllers.recovery import ERROR_CRC, ERROR_SYMBOL
+from tests.corpus import EXPECTED_CRCS, SWAPPED_CAPTURES, capture
+
+NAME = "heat_16_to_30.dat"
+CORRUPTED = 4
+
+
+def data_bit_line(lines: list[str], start: int, bit: int) -> int:
+    """Line index of the space of data frame <bit> of the command starting at line <start>."""
+    end_of_frame = next(idx for idx in range(start, len(lines))
+                        if lines[idx].startswith("space") and int(lines[idx].split()[1]) > 9000)
+    # End-of-frame space, header pulse and space, then a mark and space per bit
+    return end_of_frame + 4 + 2 * bit
+
+
+def corrupt(tmp_path, bit: int, space: str) -> tuple:
+    lines = capture(NAME).read_text().splitlines()
+    start = Panasonic.recover_file(capture(NAME)).lines[CORRUPTED]
+    idx = data_bit_line(lines, start, bit)
+    assert lines[idx].startswith("space")
+    lines[idx] = space(lines[idx]) if callable(space) else space
+    filepath = tmp_path / NAME
+    filepath.write_text("\n".join(lines) + "\n")
+    return filepath, idx
+
+
+@pytest.mark.parametrize("name", sorted(EXPECTED_CRCS))
+def test_clean_capture(name):
+    report = Panasonic.recover_file(capture(name))
+    assert report.ok
+    assert [cmd.crc for cmd in report.commands] == EXPECTED_CRCS[name]
+
+
+@pytest.mark.parametrize("name", sorted(SWAPPED_CAPTURES))
+def test_swapped_capture_in_order(name):
+    # parse_file keeps an empty first pair and swapped frames, recovery does not
+    report = Panasonic.recover_file(capture(name))
+    assert report.ok
+    assert len(report.commands) == SWAPPED_CAPTURES[name] - 1
+    assert all(cmd.crc_valid for cmd in report.commands)
+
+
+def test_bad_symbol_drops_one_command(tmp_path):
+    filepath, idx = corrupt(tmp_path, 20, "space 800")
+    with pytest.raises(ValueError):
+        Panasonic.parse_file(filepath)
+
+    report = Panasonic.recover_file(filepath)
+    expected = EXPECTED_CRCS[NAME]
+    assert [cmd.crc for cmd in report.commands] == expected[:CORRUPTED] + expected[CORRUPTED + 1:]
+    assert [(error.kind, error.line) for error in report.errors] == [(ERROR_SYMBOL, idx)]
+    assert all(cmd.crc_valid for cmd in report.commands)
+
+
+def test_flipped_bit_fails_checksum(tmp_path):
+    # A bit flipped within the timing windows only shows in the checksum
+    def flip(line: str) -> str:
+        return "space 435" if int(line.split()[1]) > 800 else "space 1300"
+
+    filepath, _ = corrupt(tmp_path, 20, flip)
+    assert len(Panasonic.parse_file(filepath)) == len(EXPECTED_CRCS[NAME])
+
+    report = Panasonic.recover_file(filepath)
+    expected = EXPECTED_CRCS[NAME]
+    assert [cmd.crc for cmd in report.commands] == expected[:CORRUPTED] + expected[CORRUPTED + 1:]
+    assert len(report.errors) == 1
+    error = report.errors[0]
+    assert error.kind == ERROR_CRC
+    assert error.line == Panasonic.recover_file(capture(NAME)).lines[CORRUPTED]
+    assert error.message.startswith(f"Checksum {expected[CORRUPTED]} does not match")
+    assert report.error_counts() == {ERROR_CRC: 1}
+    assert report.to_dict()["commands"] == len(expected) - 1
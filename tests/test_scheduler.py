@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from airconcontroller.controllers.panasonic import Panasonic
+from airconcontroller.controllers.scheduler import MIN_GAP, TransmitScheduler
+from tests.fakes import FakeClock, FakeTransmitter
+
+
+def make_scheduler(**kwargs) -> tuple[TransmitScheduler, FakeTransmitter]:
+    clock = FakeClock()
+    transmitter = FakeTransmitter(clock, **kwargs)
+    return TransmitScheduler(transmitter, clock=clock, sleep=clock.sleep), transmitter
+
+
+def command(temperature: float) -> Panasonic:
+    cmd = Panasonic()
+    cmd.update(mode="COOL", temperature=temperature)
+    return cmd
+
+
+def test_coalescing_sends_last_state():
+    async def scenario():
+        scheduler, transmitter = make_scheduler()
+        async with scheduler:
+            cmd = Panasonic()
+            waiters = []
+            for temperature in (22, 23, 24):
+                cmd.update(mode="COOL", temperature=temperature)
+                waiters.append(scheduler.submit("lounge", cmd))
+            await asyncio.gather(*waiters)
+        return scheduler, transmitter
+
+    scheduler, transmitter = asyncio.run(scenario())
+    assert transmitter.sent == [command(24).to_timings()]
+    assert scheduler.last_sent("lounge").temperature == 24
+    assert scheduler.metrics.coalesced == 2
+    assert scheduler.metrics.sent == 1
+
+
+def test_min_gap_in_clock_time():
+    async def scenario():
+        scheduler, transmitter = make_scheduler(duration=0.1)
+        async with scheduler:
+            await asyncio.gather(*(scheduler.submit(unit, command(24)) for unit in ("a", "b", "c")))
+        return transmitter
+
+    transmitter = asyncio.run(scenario())
+    assert len(transmitter.sent) == 3
+    # The first command goes out at once, each later one a gap after the previous
+    assert transmitter.started_at[0] == 0.0
+    for ended, started in zip(transmitter.ended_at, transmitter.started_at[1:]):
+        assert started - ended == pytest.approx(MIN_GAP)
+
+
+def test_failed_transmit_does_not_stall():
+    async def scenario():
+        scheduler, transmitter = make_scheduler(fail_at={0})
+        async with scheduler:
+            failed = scheduler.submit("a", command(24))
+            queued = scheduler.submit("b", command(25))
+            with pytest.raises(OSError):
+                await failed
+            await queued
+            # The failed unit state is unknown, so the same command is sent again
+            await scheduler.submit("a", command(24))
+        return scheduler, transmitter
+
+    scheduler, transmitter = asyncio.run(scenario())
+    assert transmitter.sent == [command(25).to_timings(), command(24).to_timings()]
+    assert scheduler.metrics.failed == 1
+    assert scheduler.metrics.sent == 2
+    assert scheduler.queue_depth == 0
+
+
+def test_suppressed_during_gap():
+    async def scenario():
+        clock = FakeClock()
+        transmitter = FakeTransmitter(clock)
+        suppress = []
+
+        async def sleep(delay):
+            # Resubmit the state last sent to "a" while its next command waits out the gap
+            while suppress:
+                scheduler.submit(*suppress.pop())
+            await clock.sleep(delay)
+
+        scheduler = TransmitScheduler(transmitter, clock=clock, sleep=sleep)
+        async with scheduler:
+            await scheduler.submit("a", command(24))
+            suppress.append(("a", command(24)))
+            replaced = scheduler.submit("a", command(25))
+            await asyncio.wait_for(replaced, 1)
+            await asyncio.wait_for(scheduler.submit("b", command(26)), 1)
+        return scheduler, transmitter
+
+    scheduler, transmitter = asyncio.run(scenario())
+    assert transmitter.sent == [command(24).to_timings(), command(26).to_timings()]
+    assert scheduler.metrics.suppressed == 1
+    assert scheduler.queue_depth == 0
+
+
+class BlockedTransmitter:
+    """Transmitter whose send never completes."""
+
+    def __init__(self):
+        self.started = asyncio.Event()
+
+    async def send(self, timings):
+        self.started.set()
+        await asyncio.Event().wait()
+
+
+def test_stop_without_drain_during_send():
+    async def scenario():
+        transmitter = BlockedTransmitter()
+        scheduler = TransmitScheduler(transmitter)
+        scheduler.start()
+        sending = scheduler.submit("lounge", command(24))
+        await transmitter.started.wait()
+        queued = scheduler.submit("bedroom", command(22))
+        await asyncio.wait_for(scheduler.stop(drain=False), 1)
+        return scheduler, sending, queued
+
+    scheduler, sending, queued = asyncio.run(scenario())
+    assert sending.cancelled()
+    assert queued.cancelled()
+    assert scheduler.last_sent("lounge") is None
+    assert scheduler.queue_depth == 0
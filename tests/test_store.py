@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from airconcontroller.controllers import Panasonic
+from airconcontroller.controllers.store import CommandStore
+from tests.corpus import EXPECTED_CRCS, SWAPPED_CAPTURES, capture
+
+DECODED_CAPTURES = sorted([*EXPECTED_CRCS, *SWAPPED_CAPTURES])
+
+
+def store_state(store: CommandStore, idx: int) -> dict:
+    """Row <idx> of <store> in the form of Panasonic.state."""
+    mode = store.mode_names[idx]
+    return {
+        "power": store.power_names[idx],
+        "mode": None if mode == "UNKNOWN" else mode,
+        "temperature": float(store.records["temperature"][idx]),
+        "fan": store.fan_names[idx],
+        "swing": store.swing_names[idx],
+    }
+
+
+@pytest.mark.parametrize("name", DECODED_CAPTURES)
+def test_columns_equal_panasonic(name):
+    store = CommandStore.from_file(capture(name))
+    commands = Panasonic.parse_file(capture(name))
+    assert len(store) == len(commands)
+
+    for idx, cmd in enumerate(commands):
+        state = cmd.state()
+        expected = {**state,
+                    "fan": state["fan"] if state["fan"] in Panasonic.FAN_SETTINGS else "UNKNOWN",
+                    "swing": state["swing"] if state["swing"] in Panasonic.SWING_SETTINGS else "UNKNOWN"}
+        assert store_state(store, idx) == expected
+        assert store.records["crc"][idx] == cmd.crc
+        assert store.records["crc_valid"][idx] == cmd.crc_valid
+
+
+def test_round_trip_commands():
+    store = CommandStore.concatenate(CommandStore.from_file(capture(name)) for name in DECODED_CAPTURES)
+    commands = [cmd for name in DECODED_CAPTURES for cmd in Panasonic.parse_file(capture(name))]
+    assert [(c.cmd_frame, c.data_frame) for c in store.commands()] == [(c.cmd_frame, c.data_frame)
+                                                                        for c in commands]
+
+
+@pytest.mark.parametrize("half, limit, temperature", [(0, 0, 24.0), (1, 0, 24.5), (1, 1, 24.0), (0, 1, 24.0)])
+def test_temperature_half_and_limit(half, limit, temperature):
+    # Byte 15 holds other bits besides the half degree, eg 0x81
+    cmd = Panasonic()
+    cmd.update(temperature=24)
+    cmd.set_field("temperature_half", half)
+    cmd.set_field("temperature_limit", limit)
+    cmd.data_frame.set_byte_value(15, cmd.data_frame.get_byte_value(15) | 0x01)
+
+    frame1 = np.frombuffer(bytes(cmd.cmd_frame), dtype=np.uint8)[None]
+    frame2 = np.frombuffer(bytes(cmd.data_frame), dtype=np.uint8)[None]
+    store = CommandStore.from_frames(frame1, frame2, np.zeros(1, dtype=np.uint64))
+    assert cmd.temperature == store.records["temperature"][0] == temperature
+
+
+def test_save_load(tmp_path):
+    store = CommandStore.from_file(capture("heat_16_to_30.dat"))
+    store.save(tmp_path / "store.npy")
+    for mmap in (False, True):
+        loaded = CommandStore.load(tmp_path / "store.npy", mmap=mmap)
+        assert np.array_equal(loaded.records, store.records)
+
+    np.save(tmp_path / "other.npy", np.zeros(3))
+    with pytest.raises(ValueError, match="Not a command store"):
+        CommandStore.load(tmp_path / "other.npy")
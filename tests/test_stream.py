@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from airconcontroller.controllers import Panasonic
+from airconcontroller.controllers.decoder import Mode2Decoder, iter_decode
+from tests.corpus import EXPECTED_CRCS, capture
+
+STREAM_CAPTURES = ["clear.dat", "dry_16_timer_on_1_12.dat", "heat_16_to_30.dat", "timer_off.dat"]
+
+
+def frames(commands) -> list[tuple[bytes, int, bytes, int]]:
+    return [(bytes(cmd.cmd_frame), cmd.cmd_frame.bit_count, bytes(cmd.data_frame), cmd.data_frame.bit_count)
+            for cmd in commands]
+
+
+def random_chunks(text: str, seed: int, max_size: int = 256) -> list[str]:
+    rng = random.Random(seed)
+    chunks, start = [], 0
+    while start < len(text):
+        size = rng.randint(1, max_size)
+        chunks.append(text[start:start + size])
+        start += size
+    return chunks
+
+
+@pytest.mark.parametrize("name", STREAM_CAPTURES)
+def test_stream_lines_equal_parse_file(name):
+    expected = frames(Panasonic.parse_file(capture(name)))
+    with open(capture(name)) as source:
+        assert frames(Panasonic.parse_stream(source)) == expected
+
+
+@pytest.mark.parametrize("name", STREAM_CAPTURES)
+@pytest.mark.parametrize("seed", range(3))
+def test_stream_chunks_equal_parse_file(name, seed):
+    text = capture(name).read_text()
+    expected = frames(Panasonic.parse_file(capture(name)))
+    assert frames(Panasonic.parse_stream(random_chunks(text, seed), chunked=True)) == expected
+    assert frames(Panasonic.parse_stream([chunk.encode() for chunk in random_chunks(text, seed)],
+                                         chunked=True)) == expected
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 100])
+def test_stream_block_sizes(block_size):
+    lines = capture("dry_16_strength_auto_strong.dat").read_text().splitlines()
+    pairs = list(iter_decode(lines, Panasonic.PROTOCOL, block_size=block_size))
+    expected = Panasonic.PROTOCOL.decode_lines(lines)
+    assert [(list(frame1), list(frame2)) for frame1, frame2 in pairs] == expected
+    assert len(pairs) == len(EXPECTED_CRCS["dry_16_strength_auto_strong.dat"])
+
+
+def test_stream_yields_each_command_once_complete():
+    lines = Panasonic().to_mode2().splitlines() * 2
+    decoder = Mode2Decoder(Panasonic.PROTOCOL)
+    emitted = [len(decoder.feed_line(line)) for line in lines]
+    # A pair is complete on its timeout, the last line of each command
+    half = len(lines) // 2
+    assert emitted[half - 1] == emitted[-1] == 1
+    assert sum(emitted) == 2
+
+
+def test_close_drops_truncated_frame():
+    lines = Panasonic().to_mode2().splitlines() * 2
+    decoder = Mode2Decoder(Panasonic.PROTOCOL)
+    pairs = []
+    for line in lines[:-100]:
+        pairs.extend(decoder.feed_line(line))
+    assert len(pairs) == 1
+
+    # As parse_file, a frame pair without its timeout is not a command
+    assert decoder.close() == []
+    assert Panasonic.PROTOCOL.decode_lines(lines[:-100]) == pairs
+
+
+def test_close_decodes_unterminated_line():
+    text = Panasonic().to_mode2().rstrip("\n")
+    decoder = Mode2Decoder(Panasonic.PROTOCOL)
+    assert decoder.feed(text) == []
+    pairs = decoder.close()
+    assert len(pairs) == 1
+    assert Panasonic(*pairs[0]).data_frame == Panasonic().data_frame
+
+
+def test_stream_error_line_number():
+    lines = Panasonic().to_mode2().splitlines() * 3
+    lines[445] = "space 800"
+    with pytest.raises(ValueError, match=r"^Bit value error at: ln 445: space 800"):
+        list(Panasonic.parse_stream(lines))